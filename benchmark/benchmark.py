@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import openspace
+from openspace.src import decoding
+from openspace.src.codec import getCodec
+
+# Benchmarks the client against the in-process `MockServer`, so results can be compared
+# across versions of this package without a running OpenSpace.
+#
+#   python benchmark.py                      # print a summary
+#   python benchmark.py --output result.json # also write the results as JSON
+#   python benchmark.py --transport websocket # benchmark the WebSocket transport
+
+def percentiles(samples):
+    """ Summarize latency samples (in seconds) in milliseconds. """
+
+    samples = sorted(samples)
+    def at(p):
+        return samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1000
+
+    return {
+        'count': len(samples),
+        'mean': statistics.fmean(samples) * 1000,
+        'p50': at(50),
+        'p90': at(90),
+        'p99': at(99),
+        'max': samples[-1] * 1000
+    }
+
+async def requestLatency(api, call, count, concurrency):
+    """ Measure the latency of `call()` with `concurrency` callers in parallel. """
+
+    samples = []
+    remaining = [count]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            await call()
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = percentiles(samples)
+    result['requestsPerSecond'] = count / elapsed
+    return result
+
+async def subscriptionThroughput(server, api, subscriptions, duration):
+    """ Measure how many subscription messages per second the client consumes. """
+
+    topics = [api.subscribeToProperty(f"Scene.Node{i}.Value") for i in range(subscriptions)]
+    received = [0]
+
+    async def consume(topic):
+        async for _ in topic:
+            received[0] += 1
+
+    bytesBefore = server.bytesSent
+    tasks = [asyncio.create_task(consume(topic)) for topic in topics]
+    await asyncio.sleep(duration)
+    bytesSent = server.bytesSent - bytesBefore
+    messages = received[0]
+
+    for task in tasks:
+        task.cancel()
+    for topic in topics:
+        topic.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {
+        'subscriptions': subscriptions,
+        'messagesPerSecond': messages / duration,
+        'bytesPerSecond': bytesSent / duration
+    }
+
+async def setThroughput(api, count):
+    """ Measure how fast `setProperty` calls are written to the connection. """
+
+    start = time.perf_counter()
+    for i in range(count):
+        api.setProperty("Scene.Earth.Scale.Scale", i)
+    await api.drain()
+    # A round trip guarantees the server has read everything before it
+    await api.getProperty("Scene.Earth.Scale.Scale")
+    elapsed = time.perf_counter() - start
+    return { 'count': count, 'setsPerSecond': count / elapsed }
+
+async def libraryStartup(api, cacheDirectory):
+    """ Measure `library()` without a cache, and with a cold and a warm disk cache. """
+
+    result = {}
+    start = time.perf_counter()
+    await api.library()
+    result['uncachedSeconds'] = time.perf_counter() - start
+
+    await api.library(cache=cacheDirectory)
+    result['coldCacheSeconds'] = api.libraryLoadStats()['seconds']
+    await api.library(cache=cacheDirectory)
+    result['warmCacheSeconds'] = api.libraryLoadStats()['seconds']
+    return result
+
+async def decodeStalls(api, count):
+    """ Measure how long the event loop is blocked while fetching the documentation, with
+    the response decoded on the event loop, in a thread and in a process. `maxStallMs` is
+    the longest time other topics had to wait. """
+
+    result = {}
+    for mode in ('inline', 'thread', 'process'):
+        api.offloadDecoding(None if mode == 'inline' else 64 * 1024, mode)
+        # Start the workers before measuring
+        await api.getDocumentation('lua')
+        api.enableMetrics(True, monitorEventLoop=True)
+        start = time.perf_counter()
+        for _ in range(count):
+            await api.getDocumentation('lua')
+        elapsed = time.perf_counter() - start
+        stalls = api.stats()['eventLoopStalls']
+        result[mode] = {
+            'requestsPerSecond': count / elapsed,
+            'maxStallMs': (stalls['max'] or 0) * 1000,
+            'totalStallMs': stalls['total'] * 1000
+        }
+    api.offloadDecoding(None)
+    api.enableMetrics(False)
+    return result
+
+async def typedDecoding(api, count):
+    """ Measure the cost of converting a property update with `toNamedTuple` and with the
+    `decode` modes, in microseconds per update. """
+
+    value = await api.getProperty("Scene.Earth.Scale.Scale")
+    modes = [
+        ('toNamedTuple', openspace.toNamedTuple),
+        ('list', openspace.TypedDecoder('list')),
+        ('tuple', openspace.TypedDecoder('tuple'))
+    ]
+    # NumPy is an optional dependency
+    if decoding.np is not None:
+        modes.append(('numpy', openspace.TypedDecoder('numpy')))
+
+    result = {}
+    for mode, convert in modes:
+        start = time.perf_counter()
+        for _ in range(count):
+            convert(value)
+        result[mode] = (time.perf_counter() - start) / count * 1e6
+    return result
+
+async def run(args):
+    server = openspace.MockServer(
+        updateRate=args.rate or None,
+        payloadSize=args.payload_size,
+        libraries=args.libraries,
+        functionsPerLibrary=args.functions,
+        transport=args.transport
+    )
+    await server.start()
+
+    api = openspace.Api('localhost', server.port, transport=args.transport)
+    await api.connect()
+
+    results = {
+        'version': openspace.__version__,
+        'python': platform.python_version(),
+        'codec': getCodec().name,
+        'parameters': vars(args)
+    }
+
+    results['get'] = await requestLatency(
+        api, lambda: api.getProperty("Scene.Earth.Scale.Scale"), args.requests, 1
+    )
+    results['getConcurrent'] = await requestLatency(
+        api, lambda: api.getProperty("Scene.Earth.Scale.Scale"),
+        args.requests, args.concurrency
+    )
+    results['luascript'] = await requestLatency(
+        api, lambda: api.executeLuaScript("return 1"), args.requests, 1
+    )
+    results['set'] = await setThroughput(api, args.requests * 10)
+    results['subscribe'] = await subscriptionThroughput(
+        server, api, args.subscriptions, args.duration
+    )
+    with tempfile.TemporaryDirectory() as cacheDirectory:
+        results['library'] = await libraryStartup(api, cacheDirectory)
+    results['decodeStalls'] = await decodeStalls(api, 20)
+    results['typedDecodingMicroseconds'] = await typedDecoding(api, args.requests * 10)
+
+    api.disconnect()
+    server.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the OpenSpace API client")
+    parser.add_argument('--requests', type=int, default=2000,
+                        help="number of requests per latency benchmark")
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help="parallel callers in the concurrent latency benchmark")
+    parser.add_argument('--subscriptions', type=int, default=8,
+                        help="number of parallel property subscriptions")
+    parser.add_argument('--rate', type=float, default=0,
+                        help="updates per second per subscription, 0 for unlimited")
+    parser.add_argument('--duration', type=float, default=3.0,
+                        help="seconds to measure subscription throughput")
+    parser.add_argument('--payload-size', type=int, default=0,
+                        help="bytes of padding in every payload")
+    parser.add_argument('--libraries', type=int, default=100,
+                        help="number of libraries in the generated documentation")
+    parser.add_argument('--functions', type=int, default=100,
+                        help="number of functions per library")
+    parser.add_argument('--transport', choices=('tcp', 'websocket'), default='tcp',
+                        help="the transport to connect over")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+if __name__ == '__main__':
+    main()
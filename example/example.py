@@ -18,8 +18,8 @@ async def scaleEarth(value):
     print("Scaling Earth")
 
     property = "Scene.Earth.Scale.Scale"
-    data = await os.getProperty(property)
-    data = os.toNamedTuple(data)
+    # decode=True returns the property as a namedtuple
+    data = await os.getProperty(property, decode=True)
 
     print(f"Current scale value: {data.Value}")
     os.setProperty(property, value)
@@ -27,22 +27,19 @@ async def scaleEarth(value):
 async def subscribeToEarthScaleUpdates():
     print("Subscribing to Earth scale updates")
 
-    subscription = os.subscribeToProperty("Scene.Earth.Scale.Scale")
+    subscription = os.subscribeToProperty("Scene.Earth.Scale.Scale", decode=True)
     # We can iterate the subscription using by looping nextValue()
     i = 0
     while i < 3:
         print("Waiting for Earth scale update...")
         result = await os.nextValue(subscription)
-        dic = os.toNamedTuple(result)
-        print(f"{dic.Description.Identifier} changed to {dic.Value}")
+        print(f"{result.Description.Identifier} changed to {result.Value}")
         i += 1
     subscription.cancel()
 
     ## Or using async for loop
-    # async for future in subscription.iterator():
-    #     result = await future
-    #     dic = api.toNamedTuple(result)
-    #     print(f"{dic.Description.Identifier} changed to {dic.Value}")
+    # async for result in subscription:
+    #     print(f"{result.Description.Identifier} changed to {result.Value}")
     #     if i > 3:
     #         subscription.cancel()
     #     i += 1
@@ -50,18 +47,16 @@ async def subscribeToEarthScaleUpdates():
 async def subscribeToEventOnce(events):
     topic = os.subscribeToEvent(events)
 
-    async for future in topic.iterator():
-        print(f"SubscribeToEventOnce: Waiting for {events} to fire...")
-        result = await future
+    print(f"SubscribeToEventOnce: Waiting for {events} to fire...")
+    async for result in topic:
         print("Event fired: ", result)
         topic.cancel()
 
 async def subscribeToEventWithCallback(events, callback):
     topic = os.subscribeToEvent(events)
     j = 0
-    async for future in topic.iterator():
-        print(f"SubscribeToEventWithCallback: Subscription callback waiting for {events} to fire...")
-        data = await future
+    print(f"SubscribeToEventWithCallback: Subscription callback waiting for {events} to fire...")
+    async for data in topic:
         callback(data)
         if j >= 1:
             topic.cancel()
@@ -1,4 +1,3 @@
-import asyncio
 import openspace
 
 # This is an example of how to make synchronous calls to the API
@@ -7,23 +6,24 @@ import openspace
 
 ADDRESS = 'localhost'
 PORT = 4681
-# Create an OpenSpaceApi instance with the OpenSpace address and port
-api = openspace.Api(ADDRESS, PORT)
 
-# You might want to handle this differently according to your environment or use-case.
-# For instance, this works in a regular python shell or in IPython but `python3 -m asyncio` is
-# different.
-loop = asyncio.new_event_loop()
-def sync_wrapper(f, *args, **kwargs):
-    return loop.run_until_complete(f(*args, **kwargs))
+# `SyncApi` runs the asyncio API on an event loop in a background thread. Every call blocks
+# until it completes, and calls may be made from several threads at once (they share the
+# same connection). This also works in environments that already run an event loop, such
+# as Jupyter or `python3 -m asyncio`.
+api = openspace.SyncApi(ADDRESS, PORT)
+api.connect()
 
-# warning: all async calls must be performed on the same loop
-
-loop.run_until_complete(api.connect())
-sync_os = loop.run_until_complete(api.library(sync_wrapper))
+sync_os = api.library()
 
 # Calls to methods of `sync_os` will block until the call is made and a result is returned:
 sync_os.printInfo("foo")
 print(sync_os.propertyValue("Scene.Earth.Scale.Scale"))
 
-api.disconnect()
+# Subscriptions are blocking iterators
+subscription = api.subscribeToProperty("Scene.Earth.Scale.Scale", delivery='latest')
+for i, value in zip(range(3), subscription):
+    print(value)
+subscription.cancel()
+
+api.close()
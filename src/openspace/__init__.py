@@ -1,3 +1,12 @@
 from .src.api import Api
+from .src.pool import ApiPool
+from .src.group import ApiGroup, NodeResult
+from .src.syncapi import SyncApi
+from .src.mockserver import MockServer
+from .src.streaming import PropertyStream, RingBuffer
+from .src.logstream import LogStream, RotatingFileSink
+from .src.scheduler import WriteScheduler, VirtualClock
+from .src.recorder import Recorder, RecordingReader, replay, replayToServer
+from .src.decoding import TypedDecoder, toNamedTuple
 
 __version__ = "0.1.2"
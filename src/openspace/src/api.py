@@ -1,54 +1,246 @@
 import asyncio
-import json
+import copy
+import re
+import time
 from traceback import print_exc
 from .topic import Topic
+from .transport import Transport, DEFAULT_HIGH_WATER_MARK
 from .socketwrapper import SocketWrapper
-from functools import partial
-from typing import Callable, NamedTuple
-from collections import namedtuple
+from .websockettransport import WebSocketTransport
+from .codec import Codec, getCodec, peekTopic
+from .batch import Batch, BatchCall, activeBatch
+from .propertycache import PropertyCache, DEFAULT_MAX_SUBSCRIPTIONS
+from .topicqueue import TopicQueue
+from .doccache import DocumentationCache, indexHash, libraryIndex
+from .library import LuaLibrary
+from .metrics import Metrics, StallMonitor
+from .offload import OffloadedDecoder, DEFAULT_OFFLOAD_THRESHOLD
+from .lua import toLua
+from .scheduler import WriteScheduler
+from .sharedtopic import SharedTopic
+from .logstream import LogStream, DEFAULT_BATCH_INTERVAL, DEFAULT_BATCH_SIZE, DEFAULT_MAX_BUFFERED
+from .decoding import TypedDecoder, getDecoder, toNamedTuple
+from typing import Callable
 
 
-def toNamedTuple(content: dict, name: str = "namedtuple") -> NamedTuple:
-    """ Recursively converts a `dictionary` to a `namedtuple`. """
+# The largest lua script `setProperties` packs into a single message, in characters
+MAX_SCRIPT_SIZE = 64 * 1024
 
-    T = namedtuple(name, content.keys())
-    values = []
-    for k, v in content.items():
-        if isinstance(v, dict):
-            values.append(toNamedTuple(v, k))
-        else:
-            values.append(v)
+# Transports by name, see the `transport` parameter of `Api`
+TRANSPORTS = {
+    'tcp': SocketWrapper,
+    'websocket': WebSocketTransport
+}
+
+# Requests that can safely be sent again if the connection was lost before the response
+IDEMPOTENT_TOPICS = frozenset(('get', 'documentation', 'version', 'authorize'))
+
+def _matchesMany(property: str) -> bool:
+    """ Whether a property URI contains wildcards (`*`) or group tags (`{tag}`). """
+
+    return '*' in property or '{' in property
 
-    return T(*values)
+def _wildcardPattern(property: str) -> re.Pattern:
+    """ A pattern matching the URIs a URI with wildcards (`*`) covers. """
 
+    return re.compile('.*'.join(re.escape(part) for part in property.split('*')))
+
+def _firstReturnValue(luaTable):
+    """ Get the first return value from the table returned by a lua function. """
+
+    if luaTable:
+        return luaTable['1']
+    return None
 
 class Api:
     """ Construct an instance of the OpenSpace API. \n
     :param socket - An instance of SocketWrapper.
-    The socket should not be connected prior to calling this constructor. """
-
-    def __init__(self, ADDRESS, PORT):
+    The socket should not be connected prior to calling this constructor. \n
+    :param `highWaterMark` - The number of outgoing bytes that may be buffered before
+    `drain()` (and the async API calls) wait for the connection to catch up. \n
+    :param `codec` - The JSON codec to use, either a Codec instance or the name of one
+    ('orjson', 'msgspec' or 'json'). Defaults to the fastest one installed. \n
+    :param `requestTimeout` - Default timeout in seconds for calls that wait for a
+    response, such as `getProperty`. None means wait indefinitely. \n
+    :param `propertyCacheSize` - The maximum number of properties that are kept fresh
+    through subscriptions by `watch()` and `getProperty(cached=True)`. \n
+    :param `reconnect` - If true, a lost connection is re-established with exponential
+    backoff. The client is then re-authenticated, open topics such as subscriptions are
+    restarted under their existing Topic objects, and requests that were waiting for a
+    response are sent again if they are idempotent (`get`, `documentation`) or fail
+    with `ConnectionError` otherwise (`luascript`). \n
+    :param `maxReconnectAttempts` - The number of reconnection attempts before giving up
+    and disconnecting. None means no limit. \n
+    :param `transport` - How to connect: 'tcp' for the raw socket interface of
+    OpenSpace's server module (port 4681 by default) or 'websocket' for its WebSocket
+    interface (port 4682 by default), which compresses messages and needs the
+    websockets package. A `Transport` subclass may also be given. \n
+    :param `compression` - Whether the WebSocket transport offers permessage-deflate.
+    Compression shrinks large responses on slow links, but costs CPU time on fast
+    local ones. Ignored by other transports. """
+
+    def __init__(self, ADDRESS, PORT, highWaterMark: int = DEFAULT_HIGH_WATER_MARK,
+                 codec: Codec | str | None = None, requestTimeout: float | None = None,
+                 propertyCacheSize: int = DEFAULT_MAX_SUBSCRIPTIONS, reconnect: bool = False,
+                 maxReconnectAttempts: int | None = None,
+                 transport: str | type[Transport] = 'tcp', compression: bool = True):
         self._callbacks = {}
+        # Callbacks of topics that take their messages undecoded, by topic id
+        self._rawCallbacks = {}
+        # Futures for one-shot requests that are waiting for their response, by topic id
+        self._pending = {}
         self._nextTopicId = 0
-
-        socket = SocketWrapper(ADDRESS, PORT)
+        self._codec = codec if isinstance(codec, Codec) else getCodec(codec)
+        self._requestTimeout = requestTimeout
+        self._onDisconnect = lambda: None
+        self._propertyCache = PropertyCache(self, propertyCacheSize)
+        # The last value written to each property, to skip redundant writes
+        self._lastWritten = {}
+        self._libraryLoad = {}
+        self._libraryRefresh = None
+        self._writeScheduler = None
+        # Subscriptions shared between consumers, by topic type and subject
+        self._sharedTopics = {}
+
+        # State needed to restore the session after a reconnect: the start message of
+        # every open topic, and the message of every pending request
+        self._reconnect = reconnect
+        self._topicStarts = {}
+        self._requestMessages = {}
+        self._secret = None
+        self._lostTopics = []
+        self._lostRequests = []
+
+        # Instrumentation, disabled unless metrics or hooks are enabled
+        self._metrics = None
+        self._stallMonitor = None
+        self._onReceive = None
+        # Decodes large messages off the event loop, see `offloadDecoding()`
+        self._decoder = None
+        self._onRequestComplete = None
+
+        if isinstance(transport, str):
+            if transport not in TRANSPORTS:
+                raise ValueError(f"Transport must be one of {tuple(TRANSPORTS)}")
+            transport = TRANSPORTS[transport]
+        if issubclass(transport, WebSocketTransport):
+            socket = transport(ADDRESS, PORT, highWaterMark, reconnect, maxReconnectAttempts,
+                               compression)
+        else:
+            socket = transport(ADDRESS, PORT, highWaterMark, reconnect, maxReconnectAttempts)
         async def __onConnect():
             pass
         socket.onConnect(__onConnect)
-        socket.onDisconnect(lambda: None)
+        socket.onDisconnect(self._handle_disconnect)
         socket.onMessage(self._handle_message)
+        socket.onConnectionLost(self._handle_connection_lost)
+        socket.onReconnect(self._handle_reconnect)
 
         self._socket = socket
 
     def _handle_message(self, message):
-        messageObject = json.loads(message)
+        if self._onReceive is not None:
+            self._onReceive(message)
+
+        # Drop messages for topics nobody is listening to before paying for decoding
+        topic = peekTopic(message)
+        if topic is not None:
+            raw = self._rawCallbacks.get(topic)
+            if raw is not None:
+                raw(message)
+                return
+            if topic not in self._pending and topic not in self._callbacks:
+                return
+
+        if self._decoder is not None and self._decoder.wants(topic, len(message)):
+            self._decoder.submit(topic, message)
+            return
+
+        self._dispatch(self._codec.loads(message), message)
+
+    def _dispatch(self, messageObject, message):
+        """ Pass a decoded message to the request or topic it belongs to. """
+
         if 'topic' in messageObject:
+            raw = self._rawCallbacks.get(messageObject['topic'])
+            if raw is not None:
+                raw(message)
+                return
+
+            future = self._pending.pop(messageObject['topic'], None)
+            if future is not None:
+                if future.done():
+                    return
+                if 'payload' in messageObject:
+                    future.set_result(messageObject['payload'])
+                else:
+                    future.set_exception(
+                        RuntimeError(f"Error handling message: {messageObject}")
+                    )
+                return
+
             cb = self._callbacks.get(messageObject['topic'])
             if cb:
                 if 'payload' in messageObject:
                     cb(messageObject['payload'])
                 else:
                     print(f"Error handling message: {messageObject}")
+
+    def _handle_disconnect(self):
+        # Nothing will answer the outstanding requests anymore
+        pending = self._pending
+        self._pending = {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Disconnected from OpenSpace"))
+
+        # The subscriptions keeping the cache fresh died with the connection
+        self._propertyCache.clear(unsubscribe=False)
+        self._sharedTopics = {}
+        self._lostTopics = []
+        self._lostRequests = []
+        self._forgetWritten()
+
+        self._onDisconnect()
+
+    def _handle_connection_lost(self):
+        # Remember what was in flight when the connection dropped. Topics and requests
+        # created during the outage are queued and sent normally once reconnected
+        self._lostTopics = list(self._topicStarts)
+        self._lostRequests = list(self._pending.items())
+        self._propertyCache.invalidate()
+        self._forgetWritten()
+
+    def _forgetWritten(self):
+        # OpenSpace may restart while the connection is down, the values written before
+        # can not be assumed to be in place anymore
+        self._lastWritten = {}
+        if self._writeScheduler is not None:
+            self._writeScheduler._forgetWritten()
+
+    async def _handle_reconnect(self):
+        if self._secret is not None:
+            await self.authenticate(self._secret)
+
+        for topic in self._lostTopics:
+            start = self._topicStarts.get(topic)
+            if start is not None:
+                self._socket.send(start)
+
+        for topic, future in self._lostRequests:
+            if future.done():
+                continue
+            type, message = self._requestMessages.get(topic, (None, None))
+            if type in IDEMPOTENT_TOPICS:
+                self._socket.send(message)
+            else:
+                future.set_exception(
+                    ConnectionError("Connection to OpenSpace was lost during the request")
+                )
+
+        self._lostTopics = []
+        self._lostRequests = []
+
     def onConnect(self, callback: Callable[[], None]):
         """ Set the function to execute when connection is established. \n
         :param `callback` - Async function to execute. """
@@ -59,7 +251,7 @@ class Api:
     def onDisconnect(self, callback: Callable[[], None]):
         """ Set the function to execute when socket is dicsonnected. """
 
-        self._socket.onDisconnect(callback)
+        self._onDisconnect = callback
 
     async def connect(self):
         """ Connect to OpenSpace. """
@@ -69,14 +261,256 @@ class Api:
     def disconnect(self):
         """ Disconnect from OpenSpace. """
 
+        if self._writeScheduler is not None:
+            self._writeScheduler.cancel()
+            self._writeScheduler = None
         self._socket.disconnect()
 
-    def startTopic(self, type: str, payload) -> Topic:
+    async def drain(self):
+        """ Wait until the outgoing buffer is below its high-water mark. \n
+        Synchronous calls such as `setProperty` only queue their messages, await this
+        after large bursts of them to avoid buffering without limit. """
+
+        await self._socket.drain()
+
+    def _startRequest(self, type: str, payload) -> asyncio.Future:
+        """ Send a one-shot request and return a future that resolves to the payload of
+        its response. The future is removed from the pending table when it completes or
+        is cancelled. """
+
+        if not isinstance(type, str):
+            raise ValueError("Topic type must be a string")
+
+        topic = self._nextTopicId
+        self._nextTopicId += 1
+
+        future = asyncio.get_running_loop().create_future()
+        if self._socket._disconnecting:
+            # Nothing would send the request or answer it
+            future.set_exception(ConnectionError("Disconnected from OpenSpace"))
+            return future
+        self._pending[topic] = future
+
+        message = self._codec.dumps({
+            'topic': topic,
+            'type': type,
+            'payload': payload
+        })
+        if self._reconnect:
+            self._requestMessages[topic] = (type, message)
+            future.add_done_callback(lambda _: self._forgetRequest(topic))
+        else:
+            future.add_done_callback(lambda _: self._pending.pop(topic, None))
+        if self._metrics is not None or self._onRequestComplete is not None:
+            self._trackRequest(future, type, payload)
+
+        self._socket.send(message)
+        return future
+
+    def _trackRequest(self, future, type, payload):
+        start = time.perf_counter()
+        function = payload.get('function') if type == 'luascript' else None
+
+        def complete(future):
+            seconds = time.perf_counter() - start
+            failed = future.cancelled() or future.exception() is not None
+            if self._metrics is not None:
+                self._metrics.recordRequest(type, function, seconds, failed)
+            if self._onRequestComplete is not None:
+                self._onRequestComplete(type, function, seconds, failed)
+
+        future.add_done_callback(complete)
+
+    def _forgetRequest(self, topic):
+        self._pending.pop(topic, None)
+        self._requestMessages.pop(topic, None)
+
+    async def _request(self, type: str, payload, timeout: float | None = None):
+        """ Send a one-shot request and wait for its response. \n
+        :param `timeout` - Seconds to wait before raising `TimeoutError`. Defaults to the
+        `requestTimeout` given to the constructor. \n
+        :return - The payload of the response. """
+
+        if timeout is None:
+            timeout = self._requestTimeout
+        if timeout is None:
+            return await self._sendRequest(type, payload)
+        # The timeout also covers waiting for the outgoing buffer to drain
+        return await asyncio.wait_for(self._sendRequest(type, payload), timeout)
+
+    async def _sendRequest(self, type: str, payload):
+        await self.drain()
+        return await self._startRequest(type, payload)
+
+    def enableMetrics(self, enabled: bool = True, monitorEventLoop: bool = False):
+        """ Start (or stop) collecting request latencies for `stats()`. Collection costs
+        nothing while disabled. \n
+        :param `monitorEventLoop` - Also measure how long the event loop is blocked at a
+        time, for example by decoding large messages (see `offloadDecoding()`). Must be
+        called from the event loop. """
+
+        self._metrics = Metrics() if enabled else None
+        if self._stallMonitor is not None:
+            self._stallMonitor.stop()
+            self._stallMonitor = None
+        if enabled and monitorEventLoop:
+            self._stallMonitor = StallMonitor()
+            self._stallMonitor.start()
+
+    def offloadDecoding(self, threshold: int | None = DEFAULT_OFFLOAD_THRESHOLD,
+                        executor = 'process', workers: int | None = None):
+        """ Decode messages of at least `threshold` bytes, such as the documentation or
+        large lua tables, in a process pool instead of on the event loop, so that they do
+        not hold up other topics while they are parsed. The worker splits the decoded
+        message into parts, which the event loop rebuilds one at a time, running other
+        callbacks in between. This shortens the longest stall, not the total time spent
+        on the message: copying the parts back costs about as much as decoding, and each
+        message takes longer to arrive. Smaller messages are still decoded right away.
+        Messages of each topic are delivered in the order they were received. \n
+        :param `threshold` - The message size in bytes from which to offload, or None to
+        decode everything on the event loop again. \n
+        :param `executor` - 'process', 'thread' or a `concurrent.futures.Executor`. A
+        thread pool does not shorten stalls with the available codecs, which hold the GIL
+        while decoding, it only helps custom codecs that release it. \n
+        :param `workers` - The number of processes or threads. """
+
+        if self._decoder is not None:
+            self._decoder.close()
+            self._decoder = None
+        if threshold is not None:
+            self._decoder = OffloadedDecoder(
+                self._codec, self._dispatch, threshold, executor, workers
+            )
+
+    def onSend(self, callback: Callable[[bytes], None] | None):
+        """ Set a function called with every encoded message sent to OpenSpace, or None
+        to remove it. """
+
+        self._socket.onSend(callback)
+
+    def onReceive(self, callback: Callable[[bytes], None] | None):
+        """ Set a function called with every encoded message received from OpenSpace,
+        before it is decoded, or None to remove it. """
+
+        self._onReceive = callback
+
+    def onRequestComplete(self, callback: Callable[[str, str | None, float, bool], None] | None):
+        """ Set a function called when a request that waits for a response completes, or
+        None to remove it. It is called with the topic type, the lua function name (for
+        `executeLuaFunction` and library calls, otherwise None), the latency in seconds
+        and whether the request failed. """
+
+        self._onRequestComplete = callback
+
+    def stats(self) -> dict:
+        """ Get a snapshot of the client's activity: message and byte counters,
+        outstanding requests, open topics and their backlogs, property cache and library
+        statistics and, if `enableMetrics()` was called, latency histograms per topic
+        type and per lua function. The backlog of a shared subscription is that of its
+        slowest subscriber, with the backlog of each subscriber under `consumers`. """
+
+        socket = self._socket
+        backlog = {}
+        for topic, callback in self._callbacks.items():
+            owner = getattr(callback, '__self__', None)
+            if isinstance(owner, TopicQueue):
+                backlog[topic] = { 'backlog': len(owner), 'dropped': owner.dropped }
+            elif isinstance(owner, SharedTopic):
+                # The backlog of the slowest consumer, and the drops of all of them
+                consumers = owner.queueStats()
+                if consumers:
+                    backlog[topic] = {
+                        'backlog': max(consumer['backlog'] for consumer in consumers),
+                        'dropped': sum(consumer['dropped'] for consumer in consumers),
+                        'consumers': consumers
+                    }
+
+        stats = {
+            'messagesSent': socket.messagesSent,
+            'bytesSent': socket.bytesSent,
+            'messagesReceived': socket.messagesReceived,
+            'bytesReceived': socket.bytesReceived,
+            'bufferedBytes': socket._outBytes,
+            'pendingRequests': len(self._pending),
+            'topics': len(self._callbacks),
+            'sharedTopics': self._sharedTopicStats(),
+            'subscriptionBacklog': backlog,
+            'propertyCache': self.propertyCacheStats(),
+            'library': self.libraryLoadStats()
+        }
+        if self._decoder is not None:
+            stats['decoding'] = self._decoder.stats()
+        if self._metrics is not None:
+            stats.update(self._metrics.snapshot())
+        if self._stallMonitor is not None:
+            stats['eventLoopStalls'] = self._stallMonitor.snapshot()
+        return stats
+
+    def _sharedTopicStats(self) -> dict:
+        return {
+            'topics': len(self._sharedTopics),
+            'consumers': sum(shared.consumers for shared in self._sharedTopics.values())
+        }
+
+    def batch(self, timeout: float | None = None, mergeScripts: bool = False) -> Batch:
+        """ Collect lua calls and pipeline them on the connection, without waiting for
+        each response. Use as an async context manager: \n
+        | `async with api.batch() as batch:`
+        |     `await api.executeLuaScript("openspace.printInfo('a')", False)`
+        |     `await openspace.time.setPause(True)`
+        | `print(batch.results)`
+
+        Inside the block, `executeLuaScript`, `executeLuaFunction` and the functions of
+        `library()` send their request and return immediately. \n
+        :param `timeout` - Seconds to wait for all responses when the block exits. \n
+        :param `mergeScripts` - Send consecutive scripts without a return value as a
+        single message, each in its own `do ... end` block. A runtime error in one of them
+        then also stops the ones after it. \n
+        :return - A Batch. Once the block has exited, `batch.results` holds the result or
+        exception of each call, in the order the calls were made. """
+
+        return Batch(self, timeout, self._orderedConnection(), mergeScripts)
+
+    def _requestConnections(self) -> list:
+        """ The connections requests are sent on. """
+
+        return [self]
+
+    def _orderedConnection(self) -> 'Api':
+        """ The connection that fire-and-forget messages and batches are sent on. Messages
+        on one connection are applied by OpenSpace in the order they were sent. """
+
+        return self
+
+    def _sendTopic(self, type: str, payload):
+        """ Send a message on a new topic without listening for any response. """
+
+        if not isinstance(type, str):
+            raise ValueError("Topic type must be a string")
+
+        topic = self._nextTopicId
+        self._nextTopicId += 1
+
+        self._socket.send(self._codec.dumps({
+            'topic': topic,
+            'type': type,
+            'payload': payload
+        }))
+
+    def startTopic(self, type: str, payload, delivery: str = 'all', maxSize: int = 0,
+                   callback: Callable[[any], None] | None = None) -> Topic:
         """ Initialize a new channel of communication. \n
 
         :param `type` - A string specifying the type of topic to construct.
         See OpenSpace's server module for available topic types. \n
         :param `payload` - An object representing the topic \n
+        :param `delivery` - How messages are buffered until they are consumed: 'all'
+        (unbounded), 'latest' (only the most recent message), 'dropOldest' or 'dropNewest'
+        (at most `maxSize` messages) or 'block' (stop reading from the socket while
+        `maxSize` messages are waiting). `Topic.dropped` counts discarded messages. \n
+        :param `maxSize` - The capacity for the bounded delivery modes. \n
+        :param `callback` - If set, each message is passed to this function as it arrives
+        instead of being queued, and the topic's iterator yields nothing. \n
         :return - A Topic object. """
 
         if not isinstance(type, str):
@@ -85,28 +519,37 @@ class Api:
         topic = self._nextTopicId
         self._nextTopicId += 1
 
+        if callback is None:
+            queue = TopicQueue(
+                delivery, maxSize, self._socket.pauseReading, self._socket.resumeReading
+            )
+            self._callbacks[topic] = queue.put_nowait
+        else:
+            queue = None
+            self._callbacks[topic] = callback
+
         messageObject = {
             'topic': topic,
             'type': type,
             'payload': payload
         }
 
-        self._socket.send(json.dumps(messageObject))
+        message = self._codec.dumps(messageObject)
+        self._topicStarts[topic] = message
+        self._socket.send(message)
 
         cancel_event = asyncio.Event()
 
         def cancel ():
-            # Temp fix to remove callback, see TODO in iterator()
             cancel_event.set()
             self._callbacks.pop(topic, None)
+            self._topicStarts.pop(topic, None)
+            if queue is not None:
+                queue.close()
 
         async def iterator():
-            # TODO: if we are just iterating once we never return to the while
-            # loop to check if cancel_event is set. As such we wont remove the callback
-            # function.
-            queue = asyncio.Queue()
-            self._callbacks[topic] = lambda payload: queue.put_nowait(payload)
-            while not cancel_event.is_set():
+            # Cancelling closes the queue, which ends a pending `queue.get()` right away
+            while queue is not None and not cancel_event.is_set():
                 try:
                     # Yield the coroutine for the caller to await, this should allow us
                     # to await several callbacks without them blocking eachother.
@@ -118,6 +561,7 @@ class Api:
 
             # Topic has been canceled, remove callback
             self._callbacks.pop(topic, None)
+            self._topicStarts.pop(topic, None)
 
         it = iterator()
 
@@ -126,90 +570,332 @@ class Api:
                 'topic': topic,
                 'payload': payload
             }
-            self._socket.send(json.dumps(messageObject))
+            self._socket.send(self._codec.dumps(messageObject))
 
 
-        return Topic(it, talk, cancel)
+        return Topic(it, talk, cancel, queue)
 
     async def nextValue(self, topic: Topic):
         """ Utility function to iterate a topic and retrieve the next value. """
 
-        future = await anext(topic.iterator())
-        result = await future
-        return result
+        return await topic.next()
+
+    # Utility to convert a property value to a namedtuple, see also the `decode`
+    # parameter of `getProperty()` and `subscribeToProperty()`
+    toNamedTuple = staticmethod(toNamedTuple)
 
-    async def authenticate(self, secret):
+    async def authenticate(self, secret, timeout: float | None = None):
         """ Authenticate this client. \n
         This must be done if the client is not whitelisted in the openspace.cfg. \n
-        :param `secret` - The secret used to authenticate with OpenSpace. """
+        :param `secret` - The secret used to authenticate with OpenSpace. \n
+        :param `timeout` - Seconds to wait for a response. """
 
-        topic = self.startTopic('authorize', { "key": secret })
-        response = await self.nextValue(topic)
-        topic.cancel()
+        response = await self._request('authorize', { "key": secret }, timeout)
+        # Kept to re-authenticate after reconnecting
+        self._secret = secret
         return response
 
-    def setProperty(self, property, value):
+    def setProperty(self, property, value, deadline: float | None = None):
         """ Set a property \n
         :param `property` - The URI of the property to set. \n
-        :param `value` - The value to set the property to. """
+        :param `value` - The value to set the property to. \n
+        :param `deadline` - With the write scheduler enabled, the write is sent within this
+        many seconds even if that is before the next tick. Ignored otherwise. """
 
         if not isinstance(property, str):
             raise ValueError("Property must be a string")
 
-        topic = self.startTopic('set', { "property": property, "value": value })
-        topic.cancel()
+        if self._writeScheduler is not None:
+            self._writeScheduler.set(property, value, deadline)
+            return
+
+        self._rememberWritten(property, value)
+        self._sendTopic('set', { "property": property, "value": value })
+
+    def _rememberWritten(self, property: str, value):
+        """ Remember the value written to a property, to skip writing it again. """
+
+        if not _matchesMany(property):
+            # A copy, so that changing a list in place and writing it again is not skipped
+            if isinstance(value, (list, dict)):
+                value = copy.deepcopy(value)
+            self._lastWritten[property] = value
+            return
+
+        # The properties the URI covers are not known here, forget every value it may
+        # have overwritten. Group tags can match any property
+        if '{' in property:
+            self._lastWritten = {}
+            return
+        pattern = _wildcardPattern(property)
+        for uri in [uri for uri in self._lastWritten if pattern.fullmatch(uri)]:
+            del self._lastWritten[uri]
+
+    def enableWriteScheduler(self, tickRate: float = 60.0, interpolate: float | None = None,
+                             clock = None) -> WriteScheduler:
+        """ Buffer `setProperty` calls and send them once per tick, with the last value
+        written to each property within a tick winning. This bounds the bandwidth used
+        by the tick rate rather than by how often properties are set. Must be called from
+        the event loop. \n
+        :param `tickRate` - Flushes per second. \n
+        :param `interpolate` - If set, numeric properties move to a new value linearly
+        over this many seconds, with intermediate values written on every tick. \n
+        :param `clock` - The clock driving the ticks, see `VirtualClock` for tests. \n
+        :return - The `WriteScheduler`, for `flush()` and `stats()`. """
+
+        if self._writeScheduler is not None:
+            raise ValueError("The write scheduler is already enabled")
+
+        scheduler = WriteScheduler(self, tickRate, interpolate, clock)
+        self._writeScheduler = scheduler
+        scheduler.start()
+        return scheduler
+
+    async def disableWriteScheduler(self, flush: bool = True):
+        """ Send `setProperty` calls directly again. \n
+        :param `flush` - Whether to write values that are still buffered. """
+
+        scheduler = self._writeScheduler
+        self._writeScheduler = None
+        if scheduler is not None:
+            await scheduler.stop(flush)
+
+    def _lastKnownValue(self, property):
+        """ The value a property is believed to have, from the property cache or the last
+        write. \n
+        :return - A tuple (found, value). """
+
+        found, payload = self._propertyCache.peek(property)
+        if found and isinstance(payload, dict) and 'Value' in payload:
+            return True, payload['Value']
+        if property in self._lastWritten:
+            return True, self._lastWritten[property]
+        return False, None
+
+    async def setProperties(self, properties: dict, force: bool = False,
+                            shouldBeSynchronized: bool = True) -> dict:
+        """ Set many properties at once. \n
+        Writes are packed into as few lua scripts as possible, and writes of a value a
+        property already has (according to the property cache or the last write made
+        through this Api) are skipped. \n
+        :param `properties` - A dictionary mapping property URIs to values. URIs may
+        contain wildcards (`*`) or group tags (`{tag}`), as supported by
+        `openspace.setPropertyValue`. Such writes are always sent. \n
+        :param `force` - If true, all values are written, even unchanged ones. \n
+        :param `shouldBeSynchronized` - Whether the writes should be synchronized on a
+        cluster. \n
+        :return - A dictionary with the number of writes `sent` and `suppressed`, and the
+        number of `messages` used. """
+
+        if self._writeScheduler is not None:
+            # Values still buffered by the scheduler are older than these, and must not
+            # overwrite them on its next tick
+            uris = [property for property in properties if isinstance(property, str)]
+            self._writeScheduler._discard(
+                [uri for uri in uris if not _matchesMany(uri)],
+                [_wildcardPattern(uri) for uri in uris if '*' in uri and '{' not in uri]
+            )
+        return await self._writeProperties(properties, force, shouldBeSynchronized)
+
+    async def _writeProperties(self, properties: dict, force: bool = False,
+                               shouldBeSynchronized: bool = True) -> dict:
+        """ Write properties like `setProperties`, without touching the values buffered
+        by the write scheduler, which flushes them through here. """
+
+        lines = []
+        suppressed = 0
+        for property, value in properties.items():
+            if not isinstance(property, str):
+                raise ValueError("Property must be a string")
+
+            # Writes to several properties are never skipped, they may have different
+            # values
+            many = _matchesMany(property)
+            if not force and not many:
+                found, current = self._lastKnownValue(property)
+                if found and current == value:
+                    suppressed += 1
+                    continue
+
+            # Matching URIs against wildcards and tags is slower in OpenSpace, only pay
+            # for it when the URI needs it
+            if many:
+                function = 'openspace.setPropertyValue'
+            else:
+                function = 'openspace.setPropertyValueSingle'
+            lines.append(f"{function}({toLua(property)}, {toLua(value)})")
+            self._rememberWritten(property, value)
+
+        messages = 0
+        start = 0
+        while start < len(lines):
+            end = start
+            size = 0
+            while end < len(lines) and (end == start or size + len(lines[end]) < MAX_SCRIPT_SIZE):
+                size += len(lines[end]) + 1
+                end += 1
+
+            await self.drain()
+            self._sendTopic('luascript', {
+                'script': '\n'.join(lines[start:end]),
+                'return': False,
+                'shouldBeSynchronized': shouldBeSynchronized
+            })
+            messages += 1
+            start = end
+
+        return { 'sent': len(lines), 'suppressed': suppressed, 'messages': messages }
 
-    async def getProperty(self, property):
+    async def getProperty(self, property, timeout: float | None = None, cached: bool = False,
+                          decode: bool | str | TypedDecoder = False):
         """ Get a property. \n
         :param `property` the URI of the property to get.\n
+        :param `timeout` - Seconds to wait for a response. \n
+        :param `cached` - If true, the value is read from the property cache without any
+        network traffic when the property is watched. Otherwise the property is fetched
+        and then watched, so that subsequent cached reads are served locally. \n
+        :param `decode` - If set, the value is converted by a `TypedDecoder` into a
+        namedtuple with cached types, and its arrays into lists. May also be one of
+        `ARRAY_TYPES` ('list', 'tuple' or 'numpy') or a TypedDecoder. \n
         :return `value` - The value of the property. """
 
         if not isinstance(property, str):
             raise ValueError("Property must be a string")
+        decoder = getDecoder(decode)
 
-        topic = self.startTopic('get', { "property": property })
+        if cached:
+            found, value = self._propertyCache.lookup(property)
+            if found:
+                return value if decoder is None else decoder(value, 'Property')
 
-        response = await self.nextValue(topic)
-        topic.cancel()
+        value = await self._request('get', { "property": property }, timeout)
+        if cached:
+            self._propertyCache.watch(property, value, True)
+        return value if decoder is None else decoder(value, 'Property')
 
-        return response
+    async def watch(self, property, timeout: float | None = None):
+        """ Keep a property fresh in the property cache through a subscription, so that
+        `getProperty(property, cached=True)` is served locally. \n
+        :param `property` - The URI of the property to watch. \n
+        :param `timeout` - Seconds to wait for the first value. \n
+        :return - The current value of the property. """
 
-    async def getDocumentation(self, type: str):
+        if not isinstance(property, str):
+            raise ValueError("Property must be a string")
+
+        entry = self._propertyCache.watch(property)
+        await asyncio.wait_for(entry.hasValue.wait(), timeout or self._requestTimeout)
+        return entry.value
+
+    def unwatch(self, property):
+        """ Stop watching a property and remove it from the property cache. """
+
+        self._propertyCache.unwatch(property)
+
+    def propertyCacheStats(self) -> dict:
+        """ Get the property cache's hits, misses, evictions and number of
+        subscriptions. """
+
+        return self._propertyCache.stats()
+
+    async def getDocumentation(self, type: str, timeout: float | None = None):
         """ :param type - The type of documentation to get. For available types, check
-        documentationtopic.cpp in OpenSpace's server module. """
+        documentationtopic.cpp in OpenSpace's server module. \n
+        :param `timeout` - Seconds to wait for a response. """
 
-        topic = self.startTopic('documentation',  { "type": type } )
+        return await self._request('documentation', { "type": type }, timeout)
 
-        response = await self.nextValue(topic)
-        topic.cancel()
+    def _startSharedTopic(self, type: str, payload, callback):
+        """ Start the topic behind a `SharedTopic`. \n
+        :return - A tuple of the Topic and the Transport it lives on. """
 
-        return response
+        return self.startTopic(type, payload, callback=callback), self._socket
 
-    def subscribeToProperty(self, property):
+    def _startRawTopic(self, type: str, payload, callback: Callable[[bytes], None]) -> Topic:
+        """ Start a topic whose messages are passed to `callback` as they were received,
+        without decoding them. """
+
+        topic = self._nextTopicId
+        started = self.startTopic(type, payload, callback=callback)
+        self._rawCallbacks[topic] = callback
+
+        def cancel():
+            self._rawCallbacks.pop(topic, None)
+            started.cancel()
+
+        return Topic(started.iterator(), started.talk, cancel)
+
+    def _subscribeShared(self, key, type: str, payload, stop, replayLast: bool,
+                         delivery: str, maxSize: int, callback, decode = None) -> Topic:
+        shared = self._sharedTopics.get(key)
+        if shared is None or shared.closed:
+            shared = SharedTopic(self, key, type, payload, stop, replayLast)
+            self._sharedTopics[key] = shared
+        return shared.subscribe(delivery, maxSize, callback, decode)
+
+    def subscribeToProperty(self, property, delivery: str = 'all', maxSize: int = 0,
+                            callback: Callable[[any], None] | None = None,
+                            shared: bool = True, decode: bool | str | TypedDecoder = False):
         """ Subscribe to a property.\n
         :param `property`- The URI of the property to subscribe to.\n
+        :param `delivery` - How updates are buffered, see `startTopic()`. Use 'latest' if
+        only the current value matters.\n
+        :param `maxSize` - The capacity for the bounded delivery modes.\n
+        :param `callback` - If set, updates are passed to this function as they arrive
+        instead of being queued.\n
+        :param `shared` - If true, subscriptions to the same property share a single
+        subscription in OpenSpace, and its updates are decoded once and passed to every
+        subscriber. It is stopped when the last subscriber cancels. A subscriber can
+        only stop its own share, other messages sent with `talk()` raise `ValueError`.\n
+        :param `decode` - Convert the updates, see `getProperty()`. Queued updates are
+        converted when they are consumed, so updates discarded by the delivery mode cost
+        nothing.\n
         :return `Topic` - A topic object to represent the subscription topic.
         when cancelled, this object will unsubscribe to the property. """
         if not isinstance(property, str):
             raise ValueError("Property must be a string")
 
-        topic = self.startTopic('subscribe', {
+        decoder = getDecoder(decode)
+        convert = None
+        if decoder is not None and callback is not None:
+            receive = callback
+            callback = lambda value: receive(decoder(value, 'Property'))
+        elif decoder is not None:
+            convert = lambda value: decoder(value, 'Property')
+
+        payload = {
             'event': 'start_subscription',
             'property': property
-        })
+        }
+        stop = {
+            'event': 'stop_subscription'
+        }
+
+        if shared:
+            # OpenSpace sends the current value when a subscription starts, later
+            # subscribers get it from the last update instead
+            return self._subscribeShared(
+                ('subscribe', property), 'subscribe', payload, stop, True,
+                delivery, maxSize, callback, convert
+            )
+
+        topic = self.startTopic('subscribe', payload, delivery, maxSize, callback)
 
         def cancel():
-            topic.talk({
-                'event': 'stop_subscription'
-            })
+            topic.talk(stop)
             topic.cancel()
 
-        return Topic(topic.iterator(), topic.talk, cancel)
+        return Topic(topic.iterator(), topic.talk, cancel, topic._queue, convert, topic.cancel)
 
-    def subscribeToEvent(self, events):
+    def subscribeToEvent(self, events, delivery: str = 'all', maxSize: int = 0,
+                         shared: bool = True):
         """ Subscribe to an event. \n
         :param `event` - The name of the event to subscribe to. For available events,
         check event.h in OpenSpace core module. \n
+        :param `delivery` - How events are buffered, see `startTopic()`. \n
+        :param `maxSize` - The capacity for the bounded delivery modes. \n
+        :param `shared` - If true, subscriptions to the same events share a single
+        subscription in OpenSpace, see `subscribeToProperty()`. \n
         :return `Topic` - A topic object to represent the subscription topic.
         when cancelled, this object will unsubscribe to the event. """
 
@@ -221,22 +907,35 @@ class Api:
                 if not isinstance(event, str):
                     raise ValueError(f"Event {event} in list is not a string")
 
-        topic = self.startTopic('event', {
+        payload = {
             'event': events,
             'status': 'start_subscription'
-        })
+        }
+        stop = {
+            "event": events,
+            'status': 'stop_subscription'
+        }
+
+        if shared:
+            subject = tuple(events) if isinstance(events, list) else events
+            return self._subscribeShared(
+                ('event', subject), 'event', payload, stop, False, delivery, maxSize, None
+            )
+
+        topic = self.startTopic('event', payload, delivery, maxSize)
 
         def cancel():
-            topic.talk({
-                "event": events,
-                'status': 'stop_subscription'
-            })
+            topic.talk(stop)
             topic.cancel()
 
-        return Topic(topic.iterator(), topic.talk, cancel)
+        return Topic(topic.iterator(), topic.talk, cancel, topic._queue, None, topic.cancel)
 
-
-    def subscribeToLogMessages(self, settings, callback: Callable[[any], None]):
+    def subscribeToLogMessages(self, settings, callback: Callable[[any], None] | None = None,
+                               batched: bool = False, minLevel: str | None = None,
+                               categories = None,
+                               batchInterval: float = DEFAULT_BATCH_INTERVAL,
+                               batchSize: int = DEFAULT_BATCH_SIZE,
+                               maxBuffered: int = DEFAULT_MAX_BUFFERED, sink = None):
         """ Subscribe to error messages. \n
         :param `settings` - The settings for the error subscription. Possible settings are \n
         | `timeStamping`: [True, False] - Whether the error messages should be timestamped.
@@ -248,12 +947,32 @@ class Api:
         :param `callback` - The callback function to call when new messages are recieved
         from OpenSpace. The function takes one parameter `message`
 
+        :param `batched` - If true, or if any of the following options is given, the
+        messages are delivered by a `LogStream`: the callback is called with a list of
+        messages at most every `batchInterval` seconds or `batchSize` messages, from a
+        separate task. \n
+        :param `minLevel`, `categories` - Discard messages below this level, or of other
+        categories, before they are decoded. \n
+        :param `maxBuffered` - The number of messages buffered until they are delivered,
+        older messages are dropped when it is exceeded. \n
+        :param `sink` - A file path, asyncio StreamWriter or object with a `write(bytes)`
+        method the text of the messages is written to, with or without a callback. \n
+
         :return `cancel` - A coroutine function, when called the topic unsubscribes
-        from the log messages.
+        from the log messages. For batched delivery this is the `LogStream`, which also
+        has `stats()`.
         """
         if not isinstance(settings, dict):
             raise ValueError("Settings must be a dictionary")
 
+        if batched or minLevel is not None or categories is not None or sink is not None:
+            return LogStream(
+                self, settings, callback, minLevel, categories, batchInterval, batchSize,
+                maxBuffered, sink
+            )
+        if callback is None:
+            raise ValueError("A callback or sink is required")
+
         topic = self.startTopic('errorLog', {
             'event': 'start_subscription',
             'settings': settings
@@ -277,9 +996,7 @@ class Api:
             topic.cancel()
 
         async def subscribeLoop():
-            async for future in topic.iterator():
-                message = await future
-
+            async for message in topic:
                 if cancelTopic.is_set():
                     return
 
@@ -288,90 +1005,168 @@ class Api:
         task = asyncio.create_task(subscribeLoop())
         return cancel
 
-    async def executeLuaScript(self, script, getReturnValue = True, shouldBeSynchronized = True):
+    async def executeLuaScript(self, script, getReturnValue = True, shouldBeSynchronized = True,
+                               timeout: float | None = None,
+                               decode: bool | str | TypedDecoder = False):
         """ Execute a lua script. \n
         :param `script` - The lua script to execute. \n
         :param `getReturnValue`- Specified whether the return value should be collected. \n
         :param `shouldBeSynchronized  - Specified whether the script should be
         synchronized on a cluster. \n
+        :param `timeout` - Seconds to wait for the return value. \n
+        :param `decode` - If set, the return value is converted by a `TypedDecoder`: the
+        table of return values and other lua array tables become sequences, see
+        `getProperty()`. \n
         :return The return value of the script, if `getReturnValue` is true, otherwise
         undefined. """
 
         if not isinstance(script, str):
             raise ValueError("Script must be a string")
+        decoder = getDecoder(decode)
+
+        batch = activeBatch(self)
+        if batch is not None:
+            if getReturnValue:
+                batch._flushScripts()
+                return batch._add(batch._connection._startRequest('luascript', {
+                    'script': script,
+                    'return': True,
+                    'shouldBeSynchronized': shouldBeSynchronized
+                }), decoder)
+            return batch._addScript(script, shouldBeSynchronized)
 
-        topic = self.startTopic('luascript', {
+        payload = {
             'script': script,
             'return': getReturnValue,
             'shouldBeSynchronized': shouldBeSynchronized
-        })
+        }
 
         if getReturnValue:
-            response = await self.nextValue(topic)
-            topic.cancel()
-            return response
+            result = await self._request('luascript', payload, timeout)
+            return result if decoder is None else decoder(result, 'Result')
         else:
-            topic.cancel()
+            await self.drain()
+            self._sendTopic('luascript', payload)
 
-    async def executeLuaFunction(self, function: str, args, getReturnValue = True):
+    async def executeLuaFunction(self, function: str, args, getReturnValue = True,
+                                 timeout: float | None = None,
+                                 decode: bool | str | TypedDecoder = False):
         """ Executa a lua function from the OpenSpace library. \n
         :param `function`- The lua function to execute (for example
         `openspace.addSceneGraphNode`) \n
         :param `getReturnValue`- Specified whether the return value should be collected. \n
+        :param `timeout` - Seconds to wait for the return value. \n
+        :param `decode` - Convert the return value, see `executeLuaScript()`. \n
         :return The return value of the script, if `getReturnValue` is true, otherwise
         undefined. """
 
         if not isinstance(function, str):
             raise ValueError("Function type must be a string")
+        decoder = getDecoder(decode)
 
         payload = {
             'function': function,
             'arguments': args,
             'return': True
         }
-        topic = self.startTopic('luascript', payload)
+
+        batch = activeBatch(self)
+        if batch is not None:
+            # Scripts queued earlier in the batch must be sent before this call
+            batch._flushScripts()
+            if getReturnValue:
+                future = batch._connection._startRequest('luascript', payload)
+                return batch._add(future, decoder)
+            batch._connection._sendTopic('luascript', payload)
+            return batch._add()
 
         if getReturnValue:
-            response = await self.nextValue(topic)
-            topic.cancel()
-            return response
+            result = await self._request('luascript', payload, timeout)
+            return result if decoder is None else decoder(result, 'Result')
         else:
-            topic.cancel()
-
-    async def library(self, wrapper: None | Callable = None) -> NamedTuple:
-        """ Get an object representing the OpenSpace lua libarary. \n
+            await self.drain()
+            self._sendTopic('luascript', payload)
+
+    async def _documentationKey(self) -> str:
+        """ Get the key identifying the documentation of the connected OpenSpace. Falls
+        back to the server address if the version can not be retrieved. """
+
+        try:
+            version = await self._request('version', {}, 2.0)
+            return self._codec.dumps(version).decode()
+        except (asyncio.TimeoutError, ConnectionError, RuntimeError):
+            return f"{self._socket._address}:{self._socket._port}"
+
+    async def _refreshDocumentationCache(self, docCache, key, cachedHash):
+        try:
+            index = libraryIndex(await self.getDocumentation('lua'))
+            self._libraryLoad['refreshed'] = indexHash(index) != cachedHash
+            if self._libraryLoad['refreshed']:
+                docCache.store(key, index)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Could not refresh documentation cache: {e}")
+
+    async def library(self, wrapper: None | Callable = None, cache: bool | str = False,
+                      decode: bool | str | TypedDecoder = False) -> LuaLibrary:
+        """ Get an object representing the OpenSpace lua libarary. Functions are
+        accessed as attributes, for example `openspace.time.UTC()`, and are only built
+        when first used. \n
         :param wrapper: if set, wraps all API calls (may be used to make them synchronous)
+        :param cache: if set, the structure of the library is cached on disk per OpenSpace
+        version and a cached copy is used instead of downloading the documentation. The
+        cache is then refreshed in the background for the next start. May be a directory
+        path, otherwise the user cache directory is used. See `libraryLoadStats()`.
+        :param decode: if set, the return values of the functions are converted, see
+        `executeLuaScript()`. For example, with 'numpy' positions are returned as NumPy
+        arrays.
         :return - The lua library, mapped to async python functions. """
 
+        decoder = getDecoder(decode)
+        if decoder is None:
+            returnValue = _firstReturnValue
+        else:
+            returnValue = lambda luaTable: decoder(_firstReturnValue(luaTable), 'Result')
+
         async def async_lua_call(functionName, *args):
             try:
                 luaTable = await self.executeLuaFunction(functionName, args)
-                if luaTable:
-                    return luaTable['1']
-                return None
+                if isinstance(luaTable, BatchCall):
+                    # Inside a batch, the return value is extracted once it arrives
+                    luaTable._transform = returnValue
+                    return luaTable
+                return returnValue(luaTable)
             except Exception as e:
                 print("Lua exception error: \n", e)
 
-        docs = await self.getDocumentation('lua')
-
-        pyLibrary = {}
-
-        for lib in docs:
-            subPyLibrary = {}
-            libraryName = lib['library']
-            if not libraryName: # library is empty string
-                subPyLibrary = pyLibrary
-            else:
-                pyLibrary[libraryName] = {}
-                subPyLibrary = pyLibrary[libraryName] # reference to the sublibrary
-
-            for func in lib['functions']:
-                _lib = '' if subPyLibrary == pyLibrary else libraryName + '.'
-                fullFunctionName = 'openspace.' + _lib + func['name']
-
-                lua_call = partial(async_lua_call, fullFunctionName)
-                if wrapper is not None:
-                    lua_call = partial(wrapper, lua_call)
-                subPyLibrary[func['name']] = lua_call
-
-        return toNamedTuple(pyLibrary, libraryName)
\ No newline at end of file
+        start = time.perf_counter()
+        index = None
+        if cache:
+            docCache = DocumentationCache(cache if isinstance(cache, str) else None)
+            key = await self._documentationKey()
+            index, cachedHash = docCache.load(key)
+            if index is not None:
+                self._libraryLoad = { 'source': 'cache', 'refreshed': None }
+                self._libraryRefresh = asyncio.create_task(
+                    self._refreshDocumentationCache(docCache, key, cachedHash),
+                    name="Refresh documentation cache"
+                )
+
+        if index is None:
+            index = libraryIndex(await self.getDocumentation('lua'))
+            self._libraryLoad = { 'source': 'network', 'refreshed': None }
+            if cache:
+                docCache.store(key, index)
+
+        library = LuaLibrary(index, async_lua_call, wrapper)
+        self._libraryLoad['seconds'] = time.perf_counter() - start
+        return library
+
+    def libraryLoadStats(self) -> dict:
+        """ Get how the last call to `library()` was served. \n
+        :return - A dictionary with `source` ('cache' or 'network'), `seconds` (the time
+        spent in `library()`) and `refreshed` (whether the background refresh found newer
+        documentation, None while it is running or when the cache was not used). """
+
+        return dict(self._libraryLoad)
@@ -0,0 +1,137 @@
+import asyncio
+from contextvars import ContextVar
+
+# The batch that is active in the current task, if any
+_currentBatch = ContextVar('openspace_batch', default=None)
+
+class BatchCall:
+    """ A call that was made inside a batch. (Only for internal use) \n
+    Its result is available once the batch has completed. """
+
+    def __init__(self, future: asyncio.Future | None = None, transform = None):
+        self._future = future
+        self._transform = transform
+        self._result = None
+        self._exception = None
+
+    def _complete(self):
+        if self._future is None:
+            return
+        if self._future.cancelled():
+            self._exception = asyncio.CancelledError()
+            return
+        self._exception = self._future.exception()
+        if self._exception is None:
+            try:
+                result = self._future.result()
+                self._result = self._transform(result) if self._transform else result
+            except Exception as e:
+                self._exception = e
+
+    def result(self):
+        """ Get the result of the call. Raises the exception of the call if it failed. """
+
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+class Batch:
+    """ Collects Lua calls made inside an `Api.batch()` block and pipelines them on the
+    connection without waiting for each response. (Only for internal use, see
+    `Api.batch()`) \n
+    :param `api` - The Api the batch collects calls of. \n
+    :param `connection` - The Api all calls are sent on, so that they reach OpenSpace in
+    order. Defaults to `api`. \n
+    :param `mergeScripts` - Whether consecutive scripts without return values are sent
+    as one message. """
+
+    def __init__(self, api, timeout: float | None = None, connection = None,
+                 mergeScripts: bool = False):
+        self._api = api
+        self._connection = connection or api
+        self._timeout = timeout
+        self._mergeScripts = mergeScripts
+        self._calls = []
+        # Consecutive scripts without return values, merged into one message
+        self._scripts = []
+        self._scriptsSynchronized = True
+        self._token = None
+        self.results = None
+
+    def _add(self, future: asyncio.Future | None = None, transform = None) -> BatchCall:
+        """ Add a request to the batch, after it has been sent. Queued scripts must be
+        flushed before sending it. A call without a future has the result None. """
+
+        call = BatchCall(future, transform)
+        self._calls.append(call)
+        return call
+
+    def _addScript(self, script: str, shouldBeSynchronized: bool) -> BatchCall:
+        """ Add a script without a return value. If scripts are merged, consecutive
+        scripts are sent as a single `luascript` message. """
+
+        if not self._mergeScripts:
+            self._connection._sendTopic('luascript', {
+                'script': script,
+                'return': False,
+                'shouldBeSynchronized': shouldBeSynchronized
+            })
+            return self._add()
+
+        if self._scripts and shouldBeSynchronized != self._scriptsSynchronized:
+            self._flushScripts()
+        self._scripts.append(script)
+        self._scriptsSynchronized = shouldBeSynchronized
+        return self._add()
+
+    def _flushScripts(self):
+        if not self._scripts:
+            return
+
+        if len(self._scripts) == 1:
+            script = self._scripts[0]
+        else:
+            # A block per script keeps its locals to itself, and lets it end with `return`
+            script = '\n'.join(f"do\n{script}\nend" for script in self._scripts)
+        self._connection._sendTopic('luascript', {
+            'script': script,
+            'return': False,
+            'shouldBeSynchronized': self._scriptsSynchronized
+        })
+        self._scripts = []
+
+    async def __aenter__(self):
+        if _currentBatch.get() is not None:
+            raise RuntimeError("Batches can not be nested")
+        self._token = _currentBatch.set(self)
+        return self
+
+    async def __aexit__(self, excType, exc, traceback):
+        _currentBatch.reset(self._token)
+        futures = [call._future for call in self._calls if call._future is not None]
+
+        if excType is not None:
+            for future in futures:
+                future.cancel()
+            return False
+
+        self._flushScripts()
+        if futures:
+            done, pending = await asyncio.wait(futures, timeout=self._timeout)
+            for future in pending:
+                future.set_exception(TimeoutError("Batch timed out"))
+
+        results = []
+        for call in self._calls:
+            call._complete()
+            results.append(call._exception if call._exception is not None else call._result)
+        self.results = results
+        return False
+
+def activeBatch(api) -> Batch | None:
+    """ Get the batch that is active in the current task for the given api, if any. """
+
+    batch = _currentBatch.get()
+    if batch is not None and batch._api is api:
+        return batch
+    return None
@@ -0,0 +1,122 @@
+import json
+import re
+
+# Matches the value of a `"topic":` key, starting right after the key
+_TOPIC_VALUE = re.compile(rb'\s*(\d+)\s*[,}]')
+_TOPIC_KEY = b'"topic":'
+
+def _encodeDefault(obj):
+    """ Encode the values every codec accepts beyond plain JSON types: tuples, including
+    namedtuples, as arrays, and NumPy scalars and arrays as numbers and arrays. """
+
+    if isinstance(obj, tuple):
+        return list(obj)
+    # NumPy scalars and arrays, without importing NumPy
+    if hasattr(obj, 'tolist') and hasattr(obj, 'dtype'):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class Codec:
+    """ Encodes and decodes the JSON messages sent to and received from OpenSpace, using
+    the `json` module from the standard library. \n
+    All codecs encode the same values: JSON types, tuples and namedtuples as arrays, and
+    NumPy scalars and arrays. NaN and infinity are not valid JSON, `json` writes them as
+    `NaN` and `Infinity` while orjson and msgspec write `null`. OpenSpace reads neither as
+    a number, set such values through lua scripts instead (see `Api.setProperties`). """
+
+    name = 'json'
+
+    def dumps(self, obj) -> bytes:
+        """ Encode a Python object into a JSON message. """
+
+        return json.dumps(obj, default=_encodeDefault).encode()
+
+    def loads(self, data: bytes):
+        """ Decode a JSON message into a Python object. """
+
+        return json.loads(data)
+
+class OrjsonCodec(Codec):
+    """ Codec backed by `orjson`. """
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._loads = orjson.loads
+        self._dumps = orjson.dumps
+        # Like the `json` module, allow non-string dictionary keys such as Lua indices
+        self._options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj) -> bytes:
+        return self._dumps(obj, default=_encodeDefault, option=self._options)
+
+    def loads(self, data: bytes):
+        return self._loads(data)
+
+class MsgspecCodec(Codec):
+    """ Codec backed by `msgspec`. """
+
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+        self._encoder = msgspec.json.Encoder(enc_hook=_encodeDefault)
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj) -> bytes:
+        return self._encoder.encode(obj)
+
+    def loads(self, data: bytes):
+        return self._decoder.decode(data)
+
+# In order of preference
+CODECS = {
+    'orjson': OrjsonCodec,
+    'msgspec': MsgspecCodec,
+    'json': Codec,
+}
+
+def getCodec(name: str | None = None) -> Codec:
+    """ Get a codec by name. \n
+    :param `name` - One of 'orjson', 'msgspec' or 'json'. If not set, the fastest
+    installed codec is used. \n
+    :return - A Codec instance. """
+
+    if name is not None:
+        if name not in CODECS:
+            raise ValueError(f"Unknown codec '{name}', expected one of {list(CODECS)}")
+        return CODECS[name]()
+
+    for codec in CODECS.values():
+        try:
+            return codec()
+        except ImportError:
+            pass
+
+# Codecs of the worker processes used by `decodeWith`, by name
+_workerCodecs = {}
+
+def decodeWith(name: str, data: bytes):
+    """ Decode a message with the named codec. Codec instances can not be sent to worker
+    processes, so work submitted to them refers to the codec by name instead. """
+
+    codec = _workerCodecs.get(name)
+    if codec is None:
+        codec = _workerCodecs[name] = getCodec(name)
+    return codec.loads(data)
+
+def peekTopic(frame: bytes) -> int | None:
+    """ Cheaply extract the topic id from an encoded message, without decoding it. \n
+    :param `frame` - The encoded message. \n
+    :return - The topic id, or None if it could not be determined unambiguously (the key
+    is missing or occurs more than once). The message must then be decoded in full. """
+
+    index = frame.find(_TOPIC_KEY)
+    if index == -1 or frame.find(_TOPIC_KEY, index + 1) != -1:
+        return None
+
+    match = _TOPIC_VALUE.match(frame, index + len(_TOPIC_KEY))
+    if match is None:
+        return None
+    return int(match.group(1))
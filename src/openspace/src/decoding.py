@@ -0,0 +1,171 @@
+import keyword
+from collections import namedtuple
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# How `TypedDecoder` returns Lua array tables and JSON arrays:
+# 'list'  - Python lists.
+# 'tuple' - Python tuples, which are hashable and smaller.
+# 'numpy' - NumPy arrays for numeric vectors and matrices, such as positions, lists
+#           otherwise.
+ARRAY_TYPES = ('list', 'tuple', 'numpy')
+
+# The number of key shapes that are remembered. Beyond it, new shapes are decoded without
+# creating struct types for them, so that tables with ever changing keys do not leak
+MAX_SHAPES = 4096
+
+# Marks key shapes that are decoded as dictionaries
+_DICT = object()
+
+# What a table decodes to, by struct name and keys: a namedtuple class, the keys of a
+# Lua array table in index order, or _DICT. Shared by all decoders
+_shapes = {}
+
+# Struct types created by `toNamedTuple`, by name and keys
+_structTypes = {}
+
+_NUMBERS = (int, float)
+
+def _isIdentifier(name) -> bool:
+    return name.isidentifier() and not keyword.iskeyword(name) and not name.startswith('_')
+
+def _arrayOrder(keys: tuple) -> tuple | None:
+    """ Get the keys of a Lua array table ('1', '2', ...) in index order, or None if the
+    keys are not the indices 1 to n. The keys may come in any order, OpenSpace sorts
+    them as strings. """
+
+    count = len(keys)
+    if count == 0 or '1' not in keys:
+        return None
+    order = tuple(str(i) for i in range(1, count + 1))
+    return order if set(order) == set(keys) else None
+
+def _shape(name: str, keys: tuple):
+    order = _arrayOrder(keys)
+    if order is not None:
+        shape = order
+    elif all(_isIdentifier(key) for key in keys) and len(_shapes) < MAX_SHAPES:
+        shape = namedtuple(name if _isIdentifier(name) else 'Struct', keys)
+    else:
+        shape = _DICT
+
+    if len(_shapes) < MAX_SHAPES:
+        _shapes[(name, keys)] = shape
+    return shape
+
+def toNamedTuple(content: dict, name: str = "namedtuple") -> NamedTuple:
+    """ Recursively converts a `dictionary` to a `namedtuple`. The namedtuple class of
+    every name and set of keys is created once and reused. """
+
+    keys = tuple(content)
+    T = _structTypes.get((name, keys))
+    if T is None:
+        T = namedtuple(name, keys)
+        if len(_structTypes) < MAX_SHAPES:
+            _structTypes[(name, keys)] = T
+
+    values = []
+    for k, v in content.items():
+        if isinstance(v, dict):
+            values.append(toNamedTuple(v, k))
+        else:
+            values.append(v)
+
+    return T._make(values)
+
+class TypedDecoder:
+    """ Converts decoded JSON, such as property values and the return values of lua
+    scripts, into typed Python values. (See the `decode` parameter of
+    `Api.getProperty()`, `Api.subscribeToProperty()`, `Api.executeLuaScript()` and
+    `Api.library()`) \n
+    Lua array tables, which arrive as dictionaries with the keys '1', '2', ..., become
+    sequences. Other tables become namedtuples, named after the key they are stored
+    under, with one class per name and set of keys that is created once and shared by
+    all decoders. Tables whose keys are not valid identifiers stay dictionaries, and
+    empty tables become empty sequences. \n
+    :param `arrays` - How arrays are returned, one of `ARRAY_TYPES`. \n
+    :param `structs` - Whether tables become namedtuples. If false they stay
+    dictionaries, and only arrays are converted. """
+
+    def __init__(self, arrays: str = 'list', structs: bool = True):
+        if arrays not in ARRAY_TYPES:
+            raise ValueError(f"Arrays must be one of {ARRAY_TYPES}")
+        if arrays == 'numpy' and np is None:
+            raise ImportError("NumPy arrays require numpy, install it with `pip install numpy`")
+
+        self._structs = structs
+        if arrays == 'tuple':
+            self._sequence = tuple
+        elif arrays == 'numpy':
+            self._sequence = self._toArray
+        else:
+            self._sequence = lambda values: values
+
+    def __call__(self, value, name: str = 'Struct'):
+        """ Decode a value. \n
+        :param `name` - The name of the struct type if the value is a table. """
+
+        return self._decode(value, name)
+
+    def _decode(self, value, name):
+        kind = type(value)
+        if kind is dict:
+            return self._decodeTable(value, name)
+        if kind is list:
+            decode = self._decode
+            return self._sequence([decode(item, name) for item in value])
+        return value
+
+    def _decodeTable(self, table, name):
+        decode = self._decode
+        if not table:
+            return self._sequence([])
+
+        keys = tuple(table)
+        shape = _shapes.get((name, keys))
+        if shape is None:
+            shape = _shape(name, keys)
+
+        if type(shape) is tuple:
+            return self._sequence([decode(table[key], name) for key in shape])
+        if shape is _DICT or not self._structs:
+            return { key: decode(item, key) for key, item in table.items() }
+        return shape._make([decode(item, key) for key, item in table.items()])
+
+    @staticmethod
+    def _toArray(values):
+        if not values:
+            return np.empty(0)
+        first = values[0]
+        if type(first) in _NUMBERS:
+            if all(type(value) in _NUMBERS for value in values):
+                return np.asarray(values)
+        elif type(first) is np.ndarray:
+            # A matrix, given as a list of rows of the same length
+            shape = first.shape
+            if all(type(value) is np.ndarray and value.shape == shape for value in values):
+                return np.stack(values)
+        return values
+
+# The decoders used for `decode=True` and `decode='tuple'` etc., by array type
+_defaultDecoders = {}
+
+def getDecoder(decode) -> TypedDecoder | None:
+    """ Get the decoder for a `decode` parameter: False or None for no decoding, True for
+    the default decoder, one of `ARRAY_TYPES` or a TypedDecoder. """
+
+    if decode is None or decode is False:
+        return None
+    if isinstance(decode, TypedDecoder):
+        return decode
+
+    arrays = 'list' if decode is True else decode
+    decoder = _defaultDecoders.get(arrays)
+    if decoder is None:
+        decoder = TypedDecoder(arrays)
+        _defaultDecoders[arrays] = decoder
+    return decoder
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+from traceback import print_exc
+
+def defaultCacheDirectory() -> str:
+    """ Get the directory used for cached documentation when none is specified. """
+
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'openspace-api')
+
+def libraryIndex(docs) -> dict:
+    """ Derive the structure of the lua library from its documentation. \n
+    :param `docs` - The result of `Api.getDocumentation('lua')`. \n
+    :return - A dictionary mapping each library name to a list of its function names.
+    Functions in the root library are listed under the empty string. """
+
+    index = {}
+    for lib in docs:
+        functions = index.setdefault(lib['library'], [])
+        functions.extend(func['name'] for func in lib['functions'])
+    return index
+
+def indexHash(index: dict) -> str:
+    """ Get a hash identifying the content of a library index. """
+
+    return hashlib.sha256(json.dumps(index, sort_keys=True).encode()).hexdigest()
+
+class DocumentationCache:
+    """ Stores library indices on disk, keyed by OpenSpace version, so `Api.library()`
+    can start without downloading the documentation. (Only for internal use) \n
+    :param `directory` - The directory to store cache files in. """
+
+    def __init__(self, directory: str | None = None):
+        self._directory = directory or defaultCacheDirectory()
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha256(key.encode()).hexdigest()[:32]
+        return os.path.join(self._directory, f"lua-{name}.json")
+
+    def load(self, key: str) -> tuple[dict, str] | tuple[None, None]:
+        """ Load a cached library index. \n
+        :return - A tuple (index, hash), or (None, None) if nothing usable is cached. """
+
+        try:
+            with open(self._path(key), 'rb') as file:
+                content = json.load(file)
+            if content.get('key') != key:
+                return None, None
+            return content['index'], content['hash']
+        except FileNotFoundError:
+            return None, None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable documentation cache: {e}")
+            return None, None
+
+    def store(self, key: str, index: dict) -> str:
+        """ Store a library index, replacing any previous one for the key. \n
+        :return - The hash of the index. """
+
+        digest = indexHash(index)
+        path = self._path(key)
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            # Write to a temporary file first so readers never see a partial file
+            temporaryPath = f"{path}.{os.getpid()}.tmp"
+            with open(temporaryPath, 'w') as file:
+                json.dump({ 'key': key, 'hash': digest, 'index': index }, file)
+            os.replace(temporaryPath, path)
+        except OSError as e:
+            print(f"Could not write documentation cache: {e}")
+            print_exc()
+        return digest
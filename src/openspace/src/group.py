@@ -0,0 +1,269 @@
+import asyncio
+import time
+from collections import namedtuple
+from typing import Awaitable, Callable
+from .api import Api
+from .metrics import Histogram
+
+POLICIES = ('all', 'quorum', 'first')
+
+NodeResult = namedtuple('NodeResult', ['result', 'error', 'latency', 'done'])
+NodeResult.__doc__ = """ The outcome of a broadcast on one node. `error` is the exception
+the call raised, if any, and `latency` its duration in seconds. `done` is false if the
+broadcast returned before the node answered, because the node was lagging or the policy
+was satisfied without it. """
+
+class _Node:
+    def __init__(self, name, api):
+        self.name = name
+        self.api = api
+        self.connected = False
+        # Set when a call exceeded the group's timeout, until the node has caught up
+        self.lagging = False
+        self.latency = Histogram()
+        self.failures = 0
+        self.timeouts = 0
+
+class ApiGroup:
+    """ Drives several OpenSpace instances at once, such as the nodes of a dome, with one
+    `Api` per instance. Commands are broadcast to all nodes concurrently, so a broadcast
+    takes as long as the slowest node rather than the sum of all nodes. \n
+    Nodes that do not answer within `timeout` are marked as lagging. They still receive
+    every command, but broadcasts no longer wait for them until they have caught up,
+    so one slow node does not hold up the rest. Nodes that are not connected are
+    skipped. \n
+    :param `endpoints` - A list of (address, port) tuples, or a dictionary mapping node
+    names to (address, port) tuples. Nodes are named "address:port" by default. \n
+    :param `policy` - When a broadcast returns: 'all' (when every node that is not
+    lagging has answered), 'quorum' (when `quorum` nodes have answered successfully) or
+    'first' (when one node has answered successfully). \n
+    :param `quorum` - The number of successful nodes for the 'quorum' policy. Defaults
+    to a majority of the nodes. \n
+    :param `timeout` - Seconds a broadcast waits for a node before marking it as
+    lagging. None means wait indefinitely. \n
+    :param `secret` - If set, every node is authenticated with it on connect. \n
+    :param `apiClass` - The class to connect to each node with. \n
+    Remaining keyword arguments are passed to the `apiClass` constructor. """
+
+    def __init__(self, endpoints, policy: str = 'all', quorum: int | None = None,
+                 timeout: float | None = None, secret: str | None = None,
+                 apiClass = Api, **kwargs):
+        if isinstance(endpoints, dict):
+            endpoints = list(endpoints.items())
+        else:
+            endpoints = [(f"{address}:{port}", (address, port)) for address, port in endpoints]
+        if not endpoints:
+            raise ValueError("A group needs at least one endpoint")
+        self._checkPolicy(policy, quorum, len(endpoints))
+
+        self._nodes = [
+            _Node(name, apiClass(address, port, **kwargs))
+            for name, (address, port) in endpoints
+        ]
+        self._policy = policy
+        self._quorum = quorum
+        self._timeout = timeout
+        self._secret = secret
+        # Calls still running on lagging nodes after their broadcast returned
+        self._background = set()
+
+    @staticmethod
+    def _checkPolicy(policy, quorum, nodes):
+        if policy not in POLICIES:
+            raise ValueError(f"Policy must be one of {POLICIES}")
+        if quorum is not None and not 1 <= quorum <= nodes:
+            raise ValueError(f"Quorum must be between 1 and the number of nodes ({nodes})")
+
+    @property
+    def nodes(self) -> dict:
+        """ The Api of every node, by name. """
+
+        return { node.name: node.api for node in self._nodes }
+
+    async def connect(self) -> list:
+        """ Connect to all nodes concurrently. Nodes that can not be reached are skipped by
+        broadcasts. \n
+        :return - The names of the connected nodes. """
+
+        async def connect(node):
+            node.api.onDisconnect(lambda: self._handle_disconnect(node))
+            await node.api.connect()
+            node.connected = not node.api._socket._disconnecting
+            if node.connected and self._secret is not None:
+                try:
+                    await asyncio.wait_for(node.api.authenticate(self._secret), self._timeout)
+                except Exception as e:
+                    print(f"Could not authenticate with {node.name}: {type(e)}: {e}")
+                    node.api.disconnect()
+
+        await asyncio.gather(*(connect(node) for node in self._nodes))
+        return [node.name for node in self._nodes if node.connected]
+
+    def disconnect(self):
+        """ Disconnect from all nodes. """
+
+        for node in self._nodes:
+            if node.connected:
+                node.api.disconnect()
+        for task in self._background:
+            task.cancel()
+
+    def _handle_disconnect(self, node):
+        node.connected = False
+        node.lagging = False
+
+    async def broadcast(self, call: Callable[[Api], Awaitable], policy: str | None = None,
+                        quorum: int | None = None, timeout: float | None = None) -> dict:
+        """ Run a call on every connected node concurrently. \n
+        :param `call` - An async function taking a node's Api, for example
+        `lambda api: api.getProperty(uri)`. \n
+        :param `policy`, `quorum`, `timeout` - Override the group's settings for this
+        broadcast. \n
+        :return - A `NodeResult` for every node, by name. """
+
+        policy = policy or self._policy
+        quorum = quorum or self._quorum
+        self._checkPolicy(policy, quorum, len(self._nodes))
+        timeout = self._timeout if timeout is None else timeout
+
+        if policy == 'first':
+            needed = 1
+        elif policy == 'quorum':
+            needed = quorum or len(self._nodes) // 2 + 1
+        else:
+            needed = None
+
+        results = {}
+        tasks = {}
+        for node in self._nodes:
+            if not node.connected:
+                results[node.name] = NodeResult(
+                    None, ConnectionError(f"Not connected to {node.name}"), None, True
+                )
+                continue
+            tasks[asyncio.create_task(self._call(node, call))] = node
+
+        # Lagging nodes get the call, but nobody waits for them
+        waiting = { task for task, node in tasks.items() if not node.lagging }
+        deadline = None if timeout is None else time.monotonic() + timeout
+        succeeded = 0
+        while waiting and (needed is None or succeeded < needed):
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            done, waiting = await asyncio.wait(
+                waiting, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            succeeded += sum(
+                1 for task in done if not task.cancelled() and task.result().error is None
+            )
+
+        for task, node in tasks.items():
+            if task.done():
+                results[node.name] = self._nodeResult(task)
+                continue
+            if task in waiting and (needed is None or succeeded < needed):
+                # The node missed the deadline, stop waiting for it until it catches up
+                node.timeouts += 1
+                self._markLagging(node)
+            results[node.name] = NodeResult(None, None, None, False)
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+        return { node.name: results[node.name] for node in self._nodes }
+
+    async def _call(self, node, call) -> NodeResult:
+        start = time.perf_counter()
+        try:
+            result = await call(node.api)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            node.failures += 1
+            return NodeResult(None, e, time.perf_counter() - start, True)
+        latency = time.perf_counter() - start
+        node.latency.record(latency)
+        return NodeResult(result, None, latency, True)
+
+    @staticmethod
+    def _nodeResult(task) -> NodeResult:
+        if task.cancelled():
+            return NodeResult(None, asyncio.CancelledError(), None, True)
+        return task.result()
+
+    def _markLagging(self, node):
+        if node.lagging:
+            return
+        node.lagging = True
+
+        async def recover():
+            # Messages on a connection are answered in order, so once every connection
+            # of the node has answered, it has worked through everything sent before
+            try:
+                await asyncio.gather(*(
+                    connection._request('version', {})
+                    for connection in node.api._requestConnections()
+                ))
+                node.lagging = False
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Node {node.name} did not recover: {type(e)}: {e}")
+
+        task = asyncio.create_task(recover(), name=f"Recover {node.name}")
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def executeLuaScript(self, script, getReturnValue = True,
+                               shouldBeSynchronized = True, **options) -> dict:
+        """ Execute a lua script on every node. See `Api.executeLuaScript` and
+        `broadcast()` for the `options`. """
+
+        return await self.broadcast(
+            lambda api: api.executeLuaScript(script, getReturnValue, shouldBeSynchronized),
+            **options
+        )
+
+    async def executeLuaFunction(self, function: str, args, getReturnValue = True,
+                                 **options) -> dict:
+        """ Execute a lua function on every node. See `Api.executeLuaFunction` and
+        `broadcast()` for the `options`. """
+
+        return await self.broadcast(
+            lambda api: api.executeLuaFunction(function, args, getReturnValue), **options
+        )
+
+    async def getProperty(self, property, **options) -> dict:
+        """ Get a property from every node. See `broadcast()` for the `options`. """
+
+        return await self.broadcast(lambda api: api.getProperty(property), **options)
+
+    def setProperty(self, property, value):
+        """ Set a property on every connected node. """
+
+        for node in self._nodes:
+            if node.connected:
+                node.api.setProperty(property, value)
+
+    async def setProperties(self, properties: dict, force: bool = False, **options) -> dict:
+        """ Set many properties on every node. See `Api.setProperties` and `broadcast()`
+        for the `options`. """
+
+        return await self.broadcast(
+            lambda api: api.setProperties(properties, force), **options
+        )
+
+    def stats(self) -> dict:
+        """ Get the state, latency histogram, failures and timeouts of every node, by
+        name. """
+
+        return {
+            node.name: {
+                'connected': node.connected,
+                'lagging': node.lagging,
+                'latency': node.latency.snapshot(),
+                'failures': node.failures,
+                'timeouts': node.timeouts
+            }
+            for node in self._nodes
+        }
@@ -0,0 +1,57 @@
+from functools import partial
+
+class LuaLibrary:
+    """ The OpenSpace lua library, mapped to Python functions. (Only for internal use, see
+    `Api.library()`) \n
+    Functions and sublibraries are resolved from the library index on first access and
+    memoized, so only the parts of the library that are used are ever built. \n
+    :param `index` - A dictionary mapping library names to lists of function names, see
+    `doccache.libraryIndex()`. \n
+    :param `call` - The function used to call a lua function, given the full function
+    name followed by the arguments. \n
+    :param `wrapper` - If set, wraps all calls. """
+
+    def __init__(self, index: dict, call, wrapper = None, name: str = ''):
+        self._luaName = name
+        self._luaCall = call
+        self._luaWrapper = wrapper
+        if name:
+            self._luaFunctions = frozenset(index.get(name, ()))
+            self._luaIndex = None
+        else:
+            self._luaFunctions = frozenset(index.get('', ()))
+            self._luaIndex = index
+
+    def __getattr__(self, name):
+        # Only called when `name` has not been resolved and memoized yet
+        if name.startswith('_lua'):
+            raise AttributeError(name)
+
+        if name in self._luaFunctions:
+            prefix = f"openspace.{self._luaName}." if self._luaName else "openspace."
+            value = partial(self._luaCall, prefix + name)
+            if self._luaWrapper is not None:
+                value = partial(self._luaWrapper, value)
+        elif self._luaIndex is not None and name and name in self._luaIndex:
+            value = LuaLibrary(self._luaIndex, self._luaCall, self._luaWrapper, name)
+        else:
+            library = f"openspace.{self._luaName}" if self._luaName else "openspace"
+            raise AttributeError(f"'{library}' has no function or library '{name}'")
+
+        setattr(self, name, value)
+        return value
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError as e:
+            raise KeyError(name) from e
+
+    def __dir__(self):
+        names = set(self._luaFunctions)
+        if self._luaIndex is not None:
+            names.update(name for name in self._luaIndex if name)
+        return sorted(names)
+
+    def __repr__(self):
+        return f"<LuaLibrary '{'openspace.' + self._luaName if self._luaName else 'openspace'}'>"
@@ -0,0 +1,225 @@
+import asyncio
+import inspect
+import os
+import re
+from collections import deque
+from traceback import print_exc
+
+LOG_LEVELS = ('Trace', 'Debug', 'Info', 'Warning', 'Error', 'Fatal')
+
+DEFAULT_BATCH_INTERVAL = 0.1
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_MAX_BUFFERED = 100000
+
+# The category and level stamps at the start of a log message, read from the encoded
+# message: "[2024-01-01 | 12:00:00] Category (Level) Text". Either stamp may be missing,
+# depending on the settings of the subscription
+_STAMPS = re.compile(
+    rb'"message":\s*"(?:\[[^\]]*\]\s*)?(?:([^\s"(\\]+)\s+)?\((' +
+    b'|'.join(level.encode() for level in LOG_LEVELS) + rb')\)'
+)
+_LEVEL_RANKS = { level.encode(): rank for rank, level in enumerate(LOG_LEVELS) }
+
+class RotatingFileSink:
+    """ Writes log messages to a file, starting a new one when it grows too large. The
+    previous files are kept as `path.1`, `path.2`, ... up to `backupCount`. \n
+    :param `path` - The file to write. \n
+    :param `maxBytes` - The size at which the file is rotated. \n
+    :param `backupCount` - The number of rotated files to keep. """
+
+    def __init__(self, path: str, maxBytes: int = 10 * 1024 * 1024, backupCount: int = 5):
+        self._path = path
+        self._maxBytes = maxBytes
+        self._backupCount = backupCount
+        self._file = open(path, 'ab')
+        self._size = self._file.tell()
+
+    def write(self, data: bytes):
+        if self._size and self._size + len(data) > self._maxBytes:
+            self._rotate()
+        self._file.write(data)
+        self._size += len(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def _rotate(self):
+        self._file.close()
+        if self._backupCount > 0:
+            for i in range(self._backupCount - 1, 0, -1):
+                if os.path.exists(f"{self._path}.{i}"):
+                    os.replace(f"{self._path}.{i}", f"{self._path}.{i + 1}")
+            os.replace(self._path, f"{self._path}.1")
+        self._file = open(self._path, 'wb')
+        self._size = 0
+
+class LogStream:
+    """ A log message subscription tuned for verbose streams. (See
+    `Api.subscribeToLogMessages()`) \n
+    Messages are filtered on their encoded form as they arrive, and only those that pass
+    are kept, in a bounded buffer. A separate task decodes them and hands them to the
+    callback and the sink in batches, so a busy log does not hold up other topics. \n
+    Await the stream (`await stream()`) to stop it, like the function returned for
+    unbatched subscriptions. \n
+    :param `api` - The Api to subscribe through. \n
+    :param `settings` - The settings of the subscription, see
+    `Api.subscribeToLogMessages()`. \n
+    :param `callback` - Called with a list of messages per batch. May be a coroutine
+    function. \n
+    :param `minLevel` - Discard messages below this level, one of `LOG_LEVELS`. \n
+    :param `categories` - Only keep messages of these categories. \n
+    Filters need the level and category stamps (`logLevelStamping`,
+    `categoryStamping`), messages without them are kept. \n
+    :param `batchInterval` - The longest time, in seconds, a message waits for its batch.
+    \n
+    :param `batchSize` - The number of messages that triggers a batch early. \n
+    :param `maxBuffered` - The number of messages kept until they are delivered. When
+    full, the oldest messages are dropped and counted in `dropped`. \n
+    :param `sink` - Where to write the text of the messages, one per line, instead of or
+    as well as calling the callback. A file path (written through `RotatingFileSink`), an
+    asyncio StreamWriter, or any object with a `write(data: bytes)` method, which may be
+    a coroutine. """
+
+    def __init__(self, api, settings: dict, callback = None, minLevel: str | None = None,
+                 categories = None, batchInterval: float = DEFAULT_BATCH_INTERVAL,
+                 batchSize: int = DEFAULT_BATCH_SIZE, maxBuffered: int = DEFAULT_MAX_BUFFERED,
+                 sink = None):
+        if minLevel is not None and minLevel not in LOG_LEVELS:
+            raise ValueError(f"Level must be one of {LOG_LEVELS}")
+        if batchSize < 1 or maxBuffered < 1:
+            raise ValueError("Batch size and buffer size must be at least 1")
+
+        self._api = api
+        self._callback = callback
+        self._minRank = LOG_LEVELS.index(minLevel) if minLevel is not None else 0
+        self._categories = None if categories is None else {
+            category.encode() for category in categories
+        }
+        self._filtered = minLevel is not None or categories is not None
+        self._batchInterval = batchInterval
+        self._batchSize = batchSize
+        self._buffer = deque()
+        self._maxBuffered = maxBuffered
+        self._ownsSink = isinstance(sink, str)
+        self._sink = RotatingFileSink(sink) if self._ownsSink else sink
+        self._full = asyncio.Event()
+        self.received = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.batches = 0
+
+        self._topic = api._startRawTopic('errorLog', {
+            'event': 'start_subscription',
+            'settings': settings
+        }, self._receive)
+        self._task = asyncio.create_task(self._run(), name="Log stream")
+
+    async def __call__(self):
+        await self.stop()
+
+    async def stop(self, flush: bool = True):
+        """ Unsubscribe from the log messages. \n
+        :param `flush` - Whether to deliver the messages that are still buffered. """
+
+        if self._topic is None:
+            return
+        self._topic.talk({ 'event': 'stop_subscription' })
+        self._topic.cancel()
+        self._topic = None
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        if flush:
+            await self._flush()
+        self._buffer.clear()
+        if self._ownsSink:
+            self._sink.close()
+
+    def stats(self) -> dict:
+        """ Get the number of messages received, rejected by the filters, dropped because
+        the buffer was full and delivered, and the number of batches. """
+
+        return {
+            'received': self.received,
+            'rejected': self.rejected,
+            'dropped': self.dropped,
+            'delivered': self.delivered,
+            'batches': self.batches,
+            'buffered': len(self._buffer)
+        }
+
+    def _accepts(self, frame: bytes) -> bool:
+        match = _STAMPS.search(frame)
+        if match is None:
+            return True
+        category, level = match.groups()
+        if _LEVEL_RANKS[level] < self._minRank:
+            return False
+        return self._categories is None or category is None or category in self._categories
+
+    def _receive(self, frame: bytes):
+        self.received += 1
+        if self._filtered and not self._accepts(frame):
+            self.rejected += 1
+            return
+
+        buffer = self._buffer
+        if len(buffer) >= self._maxBuffered:
+            buffer.popleft()
+            self.dropped += 1
+        buffer.append(frame)
+        if len(buffer) >= self._batchSize:
+            self._full.set()
+
+    async def _run(self):
+        # `wait_for` swallows the cancellation when the batch fills at the same time, so
+        # also stop once the topic is gone
+        while self._topic is not None:
+            try:
+                await asyncio.wait_for(self._full.wait(), self._batchInterval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self._flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error delivering log messages: {type(e)}: {e}")
+                print_exc()
+
+    async def _flush(self):
+        while self._buffer:
+            buffer = self._buffer
+            count = min(len(buffer), self._batchSize)
+            frames = [buffer.popleft() for _ in range(count)]
+
+            loads = self._api._codec.loads
+            messages = [loads(frame).get('payload') for frame in frames]
+            self.delivered += len(messages)
+            self.batches += 1
+
+            if self._sink is not None:
+                await self._write(messages)
+            if self._callback is not None:
+                result = self._callback(messages)
+                if inspect.isawaitable(result):
+                    await result
+
+    async def _write(self, messages):
+        data = ''.join(
+            f"{message.get('message', '')}\n" for message in messages
+            if isinstance(message, dict)
+        ).encode()
+        result = self._sink.write(data)
+        if inspect.isawaitable(result):
+            await result
+        elif hasattr(self._sink, 'drain'):
+            # An asyncio StreamWriter
+            await self._sink.drain()
+        elif self._ownsSink:
+            self._sink.flush()
@@ -0,0 +1,36 @@
+import math
+
+_ESCAPES = {
+    '\\': '\\\\',
+    '"': '\\"',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\0': '\\0',
+}
+
+def toLua(value) -> str:
+    """ Convert a Python value into a Lua expression. \n
+    None becomes nil, lists and tuples become array tables and dictionaries become
+    tables. Raises `ValueError` for values that have no Lua equivalent. """
+
+    if value is None:
+        return 'nil'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if math.isnan(value):
+            return '(0/0)'
+        if math.isinf(value):
+            return 'math.huge' if value > 0 else '-math.huge'
+        return repr(value)
+    if isinstance(value, str):
+        return '"' + ''.join(_ESCAPES.get(c, c) for c in value) + '"'
+    if isinstance(value, (list, tuple)):
+        return '{' + ', '.join(toLua(v) for v in value) + '}'
+    if isinstance(value, dict):
+        return '{' + ', '.join(f"[{toLua(k)}] = {toLua(v)}" for k, v in value.items()) + '}'
+    raise ValueError(f"Can not convert {type(value).__name__} to Lua")
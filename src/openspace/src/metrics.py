@@ -0,0 +1,123 @@
+import asyncio
+
+# Resolution of the latency histograms, in seconds. Bucket `i` holds samples in
+# [RESOLUTION * 2^(i-1), RESOLUTION * 2^i), the last bucket everything above
+RESOLUTION = 1e-5
+BUCKETS = 26
+
+class Histogram:
+    """ A latency histogram with exponentially growing buckets. (Only for internal use) """
+
+    def __init__(self):
+        self._buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds: float):
+        """ Add a sample. """
+
+        index = int(seconds / RESOLUTION).bit_length()
+        self._buckets[index if index < BUCKETS else BUCKETS - 1] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p: float) -> float | None:
+        """ Get an upper bound for the `p`th percentile, in seconds. """
+
+        if not self.count:
+            return None
+
+        target = p / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self._buckets):
+            seen += count
+            if count and seen >= target:
+                return min(RESOLUTION * 2 ** index, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        """ Summarize the histogram. Times are in seconds, and `buckets` lists the upper
+        bound and count of every non-empty bucket. """
+
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': [
+                [RESOLUTION * 2 ** index, count]
+                for index, count in enumerate(self._buckets) if count
+            ]
+        }
+
+class Metrics:
+    """ Request latencies collected by an Api with metrics enabled. (Only for internal
+    use, see `Api.enableMetrics()`) """
+
+    def __init__(self):
+        self.topicLatency = {}
+        self.luaLatency = {}
+        self.failedRequests = 0
+
+    def recordRequest(self, type: str, function: str | None, seconds: float, failed: bool):
+        histogram = self.topicLatency.get(type)
+        if histogram is None:
+            histogram = self.topicLatency[type] = Histogram()
+        histogram.record(seconds)
+
+        if function is not None:
+            histogram = self.luaLatency.get(function)
+            if histogram is None:
+                histogram = self.luaLatency[function] = Histogram()
+            histogram.record(seconds)
+
+        if failed:
+            self.failedRequests += 1
+
+    def snapshot(self) -> dict:
+        return {
+            'latency': { type: h.snapshot() for type, h in self.topicLatency.items() },
+            'luaLatency': { name: h.snapshot() for name, h in self.luaLatency.items() },
+            'failedRequests': self.failedRequests
+        }
+
+class StallMonitor:
+    """ Measures how long the event loop is blocked, by how late it wakes up a timer that
+    fires every `interval` seconds. (Only for internal use, see `Api.enableMetrics()`) """
+
+    def __init__(self, interval: float = 0.01):
+        self._interval = interval
+        self._task = None
+        self.stalls = Histogram()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="Stall monitor")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def snapshot(self) -> dict:
+        """ Summarize the stalls. `total` is the time the loop was blocked, in seconds. """
+
+        snapshot = self.stalls.snapshot()
+        snapshot['total'] = self.stalls.total
+        return snapshot
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            self.stalls.record(max(0.0, loop.time() - expected))
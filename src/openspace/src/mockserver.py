@@ -0,0 +1,348 @@
+import asyncio
+import json
+import time
+from collections import deque
+from traceback import print_exc
+
+try:
+    from websockets.asyncio.server import serve as _serveWebSocket
+    from websockets.exceptions import ConnectionClosed
+except ImportError:
+    _serveWebSocket = None
+
+LOG_LEVELS = ('Trace', 'Debug', 'Info', 'Warning', 'Error', 'Fatal')
+# The longest message the server accepts, in bytes
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+class _Connection:
+    def __init__(self, server, writer):
+        self.server = server
+        self.writer = writer
+        # Streaming tasks (subscriptions, events, logs), by topic id
+        self.streams = {}
+        self.authorized = server._secret is None
+
+    def send(self, topic, payload):
+        self.sendEncoded(topic, json.dumps(payload).encode())
+
+    def sendEncoded(self, topic, payload: bytes):
+        data = b'{"payload": ' + payload + b', "topic": ' + str(topic).encode() + b'}\n'
+        self.server.messagesSent += 1
+        self.server.bytesSent += len(data)
+        self.writer.write(data)
+
+    def stop(self, topic):
+        task = self.streams.pop(topic, None)
+        if task is not None:
+            task.cancel()
+
+    def close(self):
+        for task in self.streams.values():
+            task.cancel()
+        self.streams.clear()
+
+class _WebSocketWriter:
+    """ Gives a WebSocket connection the `write()`, `drain()` and `close()` of a
+    StreamWriter, sending every write as one text message. """
+
+    def __init__(self, websocket):
+        self._websocket = websocket
+        self._queue = deque()
+
+    def write(self, data):
+        self._queue.append(data.rstrip(b'\n'))
+
+    async def drain(self):
+        try:
+            while self._queue:
+                await self._websocket.send(self._queue.popleft(), text=True)
+        except ConnectionClosed as e:
+            raise ConnectionError(str(e)) from e
+
+    def close(self):
+        self._websocket.transport.abort()
+
+class MockServer:
+    """ An in-process stand-in for the OpenSpace server module, speaking the newline
+    delimited JSON topic protocol over TCP. Intended for testing and benchmarking
+    clients without a running OpenSpace. \n
+    Serves the `get`, `set`, `subscribe`, `event`, `luascript`, `documentation`,
+    `authorize`, `errorLog` and `version` topics. \n
+    :param `host`, `port` - Where to listen. Port 0 picks a free port, see `port`. \n
+    :param `properties` - Initial property values by URI. Unknown properties are
+    created on first access with the value 0. \n
+    :param `secret` - If set, clients must authorize with it before other topics are
+    served. \n
+    :param `updateRate` - Updates per second sent on each subscription, event and log
+    stream. None sends as fast as the connection allows. \n
+    :param `payloadSize` - The number of bytes of padding added to property, event,
+    log and lua payloads. \n
+    :param `libraries`, `functionsPerLibrary` - The size of the generated lua
+    documentation. \n
+    :param `luaHandler` - If set, called with the script (or function name and
+    arguments) of every `luascript` topic, and its result is returned. \n
+    :param `transport` - 'tcp' to serve newline delimited messages over TCP, or
+    'websocket' to serve them over WebSocket with permessage-deflate, like the two
+    interfaces of the server module. """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, properties: dict | None = None,
+                 secret: str | None = None, updateRate: float | None = 60.0,
+                 payloadSize: int = 0, libraries: int = 20, functionsPerLibrary: int = 50,
+                 luaHandler = None, transport: str = 'tcp'):
+        if transport not in ('tcp', 'websocket'):
+            raise ValueError("Transport must be 'tcp' or 'websocket'")
+        if transport == 'websocket' and _serveWebSocket is None:
+            raise ImportError(
+                "Serving WebSockets requires websockets, install it with `pip install websockets`"
+            )
+
+        self._transport = transport
+        self._host = host
+        self._port = port
+        self._server = None
+        self._connections = set()
+        # The tasks handling the connections
+        self._handlers = set()
+        self._secret = secret
+        self._updateRate = updateRate
+        self._padding = 'x' * payloadSize
+        self._libraries = libraries
+        self._functionsPerLibrary = functionsPerLibrary
+        self._luaHandler = luaHandler
+        self._documentation = None
+        self._encodedDocumentation = None
+        self.properties = dict(properties or {})
+        self.messagesReceived = 0
+        self.bytesReceived = 0
+        self.messagesSent = 0
+        self.bytesSent = 0
+
+    @property
+    def port(self) -> int:
+        """ The port the server listens on. """
+
+        if self._server is not None:
+            return self._server.sockets[0].getsockname()[1]
+        return self._port
+
+    async def start(self):
+        """ Start listening for connections. """
+
+        if self._transport == 'websocket':
+            self._server = await _serveWebSocket(
+                self._handle_websocket, self._host, self._port, compression='deflate',
+                max_size=MAX_MESSAGE_SIZE
+            )
+        else:
+            self._server = await asyncio.start_server(
+                self._handle_connection, self._host, self._port, limit=MAX_MESSAGE_SIZE
+            )
+
+    def close(self):
+        """ Stop listening and drop all connections, as if OpenSpace was closed. """
+
+        if self._server is not None:
+            self._server.close()
+        for connection in list(self._connections):
+            connection.close()
+            connection.writer.close()
+        self._connections.clear()
+        for task in self._handlers:
+            task.cancel()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, excType, exc, traceback):
+        tasks = list(self._handlers)
+        tasks += [task for connection in self._connections for task in connection.streams.values()]
+        self.close()
+        # Let the handlers and streams finish, so that none is left pending or destroyed
+        # with the event loop
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        return False
+
+    def documentation(self) -> list:
+        """ The generated lua documentation, as returned by the `documentation` topic. """
+
+        if self._documentation is None:
+            self._documentation = [
+                {
+                    'library': f"library{i}" if i else '',
+                    'name': f"library{i}" if i else '',
+                    'functions': [
+                        {
+                            'name': f"function{j}",
+                            'arguments': [{ 'name': 'value', 'type': 'Number' }],
+                            'returnType': 'Number',
+                            'help': f"Function {j} of library {i}. {self._padding}"
+                        }
+                        for j in range(self._functionsPerLibrary)
+                    ]
+                }
+                for i in range(self._libraries)
+            ]
+        return self._documentation
+
+    def _property(self, uri):
+        value = self.properties.setdefault(uri, 0)
+        return {
+            'Description': {
+                'Identifier': uri.split('.')[-1],
+                'Name': uri,
+                'Type': type(value).__name__,
+                'Padding': self._padding
+            },
+            'Value': value
+        }
+
+    async def _stream(self, connection, topic, makePayload):
+        interval = 1.0 / self._updateRate if self._updateRate else 0
+        try:
+            while True:
+                connection.send(topic, makePayload())
+                # Always yield, `drain()` does not when the connection keeps up
+                await asyncio.sleep(interval)
+                await connection.writer.drain()
+        except asyncio.CancelledError:
+            pass
+        except ConnectionError:
+            connection.stop(topic)
+
+    def _startStream(self, connection, topic, makePayload):
+        connection.stop(topic)
+        connection.streams[topic] = asyncio.create_task(
+            self._stream(connection, topic, makePayload)
+        )
+
+    def _handle(self, connection, message):
+        topic = message.get('topic')
+        type = message.get('type')
+        payload = message.get('payload') or {}
+
+        if type is None:
+            # Messages on an existing topic
+            if payload.get('event') == 'stop_subscription' or \
+               payload.get('status') == 'stop_subscription':
+                connection.stop(topic)
+            return
+
+        if type == 'authorize':
+            connection.authorized = self._secret is None or payload.get('key') == self._secret
+            connection.send(topic, {
+                'status': 'authorized' if connection.authorized else 'unauthorized'
+            })
+            return
+
+        if type == 'version':
+            connection.send(topic, {
+                'openSpaceVersion': { 'major': 0, 'minor': 0, 'patch': 0 },
+                'socketApiVersion': { 'major': 1, 'minor': 0, 'patch': 0 }
+            })
+            return
+
+        if not connection.authorized:
+            connection.send(topic, { 'error': 'Not authorized' })
+            return
+
+        if type == 'get':
+            connection.send(topic, self._property(payload['property']))
+        elif type == 'set':
+            self.properties[payload['property']] = payload.get('value')
+        elif type == 'subscribe':
+            uri = payload['property']
+            def update():
+                # Numeric properties change with every update, like a time or camera
+                value = self.properties.get(uri, 0)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self.properties[uri] = value + 1
+                return self._property(uri)
+            self._startStream(connection, topic, update)
+        elif type == 'event':
+            events = payload['event']
+            events = events if isinstance(events, list) else [events]
+            counter = [0]
+            def event():
+                counter[0] += 1
+                return {
+                    'Event': events[counter[0] % len(events)],
+                    'Count': counter[0],
+                    'Padding': self._padding
+                }
+            self._startStream(connection, topic, event)
+        elif type == 'errorLog':
+            counter = [0]
+            def log():
+                counter[0] += 1
+                level = LOG_LEVELS[counter[0] % len(LOG_LEVELS)]
+                stamp = time.strftime('%Y-%m-%d | %H:%M:%S')
+                return {
+                    'message': f"[{stamp}] MockServer ({level}) Message {counter[0]} {self._padding}"
+                }
+            self._startStream(connection, topic, log)
+        elif type == 'documentation':
+            # Encoded once, so that benchmarks of large responses measure the client
+            if self._encodedDocumentation is None:
+                self._encodedDocumentation = json.dumps(self.documentation()).encode()
+            connection.sendEncoded(topic, self._encodedDocumentation)
+        elif type == 'luascript':
+            if self._luaHandler is not None:
+                if 'function' in payload:
+                    result = self._luaHandler(payload['function'], *payload.get('arguments', []))
+                else:
+                    result = self._luaHandler(payload.get('script'))
+            else:
+                result = payload.get('function') or payload.get('script')
+                if self._padding:
+                    result = [result, self._padding]
+            if payload.get('return'):
+                connection.send(topic, { '1': result })
+        else:
+            connection.send(topic, { 'error': f"Unknown topic type '{type}'" })
+
+    async def _handle_connection(self, reader, writer):
+        connection = _Connection(self, writer)
+        self._connections.add(connection)
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await self._receive(connection, line)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            connection.close()
+            self._connections.discard(connection)
+            self._handlers.discard(task)
+            writer.close()
+
+    async def _handle_websocket(self, websocket):
+        connection = _Connection(self, _WebSocketWriter(websocket))
+        self._connections.add(connection)
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                await self._receive(connection, await websocket.recv(decode=False))
+        except (ConnectionClosed, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            connection.close()
+            self._connections.discard(connection)
+            self._handlers.discard(task)
+
+    async def _receive(self, connection, message):
+        self.messagesReceived += 1
+        self.bytesReceived += len(message)
+        try:
+            self._handle(connection, json.loads(message))
+        except Exception as e:
+            print(f"Mock server could not handle message: {type(e)}: {e}")
+            print_exc()
+        await connection.writer.drain()
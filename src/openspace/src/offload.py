@@ -0,0 +1,185 @@
+import asyncio
+import pickle
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from traceback import print_exc
+from .codec import decodeWith
+
+# Messages of at least this many bytes are decoded outside the event loop by default
+DEFAULT_OFFLOAD_THRESHOLD = 256 * 1024
+
+# The approximate size in bytes of the parts a worker process splits a decoded message
+# into. The event loop rebuilds the message one part at a time, and runs other callbacks
+# in between
+DEFAULT_PART_SIZE = 64 * 1024
+
+EXECUTORS = ('thread', 'process')
+
+def createExecutor(executor: str, workers: int | None = None) -> Executor:
+    """ Create a 'thread' or 'process' pool for decoding. """
+
+    if executor == 'thread':
+        return ThreadPoolExecutor(workers, thread_name_prefix="OpenSpace decode")
+    if executor == 'process':
+        return ProcessPoolExecutor(workers)
+    raise ValueError(f"Executor must be one of {EXECUTORS} or an Executor")
+
+def _split(value, data: bytes, partSize: int) -> list:
+    """ Split a list or dictionary, whose pickle is `data`, into parts: pickled lists of
+    consecutive items (or key and value pairs) of about `partSize` bytes, and
+    `(key, isDict, parts)` for items that are large enough to be split themselves. """
+
+    isDict = type(value) is dict
+    parts = []
+    group = []
+    size = 0
+    for key, item in (value.items() if isDict else enumerate(value)):
+        itemData = pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+        if len(itemData) > partSize and type(item) in (dict, list) and item:
+            if group:
+                parts.append(pickle.dumps(group, pickle.HIGHEST_PROTOCOL))
+                group = []
+                size = 0
+            parts.append((key, type(item) is dict, _split(item, itemData, partSize)))
+            continue
+
+        group.append((key, item) if isDict else item)
+        size += len(itemData)
+        if size >= partSize:
+            parts.append(pickle.dumps(group, pickle.HIGHEST_PROTOCOL))
+            group = []
+            size = 0
+
+    if group:
+        parts.append(pickle.dumps(group, pickle.HIGHEST_PROTOCOL))
+    return parts
+
+def decodeInParts(name: str, message: bytes, partSize: int = DEFAULT_PART_SIZE):
+    """ Decode a message with the named codec in a worker process, and return it split
+    into parts that `assemble()` rebuilds a little at a time. Returning the decoded
+    message as is would have the event loop's process unpickle all of it at once. """
+
+    value = decodeWith(name, message)
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) <= partSize or type(value) not in (dict, list) or not value:
+        return data
+    return (type(value) is dict, _split(value, data, partSize))
+
+async def assemble(decoded):
+    """ Rebuild a message returned by `decodeInParts()`, yielding to the event loop after
+    every part. """
+
+    if type(decoded) is bytes:
+        return pickle.loads(decoded)
+
+    isDict, parts = decoded
+    value = {} if isDict else []
+    for part in parts:
+        if type(part) is bytes:
+            items = pickle.loads(part)
+            if isDict:
+                value.update(items)
+            else:
+                value.extend(items)
+            await asyncio.sleep(0)
+        else:
+            key, childIsDict, childParts = part
+            child = await assemble((childIsDict, childParts))
+            if isDict:
+                value[key] = child
+            else:
+                value.append(child)
+    return value
+
+class OffloadedDecoder:
+    """ Decodes large messages in an executor instead of on the event loop, and delivers
+    them in the order they were received. (Only for internal use, see
+    `Api.offloadDecoding()`) \n
+    Messages are ordered per topic: while a large message of a topic is decoding, later
+    messages of the same topic wait for it, even small ones. Other topics are not held
+    up. \n
+    :param `codec` - The codec to decode with. \n
+    :param `deliver` - Called with the decoded message and the encoded message. \n
+    :param `threshold` - The size in bytes from which messages are offloaded. \n
+    :param `executor` - 'process', 'thread' or an Executor. A process decodes the
+    message and splits the result into parts, which the event loop rebuilds one at a time
+    (see `decodeInParts()`). A thread only helps decoders that release the GIL, which
+    orjson, msgspec and json do not. \n
+    :param `workers` - The size of the pool created for 'thread' or 'process'. """
+
+    def __init__(self, codec, deliver, threshold: int = DEFAULT_OFFLOAD_THRESHOLD,
+                 executor: str | Executor = 'process', workers: int | None = None):
+        self._codec = codec
+        self._deliver = deliver
+        self._threshold = threshold
+        self._ownsExecutor = not isinstance(executor, Executor)
+        self._executor = createExecutor(executor, workers) if self._ownsExecutor else executor
+        self._inParts = not isinstance(self._executor, ThreadPoolExecutor)
+        if self._inParts:
+            self._decode = partial(decodeInParts, codec.name)
+        else:
+            self._decode = codec.loads
+        # The delivery of the last message of every topic with messages in flight
+        self._chains = {}
+        self.offloaded = 0
+        self.offloadedBytes = 0
+
+    def wants(self, topic, size: int) -> bool:
+        """ Whether a message must go through the decoder, because it is large or an
+        earlier message of its topic is still decoding. """
+
+        return size >= self._threshold or topic in self._chains
+
+    def submit(self, topic, message: bytes):
+        """ Decode a message and deliver it after the earlier messages of its topic. """
+
+        loop = asyncio.get_running_loop()
+        if len(message) >= self._threshold:
+            decoded = loop.run_in_executor(self._executor, self._decode, message)
+            self.offloaded += 1
+            self.offloadedBytes += len(message)
+        else:
+            decoded = None
+
+        task = loop.create_task(self._deliverInOrder(self._chains.get(topic), decoded, message))
+        self._chains[topic] = task
+        task.add_done_callback(partial(self._release, topic))
+
+    def stats(self) -> dict:
+        return {
+            'threshold': self._threshold,
+            'offloaded': self.offloaded,
+            'offloadedBytes': self.offloadedBytes,
+            'topicsInFlight': len(self._chains)
+        }
+
+    def close(self):
+        """ Drop messages in flight and shut the executor down if it was created here. """
+
+        for task in self._chains.values():
+            task.cancel()
+        self._chains.clear()
+        if self._ownsExecutor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _deliverInOrder(self, previous, decoded, message):
+        if previous is not None:
+            # Does not raise if the previous delivery failed
+            await asyncio.wait({ previous })
+        try:
+            if decoded is not None:
+                messageObject = await decoded
+                if self._inParts:
+                    messageObject = await assemble(messageObject)
+            else:
+                messageObject = self._codec.loads(message)
+            self._deliver(messageObject, message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error decoding message: {type(e)}: {e}")
+            print_exc()
+
+    def _release(self, topic, task):
+        if self._chains.get(topic) is task:
+            del self._chains[topic]
@@ -0,0 +1,277 @@
+import asyncio
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable
+from .api import Api
+from .topic import Topic
+from .transport import DEFAULT_HIGH_WATER_MARK
+from .offload import createExecutor, DEFAULT_OFFLOAD_THRESHOLD
+from .propertycache import DEFAULT_MAX_SUBSCRIPTIONS
+
+class ApiPool(Api):
+    """ An OpenSpace API that spreads its traffic over several connections to the same
+    OpenSpace instance. It has the same interface as `Api`. \n
+    One-shot requests are sent on the connection with the least outstanding work, so a
+    large response such as `getDocumentation('lua')` does not delay other requests.
+    Writes without a response, such as `setProperty`, and batches all go through the
+    first live request connection, so that OpenSpace applies them in order. \n
+    :param `size` - The number of connections to open. \n
+    :param `dedicatedSubscriptions` - The number of connections reserved for topics
+    started with `startTopic` (subscriptions). These connections carry no one-shot
+    requests. If 0, topics are spread over all connections. Individual subscriptions can
+    be placed with the `dedicated` parameter of `startTopic`, `subscribeToProperty` and
+    `subscribeToEvent` instead: True pins a heavy subscription to a reserved connection,
+    False keeps a light one on the request connections. \n
+    :param `secret` - If set, every connection is authenticated with it on connect. \n
+    See `Api` for the remaining parameters. """
+
+    def __init__(self, ADDRESS, PORT, size: int = 4, dedicatedSubscriptions: int = 0,
+                 secret: str | None = None, highWaterMark: int = DEFAULT_HIGH_WATER_MARK,
+                 codec = None, requestTimeout: float | None = None,
+                 propertyCacheSize: int = DEFAULT_MAX_SUBSCRIPTIONS, reconnect: bool = False,
+                 maxReconnectAttempts: int | None = None, transport = 'tcp',
+                 compression: bool = True):
+        if size < 1:
+            raise ValueError("A pool needs at least one connection")
+        if dedicatedSubscriptions < 0 or (size > 1 and dedicatedSubscriptions >= size):
+            raise ValueError("At least one connection must be left for requests")
+
+        # The pool's own socket is never connected, all traffic goes through its members
+        super().__init__(ADDRESS, PORT, highWaterMark, codec, requestTimeout,
+                         propertyCacheSize, transport=transport)
+
+        self._secret = secret
+        self._onConnectCallback = None
+        self._members = []
+        for _ in range(size):
+            member = Api(ADDRESS, PORT, highWaterMark, self._codec, requestTimeout, 0,
+                         reconnect, maxReconnectAttempts, transport, compression)
+            member.onDisconnect(self._handle_member_disconnect)
+            member._socket.onConnectionLost(partial(self._handle_member_connection_lost, member))
+            self._members.append(member)
+
+        # With a single connection, requests and subscriptions have to share it
+        self._requestMembers = self._members[dedicatedSubscriptions:] or self._members
+        self._dedicatedMembers = self._members[:dedicatedSubscriptions]
+        self._topicMembers = self._dedicatedMembers or self._members
+        # Where the topic being started goes, see `_placed()`
+        self._dedicated = None
+        self._connected = set()
+        self._decodeExecutor = None
+
+    def _live(self, members):
+        live = [member for member in members if id(member) in self._connected]
+        if not live:
+            raise ConnectionError("No connection to OpenSpace")
+        return live
+
+    def _leastLoaded(self) -> Api:
+        """ The request connection with the fewest outstanding requests and the least
+        unsent data. """
+
+        return min(
+            self._live(self._requestMembers),
+            key=lambda member: (len(member._pending), member._socket._outBytes)
+        )
+
+    def _topicMember(self) -> Api:
+        """ The connection with the fewest open topics among the (subscription)
+        connections, or the ones chosen with `dedicated`. """
+
+        if self._dedicated is None:
+            members = self._topicMembers
+        elif self._dedicated:
+            members = self._dedicatedMembers
+        else:
+            members = self._requestMembers
+        return min(self._live(members), key=lambda member: len(member._callbacks))
+
+    @contextmanager
+    def _placed(self, dedicated: bool | None):
+        """ Start the topics within the block on a reserved subscription connection
+        (True), a request connection (False) or where topics go by default (None). """
+
+        if dedicated is None:
+            # Keeps the placement of an enclosing block
+            yield
+            return
+        if dedicated and not self._dedicatedMembers:
+            raise ValueError("The pool has no dedicated subscription connections")
+        previous = self._dedicated
+        self._dedicated = dedicated
+        try:
+            yield
+        finally:
+            self._dedicated = previous
+
+    def _handle_member_disconnect(self):
+        self._connected = {
+            id(member) for member in self._members if not member._socket._disconnecting
+        }
+        # The pool's writes may have been on the lost connection
+        self._forgetWritten()
+        if not self._connected:
+            self._handle_disconnect()
+
+    def _handle_member_connection_lost(self, member):
+        member._handle_connection_lost()
+        self._forgetWritten()
+
+    def onConnect(self, callback: Callable[[], None]):
+        """ Set the function to execute when all connections are established (and
+        authenticated, if a secret was given). \n
+        :param `callback` - Async function to execute. """
+
+        self._onConnectCallback = callback
+
+    async def connect(self):
+        """ Connect all connections to OpenSpace. """
+
+        await asyncio.gather(*(member.connect() for member in self._members))
+        self._connected = {
+            id(member) for member in self._members if not member._socket._disconnecting
+        }
+        if not self._connected:
+            return
+
+        if self._secret is not None:
+            await self.authenticate(self._secret)
+        if self._onConnectCallback is not None:
+            asyncio.create_task(self._onConnectCallback(), name="On connect")
+
+    def disconnect(self):
+        """ Disconnect all connections from OpenSpace. """
+
+        if self._writeScheduler is not None:
+            self._writeScheduler.cancel()
+            self._writeScheduler = None
+        for member in self._members:
+            if id(member) in self._connected:
+                member.disconnect()
+
+    async def drain(self):
+        """ Wait until the outgoing buffers of all connections are below their
+        high-water mark. """
+
+        await asyncio.gather(*(member.drain() for member in self._members))
+
+    async def authenticate(self, secret, timeout: float | None = None):
+        """ Authenticate every connection. \n
+        :param `secret` - The secret used to authenticate with OpenSpace. \n
+        :param `timeout` - Seconds to wait for a response. \n
+        :return - The response of the first connection. """
+
+        responses = await asyncio.gather(*(
+            member.authenticate(secret, timeout) for member in self._live(self._members)
+        ))
+        return responses[0]
+
+    def _startRequest(self, type: str, payload) -> asyncio.Future:
+        return self._leastLoaded()._startRequest(type, payload)
+
+    def _requestConnections(self) -> list:
+        return self._live(self._requestMembers)
+
+    def _orderedConnection(self) -> Api:
+        return self._live(self._requestMembers)[0]
+
+    def _sendTopic(self, type: str, payload):
+        self._orderedConnection()._sendTopic(type, payload)
+
+    def startTopic(self, type: str, payload, delivery: str = 'all', maxSize: int = 0,
+                   callback = None, dedicated: bool | None = None) -> Topic:
+        """ Initialize a new channel of communication, on the (subscription) connection
+        with the fewest open topics. See `Api.startTopic`. \n
+        :param `dedicated` - If True, the topic goes on a connection reserved with
+        `dedicatedSubscriptions`. If False, it goes on a request connection. """
+
+        with self._placed(dedicated):
+            return self._topicMember().startTopic(type, payload, delivery, maxSize, callback)
+
+    def subscribeToProperty(self, property, delivery: str = 'all', maxSize: int = 0,
+                            callback = None, shared: bool = True, decode = False,
+                            dedicated: bool | None = None):
+        """ Subscribe to a property. See `Api.subscribeToProperty`. \n
+        :param `dedicated` - Where the subscription goes, see `startTopic`. A
+        subscription shared with an existing one stays on that one's connection. """
+
+        with self._placed(dedicated):
+            return super().subscribeToProperty(
+                property, delivery, maxSize, callback, shared, decode
+            )
+
+    def subscribeToEvent(self, events, delivery: str = 'all', maxSize: int = 0,
+                         shared: bool = True, dedicated: bool | None = None):
+        """ Subscribe to an event. See `Api.subscribeToEvent`. \n
+        :param `dedicated` - Where the subscription goes, see `startTopic`. """
+
+        with self._placed(dedicated):
+            return super().subscribeToEvent(events, delivery, maxSize, shared)
+
+    def _startSharedTopic(self, type: str, payload, callback):
+        member = self._topicMember()
+        return member.startTopic(type, payload, callback=callback), member._socket
+
+    def _startRawTopic(self, type: str, payload, callback):
+        return self._topicMember()._startRawTopic(type, payload, callback)
+
+    def enableMetrics(self, enabled: bool = True, monitorEventLoop: bool = False):
+        """ Start (or stop) collecting request latencies on all connections. See
+        `Api.enableMetrics`. """
+
+        # The connections share the event loop, the pool monitors it for all of them
+        super().enableMetrics(enabled, monitorEventLoop)
+        for member in self._members:
+            member.enableMetrics(enabled)
+
+    def offloadDecoding(self, threshold: int | None = DEFAULT_OFFLOAD_THRESHOLD,
+                        executor = 'process', workers: int | None = None):
+        """ Decode large messages of all connections in a process (or thread) pool shared
+        by them. See `Api.offloadDecoding`. """
+
+        if self._decodeExecutor is not None:
+            self._decodeExecutor.shutdown(wait=False, cancel_futures=True)
+            self._decodeExecutor = None
+        if threshold is not None and isinstance(executor, str):
+            executor = self._decodeExecutor = createExecutor(executor, workers)
+        for member in self._members:
+            member.offloadDecoding(threshold, executor, workers)
+
+    def onSend(self, callback):
+        """ Set a function called with every encoded message sent on any connection. """
+
+        for member in self._members:
+            member.onSend(callback)
+
+    def onReceive(self, callback):
+        """ Set a function called with every encoded message received on any connection. """
+
+        for member in self._members:
+            member.onReceive(callback)
+
+    def onRequestComplete(self, callback):
+        """ Set a function called when a request completes on any connection. """
+
+        for member in self._members:
+            member.onRequestComplete(callback)
+
+    def stats(self) -> dict:
+        """ Get the property cache and library statistics of the pool, and the stats of
+        each connection. See `Api.stats()`. """
+
+        connections = []
+        for member in self._members:
+            stats = member.stats()
+            del stats['propertyCache'], stats['library'], stats['sharedTopics']
+            stats['connected'] = id(member) in self._connected
+            connections.append(stats)
+
+        stats = {
+            'propertyCache': self.propertyCacheStats(),
+            'library': self.libraryLoadStats(),
+            'sharedTopics': self._sharedTopicStats(),
+            'connections': connections
+        }
+        if self._stallMonitor is not None:
+            stats['eventLoopStalls'] = self._stallMonitor.snapshot()
+        return stats
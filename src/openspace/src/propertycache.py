@@ -0,0 +1,133 @@
+import asyncio
+from collections import OrderedDict
+from traceback import print_exc
+
+DEFAULT_MAX_SUBSCRIPTIONS = 64
+
+class _CacheEntry:
+    def __init__(self, topic):
+        self.topic = topic
+        self.value = None
+        self.hasValue = asyncio.Event()
+        self.task = None
+
+class PropertyCache:
+    """ Keeps property values fresh through subscriptions, so they can be read without a
+    round trip to OpenSpace. (Only for internal use, see `Api.watch()` and
+    `Api.getProperty(cached=True)`) \n
+    :param `api` - The Api to subscribe through. \n
+    :param `maxSubscriptions` - The number of properties to keep subscriptions to. When
+    exceeded, the least recently used property is unsubscribed. """
+
+    def __init__(self, api, maxSubscriptions: int = DEFAULT_MAX_SUBSCRIPTIONS):
+        self._api = api
+        self._maxSubscriptions = maxSubscriptions
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, uri):
+        return uri in self._entries
+
+    def lookup(self, uri):
+        """ Look up the cached value of a property, counting a hit or a miss. \n
+        :return - A tuple (found, value). """
+
+        entry = self._entries.get(uri)
+        if entry is None or not entry.hasValue.is_set():
+            self.misses += 1
+            return False, None
+
+        self._entries.move_to_end(uri)
+        self.hits += 1
+        return True, entry.value
+
+    def peek(self, uri):
+        """ Look up the cached value of a property without affecting the counters or the
+        eviction order. \n
+        :return - A tuple (found, value). """
+
+        entry = self._entries.get(uri)
+        if entry is None or not entry.hasValue.is_set():
+            return False, None
+        return True, entry.value
+
+    def watch(self, uri, value = None, hasValue: bool = False):
+        """ Start keeping a property fresh through a subscription. \n
+        :param `value` - A known current value, used until the first update arrives. \n
+        :return - The cache entry. """
+
+        entry = self._entries.get(uri)
+        if entry is not None:
+            self._entries.move_to_end(uri)
+            if hasValue and not entry.hasValue.is_set():
+                entry.value = value
+                entry.hasValue.set()
+            return entry
+
+        # Only the current value is of interest, older updates are conflated
+        entry = _CacheEntry(self._api.subscribeToProperty(uri, 'latest'))
+        if hasValue:
+            entry.value = value
+            entry.hasValue.set()
+        entry.task = asyncio.create_task(self._update(entry), name=f"Watch {uri}")
+        self._entries[uri] = entry
+
+        while len(self._entries) > self._maxSubscriptions:
+            _, evicted = self._entries.popitem(last=False)
+            self._stop(evicted, True)
+            self.evictions += 1
+
+        return entry
+
+    def unwatch(self, uri):
+        """ Stop keeping a property fresh and forget its value. """
+
+        entry = self._entries.pop(uri, None)
+        if entry is not None:
+            self._stop(entry, True)
+
+    def clear(self, unsubscribe: bool = True):
+        """ Forget all cached values and stop listening to their subscriptions. \n
+        :param `unsubscribe` - Whether to tell OpenSpace to stop the subscriptions. """
+
+        entries = self._entries
+        self._entries = OrderedDict()
+        for entry in entries.values():
+            self._stop(entry, unsubscribe)
+
+    def invalidate(self):
+        """ Treat all cached values as stale until their subscriptions deliver again. """
+
+        for entry in self._entries.values():
+            entry.hasValue.clear()
+
+    def stats(self) -> dict:
+        """ Get the hit/miss counters and the number of live subscriptions. """
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'subscriptions': len(self._entries)
+        }
+
+    async def _update(self, entry):
+        try:
+            async for value in entry.topic:
+                entry.value = value
+                entry.hasValue.set()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Error updating cached property: {e}")
+            print_exc()
+
+    def _stop(self, entry, unsubscribe):
+        entry.task.cancel()
+        if unsubscribe:
+            entry.topic.cancel()
+        else:
+            # Later updates must not reach the cache
+            entry.topic._detach()
@@ -0,0 +1,225 @@
+import asyncio
+import mmap
+import re
+import struct
+import time
+from collections import namedtuple
+from .codec import peekTopic
+
+# File layout: the header, followed by records. Each record is a `_RECORD` header followed
+# by the message exactly as it was sent or received (without the newline)
+MAGIC = b'OSREC\x00\x01\x00'
+_RECORD = struct.Struct('<dBBII')
+
+RECEIVED = 0
+SENT = 1
+
+# Topic types are stored as their index in this table, unknown types as 255
+TOPIC_TYPES = (
+    '', 'authorize', 'get', 'set', 'subscribe', 'event', 'luascript', 'documentation',
+    'errorLog', 'version', 'time', 'flightcontroller', 'bounce', 'camera',
+    'enginemode', 'missions', 'actionkeybind', 'sessionRecording', 'shortcuts', 'skybrowser',
+    'triggerProperty', 'cameraPath'
+)
+UNKNOWN_TYPE = 255
+NO_TOPIC = 0xFFFFFFFF
+
+_TYPE = re.compile(rb'"type":\s*"([^"]*)"')
+_TYPE_CODES = { name: code for code, name in enumerate(TOPIC_TYPES) }
+
+Record = namedtuple('Record', ['time', 'direction', 'topic', 'type', 'message'])
+Record.__doc__ = """ A recorded message. `time` is in seconds since the recording started,
+`direction` is RECEIVED or SENT, `topic` is None if it could not be determined and
+`message` is a memoryview of the encoded message. """
+
+class Recorder:
+    """ Records every message an Api sends and receives, with its topic id, topic type
+    and a monotonic timestamp, into an append-only binary log. Read it back with
+    `RecordingReader` or play it with `replay()` and `replayToServer()`. \n
+    The recorder installs itself as the api's `onSend` and `onReceive` hooks while it
+    is running. \n
+    :param `api` - The Api to record. \n
+    :param `path` - The file to write. An existing file is overwritten. """
+
+    def __init__(self, api, path: str):
+        self._api = api
+        self._path = path
+        self._file = None
+        self._start = 0.0
+        # Topic types by topic id, learned from the messages starting each topic
+        self._types = {}
+        self.records = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, excType, exc, traceback):
+        self.stop()
+        return False
+
+    def start(self):
+        """ Start recording. """
+
+        self._file = open(self._path, 'wb')
+        self._file.write(MAGIC)
+        self._start = time.monotonic()
+        self._api.onSend(self._sent)
+        self._api.onReceive(self._received)
+
+    def stop(self):
+        """ Stop recording and close the file. """
+
+        if self._file is None:
+            return
+        self._api.onSend(None)
+        self._api.onReceive(None)
+        self._file.close()
+        self._file = None
+
+    def _write(self, direction, topic, typeCode, message):
+        self._file.write(_RECORD.pack(
+            time.monotonic() - self._start, direction, typeCode,
+            NO_TOPIC if topic is None else topic, len(message)
+        ))
+        self._file.write(message)
+        self.records += 1
+
+    def _sent(self, message: bytes):
+        topic = peekTopic(message)
+        match = _TYPE.search(message)
+        if match is not None:
+            typeCode = _TYPE_CODES.get(match.group(1).decode(), UNKNOWN_TYPE)
+            if topic is not None:
+                self._types[topic] = typeCode
+        else:
+            typeCode = self._types.get(topic, UNKNOWN_TYPE)
+        self._write(SENT, topic, typeCode, message)
+
+    def _received(self, message: bytes):
+        topic = peekTopic(message)
+        self._write(RECEIVED, topic, self._types.get(topic, UNKNOWN_TYPE), message)
+
+class RecordingReader:
+    """ Reads a recording made by `Recorder` through a memory map, so that large
+    recordings are not loaded into memory. Iterate it to get `Record`s. Their messages
+    are views into the map, copy them to keep them after the reader is closed. \n
+    :param `path` - The recording to read. """
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can not be mapped
+            self._file.close()
+            raise ValueError(f"{path} is not a recording")
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a recording")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, exc, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:
+            # Records are still referenced, the map is released when they are
+            pass
+        self._file.close()
+
+    def __iter__(self):
+        view = memoryview(self._map)
+        offset = len(MAGIC)
+        end = len(self._map)
+        try:
+            while offset + _RECORD.size <= end:
+                timestamp, direction, typeCode, topic, length = _RECORD.unpack_from(view, offset)
+                offset += _RECORD.size
+                if offset + length > end:
+                    # The recording was cut off in the middle of a record
+                    break
+                yield Record(
+                    timestamp,
+                    direction,
+                    None if topic == NO_TOPIC else topic,
+                    TOPIC_TYPES[typeCode] if typeCode < len(TOPIC_TYPES) else None,
+                    view[offset:offset + length]
+                )
+                offset += length
+        finally:
+            try:
+                view.release()
+            except BufferError:
+                pass
+
+async def _play(records, speed, deliver):
+    """ Deliver records at their recorded pace, scaled by `speed`. """
+
+    start = time.monotonic()
+    count = 0
+    for record in records:
+        if speed:
+            delay = record.time / speed - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif count % 1000 == 0:
+            # Let other tasks run now and then when replaying at maximum speed
+            await asyncio.sleep(0)
+        await deliver(record)
+        count += 1
+    return count
+
+async def replay(path: str, api, speed: float | None = 1.0) -> int:
+    """ Replay the received messages of a recording into an Api, as if they came from
+    OpenSpace. Topics must be started on the api with the same topic ids as in the
+    recording for the messages to reach them. \n
+    :param `speed` - 1.0 replays in real time, 2.0 twice as fast and None as fast as
+    possible. \n
+    :return - The number of messages replayed. """
+
+    async def deliver(record):
+        api._handle_message(record.message.tobytes())
+
+    with RecordingReader(path) as reader:
+        received = (record for record in reader if record.direction == RECEIVED)
+        return await _play(received, speed, deliver)
+
+async def replayToServer(path: str, address: str, port: int, speed: float | None = 1.0) -> dict:
+    """ Replay the sent messages of a recording to a server, such as `MockServer` or
+    OpenSpace, reproducing the recorded client load. Responses are read and counted
+    but otherwise ignored. \n
+    :param `speed` - 1.0 replays in real time, 2.0 twice as fast and None as fast as
+    possible. \n
+    :return - The number of messages sent and responses received. """
+
+    reader, writer = await asyncio.open_connection(address, port)
+    responses = 0
+
+    async def readResponses():
+        nonlocal responses
+        while await reader.readline():
+            responses += 1
+
+    readTask = asyncio.create_task(readResponses())
+
+    async def deliver(record):
+        writer.write(record.message)
+        writer.write(b'\n')
+        await writer.drain()
+
+    try:
+        with RecordingReader(path) as recording:
+            sent = (record for record in recording if record.direction == SENT)
+            count = await _play(sent, speed, deliver)
+        # Give the server a moment to answer the last messages
+        await asyncio.sleep(0.1)
+    finally:
+        readTask.cancel()
+        writer.close()
+    return { 'sent': count, 'responses': responses }
@@ -0,0 +1,260 @@
+import asyncio
+import heapq
+import time
+from traceback import print_exc
+
+class MonotonicClock:
+    """ The real clock used by `WriteScheduler`. """
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+class VirtualClock:
+    """ A clock that only moves when told to, for driving a `WriteScheduler`
+    deterministically in tests. \n
+    :param `start` - The initial time. """
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._sleepers = []
+        self._counter = 0
+
+    def now(self) -> float:
+        return self._now
+
+    async def sleep(self, seconds: float):
+        future = asyncio.get_running_loop().create_future()
+        # The counter keeps sleepers with the same wake time in order
+        heapq.heappush(self._sleepers, (self._now + max(0.0, seconds), self._counter, future))
+        self._counter += 1
+        await future
+
+    async def advance(self, seconds: float):
+        """ Move the clock forward, waking every sleeper whose time has come in order and
+        letting it run before moving on. """
+
+        target = self._now + seconds
+        # Let tasks that are about to sleep get to it first
+        await self._settle()
+        while self._sleepers and self._sleepers[0][0] <= target:
+            wake, _, future = heapq.heappop(self._sleepers)
+            self._now = max(self._now, wake)
+            if not future.done():
+                future.set_result(None)
+                # Let the woken task run until it sleeps again
+                await self._settle()
+        self._now = target
+
+    async def _settle(self):
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+def _isNumeric(value) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    return isinstance(value, (list, tuple)) and len(value) > 0 and all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) for v in value
+    )
+
+def _lerp(start, end, t):
+    if isinstance(end, (list, tuple)):
+        return [s + (e - s) * t for s, e in zip(start, end)]
+    return start + (end - start) * t
+
+class WriteScheduler:
+    """ Buffers property writes and sends them once per tick. (See
+    `Api.enableWriteScheduler()`) \n
+    Writes to the same property within a tick are coalesced, the last one wins, so
+    bandwidth is bounded by the tick rate rather than by how often values are set. \n
+    :param `api` - The Api to write through. \n
+    :param `tickRate` - Flushes per second. \n
+    :param `interpolate` - If set, numeric values (numbers and lists of numbers) move
+    to a new value linearly over this many seconds, with intermediate values written
+    on every tick, instead of jumping. \n
+    :param `clock` - The clock to use, `MonotonicClock` by default. Pass a
+    `VirtualClock` to drive the scheduler from tests. """
+
+    def __init__(self, api, tickRate: float = 60.0, interpolate: float | None = None,
+                 clock = None):
+        if tickRate <= 0:
+            raise ValueError("Tick rate must be positive")
+
+        self._api = api
+        self._period = 1.0 / tickRate
+        self._interpolate = interpolate
+        self._clock = clock or MonotonicClock()
+        # Values to write on the next flush, by URI
+        self._pending = {}
+        # Running interpolations, by URI: (start value, end value, start time, end time)
+        self._animations = {}
+        # The last value the scheduler wrote, by URI, where interpolations start from
+        self._written = {}
+        self._deadline = None
+        self._task = None
+        self._sleeper = None
+        self.requested = 0
+        self.sent = 0
+        self.suppressed = 0
+        self.ticks = 0
+
+    def start(self):
+        """ Start flushing on every tick. Must be called from the event loop. """
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="Write scheduler")
+
+    async def stop(self, flush: bool = True):
+        """ Stop the scheduler. \n
+        :param `flush` - Whether to write values that are still buffered. Otherwise they
+        are discarded. """
+
+        task = self._task
+        self.cancel(discard=not flush)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+        if flush:
+            await self.flush(finish=True)
+
+    def cancel(self, discard: bool = True):
+        """ Stop the scheduler without waiting for it. \n
+        :param `discard` - Whether to discard values that are still buffered. """
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if discard:
+            self._pending.clear()
+            self._animations.clear()
+            self._deadline = None
+
+    def _forgetWritten(self):
+        """ Forget the values written so far, after the connection was lost. """
+
+        self._written.clear()
+
+    def _discard(self, properties: list, patterns: list = ()):
+        """ Drop the buffered writes and interpolations of properties that were written
+        directly. \n
+        :param `properties` - The URIs of the properties. \n
+        :param `patterns` - Patterns matching further URIs, for writes with wildcards. """
+
+        for property in properties:
+            self._pending.pop(property, None)
+            self._animations.pop(property, None)
+            # Interpolations start from the value written directly from now on
+            self._written.pop(property, None)
+        for pattern in patterns:
+            for buffered in (self._pending, self._animations, self._written):
+                for property in [uri for uri in buffered if pattern.fullmatch(uri)]:
+                    del buffered[property]
+
+    def set(self, property: str, value, deadline: float | None = None):
+        """ Buffer a write. \n
+        :param `deadline` - If set, the write is sent within this many seconds even if
+        that is before the next tick. """
+
+        self.requested += 1
+        now = self._clock.now()
+
+        if self._interpolate and _isNumeric(value):
+            start = self._written.get(property)
+            if start is None:
+                found, start = self._api._lastKnownValue(property)
+                start = start if found else None
+            if start is not None and _isNumeric(start) and \
+               (not isinstance(value, (list, tuple)) or len(start) == len(value)):
+                self._animations[property] = (start, value, now, now + self._interpolate)
+                self._pending.pop(property, None)
+            else:
+                self._animations.pop(property, None)
+                self._pending[property] = value
+        else:
+            self._animations.pop(property, None)
+            self._pending[property] = value
+
+        if deadline is not None:
+            deadline = now + deadline
+            if self._deadline is None or deadline < self._deadline:
+                self._deadline = deadline
+                # Wake the scheduler so it can flush early
+                if self._sleeper is not None:
+                    self._sleeper.cancel()
+
+    async def flush(self, finish: bool = False) -> dict:
+        """ Write all buffered values now. \n
+        :param `finish` - If true, running interpolations jump to their end value. \n
+        :return - The result of `Api.setProperties`. """
+
+        now = self._clock.now()
+        values = self._pending
+        self._pending = {}
+        self._deadline = None
+
+        for property, (start, end, startTime, endTime) in list(self._animations.items()):
+            t = 1.0 if finish or endTime <= startTime else (now - startTime) / (endTime - startTime)
+            if t >= 1.0:
+                values[property] = end
+                del self._animations[property]
+            else:
+                values[property] = _lerp(start, end, max(0.0, t))
+
+        if not values:
+            return { 'sent': 0, 'suppressed': 0, 'messages': 0 }
+
+        self._written.update(values)
+        result = await self._api._writeProperties(values)
+        self.sent += result['sent']
+        self.suppressed += result['suppressed']
+        return result
+
+    def stats(self) -> dict:
+        """ Get the number of writes requested, sent and suppressed as duplicates, and the
+        number of ticks. Requested minus sent shows how many writes were coalesced. """
+
+        return {
+            'requested': self.requested,
+            'sent': self.sent,
+            'suppressed': self.suppressed,
+            'ticks': self.ticks,
+            'buffered': len(self._pending) + len(self._animations)
+        }
+
+    async def _run(self):
+        nextTick = self._clock.now() + self._period
+        while True:
+            wake = nextTick if self._deadline is None else min(nextTick, self._deadline)
+            delay = wake - self._clock.now()
+            if delay > 0:
+                self._sleeper = asyncio.create_task(self._clock.sleep(delay))
+                try:
+                    # Returns early if a deadline cancels the sleep
+                    await asyncio.wait({ self._sleeper })
+                finally:
+                    # Stopping the scheduler cancels it while it waits
+                    self._sleeper.cancel()
+                    self._sleeper = None
+
+            now = self._clock.now()
+            due = now >= nextTick
+            if not due and (self._deadline is None or now < self._deadline):
+                continue
+
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error flushing property writes: {type(e)}: {e}")
+                print_exc()
+
+            if due:
+                self.ticks += 1
+                nextTick += self._period
+                # Skip ticks that were missed rather than flushing repeatedly to catch up
+                if nextTick < now:
+                    nextTick = now + self._period
@@ -0,0 +1,126 @@
+from traceback import print_exc
+from .topic import Topic
+from .topicqueue import TopicQueue
+
+class SharedTopic:
+    """ A single topic with OpenSpace fanned out to any number of local consumers, so
+    that components subscribing to the same property or event share one stream whose
+    messages are decoded once. (Only for internal use, see `Api.subscribeToProperty()`)
+    \n
+    The topic is stopped in OpenSpace when the last consumer cancels. \n
+    :param `api` - The Api that owns the topic. \n
+    :param `key` - The key of the topic in the api's table of shared topics. \n
+    :param `type`, `payload` - The topic to start. \n
+    :param `stop` - The message that stops the topic in OpenSpace. \n
+    :param `replayLast` - Whether a new consumer immediately receives the last message,
+    for topics where OpenSpace only sends the current state when the topic starts. """
+
+    def __init__(self, api, key, type: str, payload, stop, replayLast: bool):
+        self._api = api
+        self._key = key
+        self._stop = stop
+        self._replayLast = replayLast
+        self._consumers = []
+        # The queues of the consumers without a callback
+        self._queues = []
+        self._hasLast = False
+        self._last = None
+        self._upstream, self._socket = api._startSharedTopic(type, payload, self._dispatch)
+
+    @property
+    def consumers(self) -> int:
+        return len(self._consumers)
+
+    def queueStats(self) -> list:
+        """ Get the backlog and the number of dropped messages of every consumer that
+        queues its messages. """
+
+        return [{ 'backlog': len(queue), 'dropped': queue.dropped } for queue in self._queues]
+
+    @property
+    def closed(self) -> bool:
+        """ Whether the topic is no longer usable, because it was stopped or its
+        connection was lost for good. """
+
+        return self._upstream is None or self._socket._disconnecting
+
+    def subscribe(self, delivery: str = 'all', maxSize: int = 0, callback = None,
+                  decode = None) -> Topic:
+        """ Add a consumer. \n
+        :param `delivery`, `maxSize` - How messages are buffered for this consumer, see
+        `Api.startTopic()`. \n
+        :param `callback` - If set, messages are passed to this function instead of
+        being queued. \n
+        :param `decode` - Applied to queued messages as this consumer takes them. \n
+        :return - The consumer's Topic. Cancelling it removes the consumer, and so does
+        sending it the stop message. Other messages would change the topic for every
+        consumer, `talk()` raises `ValueError` for them. """
+
+        if callback is None:
+            queue = TopicQueue(
+                delivery, maxSize, self._socket.pauseReading, self._socket.resumeReading
+            )
+            deliver = queue.put_nowait
+            self._queues.append(queue)
+        else:
+            queue = None
+            deliver = callback
+
+        self._consumers.append(deliver)
+        if self._replayLast and self._hasLast:
+            deliver(self._last)
+
+        cancelled = False
+
+        def cancel(stop: bool = True):
+            nonlocal cancelled
+            if cancelled:
+                return
+            cancelled = True
+            self._consumers.remove(deliver)
+            if queue is not None:
+                self._queues.remove(queue)
+                queue.close()
+            if not self._consumers:
+                self.close(stop)
+
+        def talk(data):
+            if data == self._stop:
+                cancel()
+                return
+            raise ValueError(
+                "A shared subscription can not be changed by one of its subscribers, "
+                "subscribe with shared=False to talk to the topic"
+            )
+
+        async def iterator():
+            while queue is not None and not cancelled:
+                yield queue.get()
+
+        return Topic(iterator(), talk, cancel, queue, decode, lambda: cancel(False))
+
+    def close(self, stop: bool = True):
+        """ Stop the topic. \n
+        :param `stop` - Whether to tell OpenSpace, otherwise the topic is only dropped
+        here. """
+
+        upstream = self._upstream
+        if upstream is None:
+            return
+        self._upstream = None
+        if self._api._sharedTopics.get(self._key) is self:
+            del self._api._sharedTopics[self._key]
+        if stop and not self._socket._disconnecting:
+            upstream.talk(self._stop)
+        upstream.cancel()
+
+    def _dispatch(self, payload):
+        # Every consumer gets the same decoded object
+        self._last = payload
+        self._hasLast = True
+        for deliver in tuple(self._consumers):
+            try:
+                deliver(payload)
+            except Exception as e:
+                print(f"Error delivering message to subscriber: {type(e)}: {e}")
+                print_exc()
@@ -1,46 +1,49 @@
-import asyncio
 import socket
-from threading import Thread
 from traceback import print_exc
+from .transport import Transport, DEFAULT_HIGH_WATER_MARK
 
-class SocketWrapper:
-    def __init__(self, address: str, port: int):
+# Bounds for the adaptive receive size. Reads start at the minimum and grow while the
+# socket keeps filling the whole receive buffer (e.g. for large documentation payloads)
+MIN_RECEIVE_SIZE = 64 * 1024
+MAX_RECEIVE_SIZE = 4 * 1024 * 1024
+
+class SocketWrapper(Transport):
+    """ The raw TCP transport, speaking newline delimited messages. (Only for internal
+    use) See `Transport` for the parameters. """
+
+    def __init__(self, address: str, port: int, highWaterMark: int = DEFAULT_HIGH_WATER_MARK,
+                 reconnect: bool = False, maxReconnectAttempts: int | None = None):
 
         # Ipv6 addresses are resolved to '::1' in Windows which causes issues with
         # `asyncio.sock_connect`, changing it to an Ipv4 address fixes the issue
         if(address.lower() == 'localhost'):
             address = '127.0.0.1'
-        self._address = address
-        self._port = port
-        self._client = None
-        self._onConnect = lambda: None
-        self._onDisconnect = lambda: None
-        self._onMessage = lambda message: None
-        self._inBuffer = ''
-        self._disconnecting = False
-
-    def onConnect(self, callback):
-        self._onConnect = callback
-
-    def onDisconnect(self, callback):
-        self._onDisconnect = callback
-
-    def onMessage(self, callback):
-        self._onMessage = callback
+        super().__init__(address, port, highWaterMark, reconnect, maxReconnectAttempts)
+        # Received bytes that have not yet been split into messages, and the offset in
+        # it from which to continue looking for the next newline
+        self._inBuffer = bytearray()
+        self._scanOffset = 0
+        self._receiveSize = MIN_RECEIVE_SIZE
 
     async def _handle_receive(self):
+        receiveBuffer = bytearray(self._receiveSize)
+        receiveView = memoryview(receiveBuffer)
         while True:
+            if not self._readable.is_set():
+                await self._readable.wait()
             try:
-                data = await self._loop.sock_recv(self._client, 1024)
-                if data:
-                    self._inBuffer += data.decode()
-                    while '\n' in self._inBuffer:
-                        message, self._inBuffer = self._inBuffer.split('\n', 1)
-                        try:
-                            self._onMessage(message)
-                        except Exception as e:
-                            print(f"Error receiving data: {type(e)}: {e}")
-                            print_exc()
+                nBytes = await self._loop.sock_recv_into(self._client, receiveView)
+                if nBytes:
+                    self.bytesReceived += nBytes
+                    self._inBuffer += receiveView[:nBytes]
+                    self._split_messages()
+
+                    # Grow the receive buffer if the socket filled it completely
+                    if nBytes == self._receiveSize and self._receiveSize < MAX_RECEIVE_SIZE:
+                        self._receiveSize *= 2
+                        receiveView.release()
+                        receiveBuffer = bytearray(self._receiveSize)
+                        receiveView = memoryview(receiveBuffer)
                 else:
                     print("Error receiving data from OpenSpace. Connection closed.")
                     break
@@ -53,33 +56,62 @@ class SocketWrapper:
                 print(f"Connection exited with: {e}")
                 print_exc()
                 break
-        self.disconnect()
+        self._connection_lost()
 
-    async def connect(self):
-        self._client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._client.setblocking(False)
-        self._loop = asyncio.get_running_loop()
-        try:
-            await self._loop.sock_connect(self._client, (self._address, self._port))
-            self._disconnecting = False
-            asyncio.create_task(self._handle_receive(), name="Handle receive")
-            asyncio.create_task(self._onConnect(), name="On connect")
-        except ConnectionRefusedError as e:
-            print(f"Could not connect to {self._address}:{self._port}. Is OpenSpace running?")
-            print(f"Error code: {e}")
-            self.disconnect()
+    def _split_messages(self):
+        """ Pass every complete, newline-terminated message in the input buffer to the
+        message callback as `bytes`. Only bytes that have not been searched before are
+        scanned for newlines. """
 
+        buffer = self._inBuffer
+        start = 0
+        end = buffer.find(b'\n', self._scanOffset)
+        with memoryview(buffer) as view:
+            while end != -1:
+                self.messagesReceived += 1
+                try:
+                    self._onMessage(view[start:end].tobytes())
+                except Exception as e:
+                    print(f"Error receiving data: {type(e)}: {e}")
+                    print_exc()
+                start = end + 1
+                end = buffer.find(b'\n', start)
 
-    async def send(self, message):
-        await self._loop.sock_sendall(self._client, (message + "\n").encode())
+        # Drop consumed messages once per read rather than once per message
+        if start:
+            del buffer[:start]
+        self._scanOffset = len(buffer)
 
-    def send(self, message):
-        self._client.sendall((message + "\n").encode())
+    async def _openConnection(self):
+        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        client.setblocking(False)
+        try:
+            await self._loop.sock_connect(client, (self._address, self._port))
+        except OSError:
+            client.close()
+            raise
 
-    def disconnect(self):
-        if self._disconnecting:
-             return
+        self._client = client
+        self._inBuffer = bytearray()
+        self._scanOffset = 0
 
-        self._disconnecting = True
-        self._onDisconnect()
+    def _closeConnection(self):
+        # The receive and send tasks were just cancelled, but their pending reads and
+        # writes are only unregistered from the event loop on its next iteration. A
+        # socket opened before then gets the same file descriptor, and would lose its
+        # registrations to them, so they are removed before the descriptor is freed
+        fd = self._client.fileno()
+        if fd != -1:
+            try:
+                self._loop.remove_reader(fd)
+                self._loop.remove_writer(fd)
+            except NotImplementedError:
+                # The proactor event loop on Windows does not register descriptors
+                pass
         self._client.close()
+
+    async def _write(self, chunks: list, size: int):
+        await self._loop.sock_sendall(self._client, b''.join(chunks))
+
+    def _frame(self, message: bytes) -> bytes:
+        return message + b'\n'
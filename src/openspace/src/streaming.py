@@ -0,0 +1,211 @@
+import time
+from traceback import print_exc
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def _requireNumpy():
+    if np is None:
+        raise ImportError("Property streams require numpy, install it with `pip install numpy`")
+
+class RingBuffer:
+    """ A fixed-size buffer of timestamped numeric samples, stored in preallocated NumPy
+    arrays. \n
+    Every sample is written twice, `capacity` rows apart, so that the most recent
+    samples are always contiguous and can be returned as views without copying. \n
+    :param `capacity` - The number of samples kept. \n
+    :param `width` - The number of values per sample (1 for scalars, 3 for a vec3). \n
+    :param `dtype` - The NumPy type of the values. """
+
+    def __init__(self, capacity: int, width: int = 1, dtype = None):
+        _requireNumpy()
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+
+        self._capacity = capacity
+        self._times = np.zeros(2 * capacity)
+        self._values = np.zeros((2 * capacity, width), dtype or np.float64)
+        self._head = 0
+        self.count = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def width(self) -> int:
+        return self._values.shape[1]
+
+    def __len__(self):
+        return min(self.count, self._capacity)
+
+    def append(self, timestamp: float, value):
+        """ Add a sample, overwriting the oldest one if the buffer is full. \n
+        :param `value` - A number, or a sequence of `width` numbers. """
+
+        i = self._head
+        j = i + self._capacity
+        values = self._values
+        values[i] = value
+        values[j] = values[i]
+        self._times[i] = self._times[j] = timestamp
+
+        i += 1
+        self._head = i if i < self._capacity else 0
+        self.count += 1
+
+    def window(self, n: int | None = None):
+        """ Get the most recent samples, oldest first, as views into the buffer. The views
+        are overwritten as new samples arrive, copy them to keep them. \n
+        :param `n` - The number of samples, defaults to all available. \n
+        :return - A tuple (times, values) of arrays with shapes (n,) and (n, width). """
+
+        available = len(self)
+        n = available if n is None else min(n, available)
+        end = self._head + self._capacity
+        return self._times[end - n:end], self._values[end - n:end]
+
+    def since(self, timestamp: float):
+        """ Get the samples taken at or after `timestamp`, as views. See `window()`. """
+
+        times, values = self.window()
+        start = np.searchsorted(times, timestamp, 'left')
+        return times[start:], values[start:]
+
+class PropertyStream:
+    """ Subscribes to numeric properties and records every update, with its arrival
+    time, into a `RingBuffer` per property. Updates are written straight from the
+    subscription callback, without queueing. Requires NumPy. \n
+    :param `api` - The Api to subscribe through. \n
+    :param `uris` - The URIs of the properties to record. Their values must be numbers
+    or fixed-length lists of numbers, such as positions. \n
+    :param `capacity` - The number of samples kept per property. \n
+    :param `clock` - The function providing timestamps, `time.monotonic` by default. """
+
+    def __init__(self, api, uris, capacity: int = 65536, clock = time.monotonic, dtype = None):
+        _requireNumpy()
+        self._api = api
+        self._uris = list(uris)
+        self._capacity = capacity
+        self._clock = clock
+        self._dtype = dtype
+        self._buffers = {}
+        self._topics = {}
+        self.rejected = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, excType, exc, traceback):
+        self.stop()
+        return False
+
+    def start(self):
+        """ Subscribe to the properties and start recording. """
+
+        for uri in self._uris:
+            if uri not in self._topics:
+                self._topics[uri] = self._api.subscribeToProperty(
+                    uri, callback=self._recorder(uri)
+                )
+
+    def stop(self):
+        """ Unsubscribe from the properties. Recorded samples are kept. """
+
+        topics = self._topics
+        self._topics = {}
+        for topic in topics.values():
+            topic.cancel()
+
+    def _recorder(self, uri):
+        clock = self._clock
+
+        def record(payload):
+            try:
+                value = payload['Value']
+                buffer = self._buffers.get(uri)
+                if buffer is None:
+                    # Size the buffer from the first value
+                    width = len(value) if isinstance(value, (list, tuple)) else 1
+                    buffer = self._buffers[uri] = RingBuffer(self._capacity, width, self._dtype)
+                buffer.append(clock(), value)
+            except (KeyError, TypeError, ValueError) as e:
+                self.rejected += 1
+                if self.rejected == 1:
+                    print(f"Could not record value of {uri}: {type(e)}: {e}")
+                    print_exc()
+
+        return record
+
+    def buffer(self, uri: str) -> RingBuffer | None:
+        """ Get the buffer of a property, or None if it has not received any value. """
+
+        return self._buffers.get(uri)
+
+    def window(self, uri: str, n: int | None = None):
+        """ Get the most recent samples of a property as views. See `RingBuffer.window`. """
+
+        buffer = self._buffers.get(uri)
+        if buffer is None:
+            return np.empty(0), np.empty((0, 1))
+        return buffer.window(n)
+
+    def resample(self, times, uris = None, method: str = 'linear'):
+        """ Align properties on common timestamps. \n
+        :param `times` - The timestamps to sample at, as an increasing array. \n
+        :param `uris` - The properties to include, defaults to all. \n
+        :param `method` - 'linear' interpolates between samples, 'previous' takes the
+        latest sample at or before each timestamp (NaN before the first sample). \n
+        :return - An array with one row per timestamp and the columns of all properties
+        side by side, in the order of `uris`. """
+
+        if method not in ('linear', 'previous'):
+            raise ValueError("Method must be 'linear' or 'previous'")
+
+        times = np.asarray(times, dtype=np.float64)
+        columns = []
+        for uri in (self._uris if uris is None else uris):
+            buffer = self._buffers.get(uri)
+            if buffer is None or len(buffer) == 0:
+                columns.append(np.full((len(times), 1), np.nan))
+                continue
+
+            sampleTimes, values = buffer.window()
+            if method == 'linear':
+                columns.append(np.column_stack([
+                    np.interp(times, sampleTimes, values[:, k]) for k in range(buffer.width)
+                ]))
+            else:
+                index = np.searchsorted(sampleTimes, times, 'right') - 1
+                column = values[np.clip(index, 0, None)].astype(np.float64)
+                column[index < 0] = np.nan
+                columns.append(column)
+
+        return np.hstack(columns) if columns else np.empty((len(times), 0))
+
+    def align(self, period: float, duration: float | None = None, uris = None,
+              method: str = 'linear'):
+        """ Resample properties on a regular grid ending at the newest sample. \n
+        :param `period` - Seconds between grid points. \n
+        :param `duration` - Seconds covered by the grid, defaults to the span of the
+        recorded samples. \n
+        :return - A tuple (times, values), see `resample()`. """
+
+        ends = []
+        starts = []
+        for uri in (self._uris if uris is None else uris):
+            buffer = self._buffers.get(uri)
+            if buffer is not None and len(buffer):
+                sampleTimes, _ = buffer.window()
+                starts.append(sampleTimes[0])
+                ends.append(sampleTimes[-1])
+        if not ends:
+            return np.empty(0), np.empty((0, 0))
+
+        end = max(ends)
+        start = end - duration if duration is not None else min(starts)
+        times = np.arange(end, start - period / 2, -period)[::-1]
+        return times, self.resample(times, uris, method)
@@ -0,0 +1,256 @@
+import asyncio
+import concurrent.futures
+from threading import Thread
+from typing import Callable
+from .api import Api
+from .library import LuaLibrary
+from .topic import Topic
+
+class SyncSubscription:
+    """ A blocking view of a subscription topic. (Only for internal use) \n
+    Iterate it to receive values from OpenSpace, or call `next()`. """
+
+    def __init__(self, syncApi, topic: Topic):
+        self._syncApi = syncApi
+        self._topic = topic
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return self.next()
+        except StopAsyncIteration:
+            # The subscription was cancelled
+            raise StopIteration
+
+    def next(self, timeout: float | None = None):
+        """ Block until the next value arrives. \n
+        :param `timeout` - Seconds to wait before raising `TimeoutError`. """
+
+        return self._syncApi._run(self._topic.next(), timeout)
+
+    def drain(self, maxItems: int | None = None, timeout: float | None = None) -> list:
+        """ Block until at least one value arrives and return all values received so
+        far, up to `maxItems`. See `Topic.drain`. \n
+        :param `timeout` - Seconds to wait before raising `TimeoutError`. """
+
+        return self._syncApi._run(self._topic.drain(maxItems), timeout)
+
+    @property
+    def dropped(self) -> int:
+        """ The number of messages discarded by the topic's delivery mode. """
+
+        return self._topic.dropped
+
+    def talk(self, data):
+        """ Send data within the topic. """
+
+        self._syncApi._call(self._topic.talk, data)
+
+    def cancel(self):
+        """ Cancel the subscription. """
+
+        self._syncApi._call(self._topic.cancel)
+
+class SyncApi:
+    """ A synchronous, thread-safe interface to OpenSpace. \n
+    The asyncio API runs on an event loop in a background thread, and every call blocks
+    the calling thread until it completes. Calls from several threads run concurrently
+    on the same connection. This also works where an event loop is already running in
+    the calling thread, such as in Jupyter. \n
+    :param `ADDRESS`, `PORT` - The address of OpenSpace. \n
+    :param `apiClass` - The asyncio API to run, `Api` or `ApiPool`. \n
+    Any other keyword arguments are passed on to the asyncio API. """
+
+    def __init__(self, ADDRESS, PORT, apiClass = Api, **kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(
+            target=self._loop.run_forever, name="OpenSpace event loop", daemon=True
+        )
+        self._thread.start()
+
+        async def create():
+            return apiClass(ADDRESS, PORT, **kwargs)
+
+        self._api = self._run(create())
+
+    def _run(self, coroutine, timeout: float | None = None):
+        """ Run a coroutine on the event loop thread and wait for its result. """
+
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            # Not the built-in TimeoutError before Python 3.11
+            future.cancel()
+            raise
+
+    def _call(self, function: Callable, *args):
+        """ Call a synchronous function on the event loop thread and wait for its result. """
+
+        async def call():
+            return function(*args)
+
+        return self._run(call())
+
+    @property
+    def api(self) -> Api:
+        """ The underlying asyncio API. Must only be used from the event loop thread. """
+
+        return self._api
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """ The event loop running in the background thread. """
+
+        return self._loop
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, excType, exc, traceback):
+        self.close()
+        return False
+
+    def connect(self):
+        """ Connect to OpenSpace. """
+
+        self._run(self._api.connect())
+
+    def disconnect(self):
+        """ Disconnect from OpenSpace. """
+
+        self._call(self._api.disconnect)
+
+    def close(self):
+        """ Disconnect and stop the background event loop. The SyncApi can not be used
+        afterwards. """
+
+        if not self._loop.is_running():
+            return
+        # Disconnecting twice or without a connection does nothing. An ApiPool's own
+        # socket is never connected, so only the api knows what to close
+        self.disconnect()
+        self._run(self._finishTasks())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    @staticmethod
+    async def _finishTasks():
+        # Let the cancelled receive and send tasks, and anything else still running on
+        # the loop, end before the loop is closed
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def drain(self):
+        """ Block until the outgoing buffer is below its high-water mark. """
+
+        self._run(self._api.drain())
+
+    def authenticate(self, secret, timeout: float | None = None):
+        """ Authenticate this client. See `Api.authenticate`. """
+
+        return self._run(self._api.authenticate(secret, timeout))
+
+    def getProperty(self, property, timeout: float | None = None, cached: bool = False,
+                    decode = False):
+        """ Get a property. See `Api.getProperty`. """
+
+        return self._run(self._api.getProperty(property, timeout, cached, decode))
+
+    def setProperty(self, property, value, deadline: float | None = None):
+        """ Set a property. See `Api.setProperty`. """
+
+        self._call(self._api.setProperty, property, value, deadline)
+
+    def enableWriteScheduler(self, tickRate: float = 60.0, interpolate: float | None = None):
+        """ Buffer `setProperty` calls and send them once per tick. See
+        `Api.enableWriteScheduler`. """
+
+        return self._call(self._api.enableWriteScheduler, tickRate, interpolate)
+
+    def disableWriteScheduler(self, flush: bool = True):
+        """ Send `setProperty` calls directly again. See `Api.disableWriteScheduler`. """
+
+        self._run(self._api.disableWriteScheduler(flush))
+
+    def setProperties(self, properties: dict, force: bool = False,
+                      shouldBeSynchronized: bool = True) -> dict:
+        """ Set many properties at once. See `Api.setProperties`. """
+
+        return self._run(self._api.setProperties(properties, force, shouldBeSynchronized))
+
+    def watch(self, property, timeout: float | None = None):
+        """ Keep a property fresh in the property cache. See `Api.watch`. """
+
+        return self._run(self._api.watch(property, timeout))
+
+    def unwatch(self, property):
+        """ Stop watching a property. See `Api.unwatch`. """
+
+        self._call(self._api.unwatch, property)
+
+    def getDocumentation(self, type: str, timeout: float | None = None):
+        """ Get documentation. See `Api.getDocumentation`. """
+
+        return self._run(self._api.getDocumentation(type, timeout))
+
+    def executeLuaScript(self, script, getReturnValue = True, shouldBeSynchronized = True,
+                         timeout: float | None = None, decode = False):
+        """ Execute a lua script. See `Api.executeLuaScript`. """
+
+        return self._run(self._api.executeLuaScript(
+            script, getReturnValue, shouldBeSynchronized, timeout, decode
+        ))
+
+    def executeLuaFunction(self, function: str, args, getReturnValue = True,
+                           timeout: float | None = None, decode = False):
+        """ Execute a lua function. See `Api.executeLuaFunction`. """
+
+        return self._run(self._api.executeLuaFunction(
+            function, args, getReturnValue, timeout, decode
+        ))
+
+    def library(self, cache: bool | str = False, decode = False) -> LuaLibrary:
+        """ Get the OpenSpace lua library, mapped to blocking Python functions. See
+        `Api.library`. """
+
+        def wrapper(function, *args):
+            return self._run(function(*args))
+
+        return self._run(self._api.library(wrapper, cache, decode))
+
+    def subscribeToProperty(self, property, delivery: str = 'all',
+                            maxSize: int = 0, decode = False) -> SyncSubscription:
+        """ Subscribe to a property. See `Api.subscribeToProperty`. \n
+        :return - A SyncSubscription, a blocking iterator over the property's values. """
+
+        topic = self._call(
+            self._api.subscribeToProperty, property, delivery, maxSize, None, True, decode
+        )
+        return SyncSubscription(self, topic)
+
+    def subscribeToEvent(self, events, delivery: str = 'all',
+                         maxSize: int = 0) -> SyncSubscription:
+        """ Subscribe to events. See `Api.subscribeToEvent`. \n
+        :return - A SyncSubscription, a blocking iterator over the events. """
+
+        topic = self._call(self._api.subscribeToEvent, events, delivery, maxSize)
+        return SyncSubscription(self, topic)
+
+    def subscribeToLogMessages(self, settings, callback: Callable[[any], None] | None = None,
+                               **options):
+        """ Subscribe to log messages. See `Api.subscribeToLogMessages` for the batched
+        delivery `options`. The callback is called on the event loop thread. \n
+        :return `cancel` - A function that unsubscribes from the log messages. """
+
+        cancel = self._call(
+            lambda: self._api.subscribeToLogMessages(settings, callback, **options)
+        )
+        return lambda: self._run(cancel())
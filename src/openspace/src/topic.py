@@ -1,15 +1,39 @@
+import asyncio
+
 class Topic:
-    """ A channel to communicate with OpenSpace. """
+    """ A channel to communicate with OpenSpace. \n
+    Iterate it to receive its messages, `async for value in topic`, or call `next()` or
+    `drain()`. Iteration ends when the topic is cancelled. Topics started with a
+    callback receive their messages through it instead. """
 
-    def __init__(self, iterator, talk, cancel):
+    def __init__(self, iterator, talk, cancel, queue = None, decode = None, detach = None):
         """ Construct a topic. (Only for internal use)
         :param `iterator` - An async iterator to represent data from OpenSpace.
         :param `talk` - The function used to send messages.
-        :param `cancel` - The function used to cancel the topic. """
+        :param `cancel` - The function used to cancel the topic.
+        :param `queue` - The TopicQueue buffering data from OpenSpace.
+        :param `decode` - Applied to every message as it is consumed.
+        :param `detach` - The function used to stop receiving messages without telling
+        OpenSpace, `cancel` if not set. """
 
         self._iterator = iterator
         self._talk = talk
         self._cancel = cancel
+        self._queue = queue
+        self._decode = decode
+        self._detach = detach or cancel
+
+    @property
+    def dropped(self) -> int:
+        """ The number of messages discarded by the topic's delivery mode. """
+
+        return self._queue.dropped if self._queue is not None else 0
+
+    @property
+    def backlog(self) -> int:
+        """ The number of received messages waiting to be consumed. """
+
+        return len(self._queue) if self._queue is not None else 0
 
     def talk(self, data):
         """ Send data within a topic.
@@ -17,10 +41,60 @@ class Topic:
 
         return self._talk(data)
 
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        queue = self._queue
+        if queue is None:
+            raise StopAsyncIteration
+        # Only wait when nothing is buffered, a busy topic costs one step per message
+        if not queue._items:
+            await queue.wait()
+            if not queue._items:
+                raise StopAsyncIteration
+        if self._decode is not None:
+            return self._decode(queue.pop())
+        return queue.pop()
+
+    async def next(self, timeout: float | None = None):
+        """ Wait for the next message. \n
+        :param `timeout` - Seconds to wait before raising `TimeoutError`. \n
+        :return - The payload of the message. Raises `StopAsyncIteration` if the topic is
+        cancelled. """
+
+        if timeout is None:
+            return await self.__anext__()
+        return await asyncio.wait_for(self.__anext__(), timeout)
+
+    async def drain(self, maxItems: int | None = None) -> list:
+        """ Wait for at least one message and return all messages received so far, up to
+        `maxItems`. \n
+        :return - A list of payloads, empty if the topic is cancelled. """
+
+        queue = self._queue
+        if queue is None:
+            return []
+        if not queue._items:
+            await queue.wait()
+        if self._decode is not None:
+            return [self._decode(message) for message in queue.popMany(maxItems)]
+        return queue.popMany(maxItems)
+
     def iterator(self):
-        """ Get the async iterator used to get data from OpenSpace. """
+        """ Get the async iterator used to get data from OpenSpace. It yields awaitables
+        that resolve to the messages, iterating the topic itself is cheaper. """
+
+        if self._decode is None:
+            return self._iterator
+        return self._decodedIterator()
+
+    async def _decodedIterator(self):
+        async def decoded(message):
+            return self._decode(await message)
 
-        return self._iterator
+        async for message in self._iterator:
+            yield decoded(message)
 
     def cancel(self):
         """ Cancel the topic. """
@@ -0,0 +1,129 @@
+import asyncio
+from collections import deque
+
+# How messages are delivered to a topic's consumer:
+# 'all'        - Keep every message (unbounded).
+# 'latest'     - Keep only the most recent message.
+# 'dropOldest' - Keep at most `maxSize` messages, discarding the oldest when full.
+# 'dropNewest' - Keep at most `maxSize` messages, discarding incoming ones when full.
+# 'block'      - Keep at most `maxSize` messages, pausing reads from the socket when full.
+DELIVERY_MODES = ('all', 'latest', 'dropOldest', 'dropNewest', 'block')
+
+class TopicQueue:
+    """ Buffers the messages of a topic until they are consumed. (Only for internal use)
+    \n
+    :param `delivery` - One of `DELIVERY_MODES`. \n
+    :param `maxSize` - The capacity for the 'dropOldest', 'dropNewest' and 'block' modes.
+    \n
+    :param `pause` - Called when a 'block' queue becomes full. \n
+    :param `resume` - Called when a full 'block' queue has room again. """
+
+    def __init__(self, delivery: str = 'all', maxSize: int = 0, pause = None, resume = None):
+        if delivery not in DELIVERY_MODES:
+            raise ValueError(f"Delivery must be one of {DELIVERY_MODES}")
+        if delivery == 'latest':
+            maxSize = 1
+        elif delivery == 'all':
+            maxSize = 0
+        elif maxSize < 1:
+            raise ValueError(f"Delivery '{delivery}' requires a maxSize of at least 1")
+
+        self._delivery = delivery
+        self._maxSize = maxSize
+        self._items = deque()
+        self._getters = deque()
+        self._pause = pause
+        self._resume = resume
+        self._paused = False
+        self.dropped = 0
+        self.closed = False
+
+    def __len__(self):
+        return len(self._items)
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def put_nowait(self, item):
+        """ Add a message, applying the overflow policy if the queue is full. """
+
+        items = self._items
+        if self._maxSize and len(items) >= self._maxSize:
+            if self._delivery == 'dropNewest':
+                self.dropped += 1
+                return
+            if self._delivery != 'block':
+                items.popleft()
+                self.dropped += 1
+
+        items.append(item)
+        if self._delivery == 'block' and not self._paused and len(items) >= self._maxSize:
+            self._paused = True
+            self._pause()
+
+        self._wakeNext()
+
+    async def wait(self):
+        """ Wait until a message is available or the queue is closed. """
+
+        while not self._items and not self.closed:
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except asyncio.CancelledError:
+                # Pass the wakeup on if this getter was chosen before it was cancelled
+                if getter.done() and not getter.cancelled() and self._items:
+                    self._wakeNext()
+                raise
+
+    async def get(self):
+        """ Remove and return the next message, waiting until one is available. Raises
+        `StopAsyncIteration` if the queue is closed. """
+
+        if not self._items:
+            await self.wait()
+            if not self._items:
+                raise StopAsyncIteration
+        return self.pop()
+
+    def pop(self):
+        """ Remove and return the next message, which must be available. """
+
+        item = self._items.popleft()
+        if self._paused and len(self._items) < self._maxSize:
+            self._paused = False
+            self._resume()
+        return item
+
+    def popMany(self, maxItems: int | None = None) -> list:
+        """ Remove and return up to `maxItems` of the available messages, all if None. """
+
+        items = self._items
+        count = len(items) if maxItems is None else min(maxItems, len(items))
+        batch = [items.popleft() for _ in range(count)]
+        if self._paused and len(items) < self._maxSize:
+            self._paused = False
+            self._resume()
+        return batch
+
+    def close(self):
+        """ Discard the buffered messages, wake everyone waiting for a message, and
+        release the socket if this queue paused it. """
+
+        self.closed = True
+        self._items.clear()
+        if self._paused:
+            self._paused = False
+            self._resume()
+        while self._getters:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+
+    def _wakeNext(self):
+        while self._getters:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+                break
@@ -0,0 +1,310 @@
+import asyncio
+import random
+from collections import deque
+from traceback import print_exc
+
+# Default amount of outgoing data (in bytes) that may be buffered before `drain()` makes
+# callers wait for the writer to catch up
+DEFAULT_HIGH_WATER_MARK = 1024 * 1024
+# Upper bound for how many bytes of queued messages are passed to a single write
+MAX_WRITE_SIZE = 256 * 1024
+# Bounds for the delay (in seconds) between reconnection attempts, which doubles with
+# every failed attempt
+MIN_RECONNECT_DELAY = 0.5
+MAX_RECONNECT_DELAY = 30.0
+
+class Transport:
+    """ The connection an `Api` talks to OpenSpace over. (Only for internal use) \n
+    Implements the parts every transport shares: the callbacks, the outgoing queue with
+    its high-water mark, read pausing and reconnection. Subclasses open and close the
+    connection, read messages in `_handle_receive` and write them in `_write`. \n
+    :param `address`, `port` - Where OpenSpace listens. \n
+    :param `highWaterMark` - The number of outgoing bytes buffered before `drain()`
+    waits. \n
+    :param `reconnect` - Whether to re-establish a lost connection. \n
+    :param `maxReconnectAttempts` - Attempts before giving up, None means no limit. """
+
+    def __init__(self, address: str, port: int, highWaterMark: int = DEFAULT_HIGH_WATER_MARK,
+                 reconnect: bool = False, maxReconnectAttempts: int | None = None):
+        self._address = address
+        self._port = port
+        self._client = None
+        self._onConnect = lambda: None
+        self._onDisconnect = lambda: None
+        self._onMessage = lambda message: None
+        self._onConnectionLost = lambda: None
+        self._onReconnect = None
+        self._onSend = None
+        # Traffic counters
+        self.messagesSent = 0
+        self.bytesSent = 0
+        self.messagesReceived = 0
+        self.bytesReceived = 0
+        # Reading is paused while any consumer holds a pause, see `pauseReading()`
+        self._readPauses = 0
+        self._readable = asyncio.Event()
+        self._readable.set()
+        self._disconnecting = False
+        self._receiveTask = None
+
+        # Automatic reconnection when the connection is lost unexpectedly
+        self._reconnect = reconnect
+        self._maxReconnectAttempts = maxReconnectAttempts
+        self._reconnecting = False
+
+        # Outgoing messages, already encoded and framed. Drained by `_handle_send`
+        self._outQueue = deque()
+        self._outBytes = 0
+        self._highWaterMark = highWaterMark
+        self._lowWaterMark = highWaterMark // 4
+        self._hasData = asyncio.Event()
+        self._belowHighWater = asyncio.Event()
+        self._belowHighWater.set()
+        self._sendTask = None
+
+    def onConnect(self, callback):
+        self._onConnect = callback
+
+    def onDisconnect(self, callback):
+        self._onDisconnect = callback
+
+    def onMessage(self, callback):
+        self._onMessage = callback
+
+    def onConnectionLost(self, callback):
+        """ Set the function called when the connection is lost and a reconnection is
+        about to be attempted. """
+
+        self._onConnectionLost = callback
+
+    def onReconnect(self, callback):
+        """ Set the async function awaited after reconnecting, before any message queued
+        during the outage is sent. """
+
+        self._onReconnect = callback
+
+    def onSend(self, callback):
+        """ Set a function called with every message passed to `send()`, or None. """
+
+        self._onSend = callback
+
+    async def _openConnection(self):
+        """ Establish the connection. Raises `OSError` if it could not be established. """
+
+        raise NotImplementedError
+
+    def _closeConnection(self):
+        """ Close the connection. """
+
+        raise NotImplementedError
+
+    async def _handle_receive(self):
+        """ Read messages and pass them to the message callback until the connection
+        ends, then call `_connection_lost()`. """
+
+        raise NotImplementedError
+
+    async def _write(self, chunks: list, size: int):
+        """ Write queued messages to the connection. Raises `OSError` if it fails. """
+
+        raise NotImplementedError
+
+    def _frame(self, message: bytes) -> bytes:
+        """ Prepare an encoded message for `_write`. """
+
+        return message
+
+    async def _open(self):
+        """ Open a new connection and start the receive and send tasks. Raises `OSError`
+        if the connection could not be established. """
+
+        await self._openConnection()
+        self._receiveTask = asyncio.create_task(self._handle_receive(), name="Handle receive")
+        self._sendTask = asyncio.create_task(self._handle_send(), name="Handle send")
+
+    async def connect(self):
+        self._loop = asyncio.get_running_loop()
+        try:
+            await self._open()
+            self._disconnecting = False
+            asyncio.create_task(self._onConnect(), name="On connect")
+        except OSError as e:
+            print(f"Could not connect to {self._address}:{self._port}. Is OpenSpace running?")
+            print(f"Error code: {e}")
+            self.disconnect()
+
+    def _connection_lost(self):
+        """ Handle an unexpected loss of the connection, by reconnecting if enabled and
+        otherwise disconnecting. """
+
+        if self._disconnecting or self._reconnecting:
+            return
+        if not self._reconnect:
+            self.disconnect()
+            return
+
+        self._reconnecting = True
+        for task in (self._receiveTask, self._sendTask):
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+        self._receiveTask = None
+        self._sendTask = None
+        self._closeConnection()
+
+        # Messages that were queued when the connection was lost may have been partially
+        # sent, the owner recovers the topics and requests they belong to
+        self._outQueue.clear()
+        self._outBytes = 0
+        self._belowHighWater.set()
+
+        self._onConnectionLost()
+        asyncio.create_task(self._reconnectLoop(), name="Reconnect")
+
+    async def _reconnectLoop(self):
+        attempt = 0
+        while not self._disconnecting:
+            if self._maxReconnectAttempts is not None and attempt >= self._maxReconnectAttempts:
+                print(f"Giving up reconnecting to {self._address}:{self._port}")
+                break
+
+            # Exponential backoff with jitter, so many clients do not retry in lockstep
+            delay = min(MAX_RECONNECT_DELAY, MIN_RECONNECT_DELAY * 2 ** attempt)
+            await asyncio.sleep(delay / 2 + random.uniform(0, delay / 2))
+            attempt += 1
+            if self._disconnecting:
+                return
+
+            # Hold back messages queued during the outage until the connection is restored
+            held = self._outQueue
+            heldBytes = self._outBytes
+            self._outQueue = deque()
+            self._outBytes = 0
+            # The new queue is empty, so requests made while restoring the session, such
+            # as authenticating, must not wait in `drain()` for the held messages
+            self._belowHighWater.set()
+            try:
+                await self._open()
+            except OSError as e:
+                print(f"Reconnecting to {self._address}:{self._port} failed: {e}")
+                held.extend(self._outQueue)
+                self._outQueue = held
+                self._outBytes += heldBytes
+                if self._outBytes > self._highWaterMark:
+                    self._belowHighWater.clear()
+                continue
+
+            # Messages queued while connecting are held as well, so that they are sent
+            # after the session has been restored
+            held.extend(self._outQueue)
+            heldBytes += self._outBytes
+            self._outQueue = deque()
+            self._outBytes = 0
+
+            self._reconnecting = False
+            try:
+                if self._onReconnect is not None:
+                    await self._onReconnect()
+            except Exception as e:
+                print(f"Error restoring connection: {type(e)}: {e}")
+                print_exc()
+            finally:
+                self._outQueue.extend(held)
+                self._outBytes += heldBytes
+                if self._outQueue:
+                    self._hasData.set()
+                if self._outBytes > self._highWaterMark:
+                    self._belowHighWater.clear()
+            return
+
+        self._reconnecting = False
+        self.disconnect()
+
+    async def _handle_send(self):
+        while True:
+            await self._hasData.wait()
+            if not self._outQueue:
+                self._hasData.clear()
+                continue
+
+            # Coalesce as many queued messages as fit into one write
+            chunks = [self._outQueue.popleft()]
+            size = len(chunks[0])
+            while self._outQueue and size + len(self._outQueue[0]) <= MAX_WRITE_SIZE:
+                chunk = self._outQueue.popleft()
+                chunks.append(chunk)
+                size += len(chunk)
+
+            try:
+                await self._write(chunks, size)
+            except OSError as e:
+                if not self._disconnecting:
+                    print(f"Error sending data: {type(e)}: {e}")
+                break
+
+            self._outBytes -= size
+            if self._outBytes <= self._lowWaterMark:
+                self._belowHighWater.set()
+
+        self._connection_lost()
+
+    def send(self, message):
+        """ Queue a message to be sent to OpenSpace. The message is written by a
+        background task, call `drain()` to wait until the outgoing buffer is below its
+        high-water mark. \n
+        :param `message` - The message to send, as a `str` or `bytes`. """
+
+        if self._disconnecting:
+            # Nothing will write the message anymore
+            return
+
+        if isinstance(message, str):
+            message = message.encode()
+        if self._onSend is not None:
+            self._onSend(message)
+        data = self._frame(message)
+        self.messagesSent += 1
+        self.bytesSent += len(data)
+
+        self._outQueue.append(data)
+        self._outBytes += len(data)
+        self._hasData.set()
+        if self._outBytes > self._highWaterMark:
+            self._belowHighWater.clear()
+
+    async def drain(self):
+        """ Wait until the outgoing buffer has been flushed below its high-water mark. """
+
+        await self._belowHighWater.wait()
+
+    def pauseReading(self):
+        """ Stop reading from the connection until every pause has been matched by a call
+        to `resumeReading()`. Unread data is left to the connection's flow control. """
+
+        self._readPauses += 1
+        self._readable.clear()
+
+    def resumeReading(self):
+        """ Release a pause taken with `pauseReading()`. """
+
+        self._readPauses -= 1
+        if self._readPauses <= 0:
+            self._readPauses = 0
+            self._readable.set()
+
+    def disconnect(self):
+        if self._disconnecting:
+             return
+
+        self._disconnecting = True
+        for task in (self._receiveTask, self._sendTask):
+            if task is not None:
+                task.cancel()
+        self._receiveTask = None
+        self._sendTask = None
+        self._outQueue.clear()
+        self._outBytes = 0
+        # Release anyone waiting in `drain()`, there is nothing left to wait for
+        self._belowHighWater.set()
+        self._onDisconnect()
+        if self._client is not None:
+            self._closeConnection()
@@ -0,0 +1,85 @@
+from traceback import print_exc
+from .transport import Transport, DEFAULT_HIGH_WATER_MARK
+
+try:
+    from websockets.asyncio.client import connect as _connect
+    from websockets.exceptions import ConnectionClosed, InvalidHandshake, InvalidURI
+except ImportError:
+    _connect = None
+
+# The largest message accepted from OpenSpace. The lua documentation alone is several
+# megabytes, so this is far above the websockets default of 1 MiB
+MAX_MESSAGE_SIZE = 256 * 1024 * 1024
+
+class WebSocketTransport(Transport):
+    """ A transport over the WebSocket interface of OpenSpace's server module (port 4682
+    by default), with one message per WebSocket frame. (Only for internal use, see the
+    `transport` parameter of `Api`) \n
+    Messages are compressed with permessage-deflate when OpenSpace agrees to it, which
+    shrinks large responses such as the documentation considerably on slow links. \n
+    :param `compression` - Whether to offer permessage-deflate. \n
+    :param `path` - The path of the WebSocket endpoint. \n
+    See `Transport` for the remaining parameters. """
+
+    def __init__(self, address: str, port: int, highWaterMark: int = DEFAULT_HIGH_WATER_MARK,
+                 reconnect: bool = False, maxReconnectAttempts: int | None = None,
+                 compression: bool = True, path: str = '/'):
+        if _connect is None:
+            raise ImportError(
+                "The WebSocket transport requires websockets, install it with "
+                "`pip install websockets`"
+            )
+        super().__init__(address, port, highWaterMark, reconnect, maxReconnectAttempts)
+        self._uri = f"ws://{address}:{port}{path}"
+        self._compression = 'deflate' if compression else None
+
+    @property
+    def compressed(self) -> bool:
+        """ Whether the current connection uses permessage-deflate. """
+
+        return self._client is not None and any(
+            extension.name == 'permessage-deflate'
+            for extension in self._client.protocol.extensions
+        )
+
+    async def _openConnection(self):
+        try:
+            self._client = await _connect(
+                self._uri, compression=self._compression, max_size=MAX_MESSAGE_SIZE,
+                # Reads are paused by not receiving, let the socket apply the backpressure
+                max_queue=16, proxy=None
+            )
+        except (InvalidHandshake, InvalidURI) as e:
+            raise ConnectionError(f"WebSocket handshake failed: {e}") from e
+
+    def _closeConnection(self):
+        # Closes the TCP connection without waiting for the closing handshake
+        self._client.transport.abort()
+
+    async def _handle_receive(self):
+        while True:
+            if not self._readable.is_set():
+                await self._readable.wait()
+            try:
+                # Text frames are passed on undecoded, the codec reads UTF-8 bytes
+                message = await self._client.recv(decode=False)
+            except ConnectionClosed as e:
+                if not self._disconnecting:
+                    print(f"Connection exited with: {e}")
+                break
+
+            self.messagesReceived += 1
+            self.bytesReceived += len(message)
+            try:
+                self._onMessage(message)
+            except Exception as e:
+                print(f"Error receiving data: {type(e)}: {e}")
+                print_exc()
+        self._connection_lost()
+
+    async def _write(self, chunks: list, size: int):
+        try:
+            for chunk in chunks:
+                await self._client.send(chunk, text=True)
+        except ConnectionClosed as e:
+            raise ConnectionError(str(e)) from e
@@ -0,0 +1,54 @@
+import asyncio
+import openspace
+
+def batchServer(scripts):
+    def lua(functionOrScript, *args):
+        scripts.append(functionOrScript)
+        return functionOrScript
+    return openspace.MockServer(updateRate=None, luaHandler=lua)
+
+def test_scripts_are_sent_one_by_one():
+    async def main():
+        scripts = []
+        async with batchServer(scripts) as server:
+            api = openspace.Api('localhost', server.port)
+            await api.connect()
+
+            async with api.batch() as batch:
+                await api.executeLuaScript("local a = 1", False)
+                await api.executeLuaScript("return a", False)
+                await api.executeLuaScript("get", True)
+            assert scripts == ["local a = 1", "return a", "get"]
+            assert batch.results == [None, None, { '1': "get" }]
+            api.disconnect()
+
+    asyncio.run(main())
+
+def test_merged_scripts_keep_to_their_blocks():
+    async def main():
+        scripts = []
+        async with batchServer(scripts) as server:
+            api = openspace.Api('localhost', server.port)
+            await api.connect()
+
+            async with api.batch(mergeScripts=True) as batch:
+                await api.executeLuaScript("local a = 1", False)
+                await api.executeLuaScript("return a", False)
+                await api.executeLuaScript("first", True)
+                await api.executeLuaScript("b()", False)
+                await api.executeLuaFunction("f", [])
+                await api.executeLuaScript("c()", False)
+                await api.executeLuaScript("unsynchronized()", False, False)
+
+            assert scripts == [
+                "do\nlocal a = 1\nend\ndo\nreturn a\nend",
+                "first",
+                "b()",
+                "f",
+                "c()",
+                "unsynchronized()"
+            ]
+            assert batch.results == [None, None, { '1': "first" }, None, { '1': "f" }, None, None]
+            api.disconnect()
+
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+import json
+from collections import namedtuple
+import pytest
+from openspace import toNamedTuple
+from openspace.src.codec import getCodec, peekTopic
+
+@pytest.mark.parametrize('frame, topic', [
+    (b'{"topic": 5, "payload": {"Value": 1}}', 5),
+    (b'{"payload": {"Value": 1}, "topic": 12}', 12),
+    (b'{"topic":7}', 7),
+    (b'{"payload": [1, 2], "topic" :3}', None),
+    (b'{"payload": 1,\n  "topic":\n 42\n}', 42),
+    (b'{"topic": 123456789012, "payload": null}', 123456789012),
+])
+def test_topic_is_found(frame, topic):
+    assert peekTopic(frame) == topic
+
+@pytest.mark.parametrize('frame', [
+    # No topic at all
+    b'{"payload": {"Value": 1}}',
+    b'',
+    # The key occurs more than once, which one is the message's is ambiguous
+    b'{"payload": {"topic": 3}, "topic": 7}',
+    b'{"topic": 7, "payload": {"topic": 3}}',
+    # Not an integer
+    b'{"topic": "7", "payload": 1}',
+    b'{"topic": 7.5, "payload": 1}',
+    b'{"topic": -7, "payload": 1}',
+    b'{"topic": null}',
+    # Truncated
+    b'{"topic": 7',
+    b'{"topic":',
+])
+def test_ambiguous_or_invalid_frames_are_left_to_the_decoder(frame):
+    assert peekTopic(frame) is None
+
+def test_escaped_key_in_a_string_is_not_a_topic():
+    frame = json.dumps({ 'payload': { 'message': '"topic": 9' }, 'topic': 4 }).encode()
+    assert peekTopic(frame) == 4
+
+def test_agrees_with_decoding():
+    codec = getCodec('json')
+    payloads = [None, 0, 'topic', { 'topic': 1 }, [{ 'a': '"topic":2' }], { 'Value': [1.5, 2] }]
+    for topic in (0, 1, 99, 2 ** 40):
+        for payload in payloads:
+            for message in ({ 'topic': topic, 'payload': payload },
+                            { 'payload': payload, 'topic': topic }):
+                frame = codec.dumps(message)
+                peeked = peekTopic(frame)
+                if peeked is not None:
+                    assert peeked == codec.loads(frame)['topic']
+
+def codecOrSkip(name):
+    try:
+        return getCodec(name)
+    except ImportError:
+        pytest.skip(f"{name} is not installed")
+
+@pytest.mark.parametrize('name', ['orjson', 'msgspec', 'json'])
+def test_codecs_encode_the_same_values(name):
+    codec = codecOrSkip(name)
+    Position = namedtuple('Position', 'x y z')
+    value = {
+        'position': Position(1.0, 2.0, 3.0),
+        'nested': toNamedTuple({ 'a': 1, 'b': [1, 2] }, 'Nested'),
+        'tuple': (1, 'a'),
+        1: 'lua index'
+    }
+    assert json.loads(codec.dumps(value)) == {
+        'position': [1.0, 2.0, 3.0],
+        'nested': [1, [1, 2]],
+        'tuple': [1, 'a'],
+        '1': 'lua index'
+    }
+
+    np = pytest.importorskip('numpy')
+    numbers = [np.float64(1.5), np.float32(0.5), np.int64(3), np.bool_(True), np.arange(3)]
+    assert json.loads(codec.dumps(numbers)) == [1.5, 0.5, 3, True, [0, 1, 2]]
+
+@pytest.mark.parametrize('name', ['orjson', 'msgspec', 'json'])
+def test_codecs_reject_unknown_types(name):
+    codec = codecOrSkip(name)
+    with pytest.raises(TypeError):
+        codec.dumps({ 'value': object() })
+
+@pytest.mark.parametrize('name, encoded', [
+    ('orjson', b'[null]'), ('msgspec', b'[null]'), ('json', b'[NaN]')
+])
+def test_nan_encoding(name, encoded):
+    codec = codecOrSkip(name)
+    assert codec.dumps([float('nan')]).replace(b' ', b'') == encoded
@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+import openspace
+from openspace.src import decoding
+
+def test_to_named_tuple_reuses_its_classes():
+    first = openspace.toNamedTuple({ 'Description': { 'Name': 'A' }, 'Value': 1 })
+    second = openspace.toNamedTuple({ 'Description': { 'Name': 'B' }, 'Value': 2 })
+    assert type(first) is type(second)
+    assert type(first.Description) is type(second.Description)
+    assert second.Description.Name == 'B'
+    assert second.Value == 2
+
+def test_lua_arrays_become_sequences():
+    decoder = openspace.TypedDecoder()
+    # OpenSpace sorts the keys as strings
+    table = { str(i): i for i in range(1, 12) }
+    table = dict(sorted(table.items()))
+    assert decoder(table) == list(range(1, 12))
+    assert openspace.TypedDecoder('tuple')({ '2': 'b', '1': 'a' }) == ('a', 'b')
+
+def test_tables_that_are_not_arrays():
+    decoder = openspace.TypedDecoder()
+    # Missing index
+    assert decoder({ '1': 'a', '3': 'c' }) == { '1': 'a', '3': 'c' }
+    # Keys that are not identifiers stay a dictionary, its values are still decoded
+    assert decoder({ 'Scene.Earth': { '1': 1 } }) == { 'Scene.Earth': [1] }
+    assert decoder({}) == []
+
+def test_structs_are_cached_by_key_shape():
+    decoder = openspace.TypedDecoder()
+    first = decoder({ 'Description': { 'Name': 'A' }, 'Value': { '1': 1.0 } }, 'Property')
+    second = decoder({ 'Description': { 'Name': 'B' }, 'Value': { '1': 2.0 } }, 'Property')
+    assert type(first) is type(second)
+    assert type(first).__name__ == 'Property'
+    assert type(first.Description).__name__ == 'Description'
+    assert second.Value == [2.0]
+    assert openspace.TypedDecoder(structs=False)({ 'Value': { '1': 1 } }) == { 'Value': [1] }
+
+def test_numpy_arrays():
+    np = pytest.importorskip('numpy')
+    decoder = openspace.TypedDecoder('numpy')
+    position = decoder({ '1': 1.5, '2': 2.5, '3': 3.5 })
+    assert isinstance(position, np.ndarray)
+    assert position.tolist() == [1.5, 2.5, 3.5]
+
+    matrix = decoder([[1, 2], [3, 4]])
+    assert matrix.shape == (2, 2)
+
+    # Only numeric vectors become arrays
+    assert decoder(['a', 1]) == ['a', 1]
+    assert decoder([True, False]) == [True, False]
+    assert decoder([[1, 2], [3]])[1].tolist() == [3]
+
+def test_get_decoder():
+    assert decoding.getDecoder(False) is None
+    assert decoding.getDecoder(True) is decoding.getDecoder('list')
+    decoder = openspace.TypedDecoder('tuple')
+    assert decoding.getDecoder(decoder) is decoder
+    with pytest.raises(ValueError):
+        decoding.getDecoder('set')
+
+def test_decode_per_call():
+    async def main():
+        async with openspace.MockServer(properties={ 'A.B': [1.0, 2.0] }) as server:
+            api = openspace.Api('localhost', server.port)
+            await api.connect()
+
+            value = await api.getProperty('A.B', decode='tuple')
+            assert value.Value == (1.0, 2.0)
+            assert isinstance(await api.getProperty('A.B'), dict)
+
+            typed = api.subscribeToProperty('A.B', decode=True)
+            raw = api.subscribeToProperty('A.B')
+            assert (await typed.next(timeout=5.0)).Description.Identifier == 'B'
+            assert isinstance(await raw.next(timeout=5.0), dict)
+            typed.cancel()
+            raw.cancel()
+            api.disconnect()
+
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+import asyncio
+import time
+import pytest
+import openspace
+
+class DelayedApi(openspace.Api):
+    """ An Api whose requests take `delay` seconds longer, like a busy node. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delay = 0.0
+
+    async def _request(self, type, payload, timeout = None):
+        await asyncio.sleep(self.delay)
+        return await super()._request(type, payload, timeout)
+
+def runGroup(test, nodes = 3, **options):
+    """ Run `test(group, apis)` with a group of connected nodes, each with its own
+    MockServer. """
+
+    async def main():
+        servers = [
+            openspace.MockServer(updateRate=None, properties={ 'A.B': i })
+            for i in range(nodes)
+        ]
+        for server in servers:
+            await server.start()
+        group = openspace.ApiGroup(
+            { f"node{i}": ('localhost', server.port) for i, server in enumerate(servers) },
+            apiClass=options.pop('apiClass', DelayedApi), **options
+        )
+        assert await group.connect() == [f"node{i}" for i in range(nodes)]
+        try:
+            await test(group, list(group.nodes.values()))
+        finally:
+            group.disconnect()
+            for server in servers:
+                server.close()
+
+    asyncio.run(main())
+
+def values(results):
+    return { name: result.result['Value'] if result.done and result.error is None else None
+             for name, result in results.items() }
+
+def test_all_waits_for_every_node():
+    async def test(group, apis):
+        apis[2].delay = 0.1
+        results = await group.getProperty('A.B')
+        assert values(results) == { 'node0': 0, 'node1': 1, 'node2': 2 }
+        assert all(result.latency is not None for result in results.values())
+
+    runGroup(test)
+
+def test_first_returns_with_one_answer():
+    async def test(group, apis):
+        apis[1].delay = apis[2].delay = 0.5
+        start = time.monotonic()
+        results = await group.getProperty('A.B', policy='first')
+        assert time.monotonic() - start < 0.4
+        assert values(results) == { 'node0': 0, 'node1': None, 'node2': None }
+        # The others were not late, the broadcast just did not need them
+        assert not any(stats['lagging'] for stats in group.stats().values())
+
+    runGroup(test)
+
+def test_quorum_returns_with_enough_answers():
+    async def test(group, apis):
+        apis[0].delay = 0.5
+        results = await group.getProperty('A.B', policy='quorum', quorum=2)
+        assert values(results) == { 'node0': None, 'node1': 1, 'node2': 2 }
+
+        with pytest.raises(ValueError):
+            await group.getProperty('A.B', policy='quorum', quorum=4)
+
+    runGroup(test)
+
+def test_failures_do_not_count_towards_the_quorum():
+    async def test(group, apis):
+        async def call(api):
+            if api is apis[0]:
+                raise RuntimeError("failed")
+            await asyncio.sleep(0.1 if api is apis[2] else 0.0)
+            return api
+
+        results = await group.broadcast(call, policy='quorum', quorum=2)
+        assert isinstance(results['node0'].error, RuntimeError)
+        assert results['node2'].done
+        assert group.stats()['node0']['failures'] == 1
+
+    runGroup(test)
+
+def test_lagging_nodes_are_not_waited_for_until_they_catch_up():
+    async def test(group, apis):
+        apis[1].delay = 0.3
+        results = await group.getProperty('A.B')
+        assert values(results) == { 'node0': 0, 'node1': None, 'node2': 2 }
+        stats = group.stats()['node1']
+        assert stats['lagging'] and stats['timeouts'] == 1
+
+        # Lagging nodes still get the call, but the broadcast does not wait for them
+        start = time.monotonic()
+        results = await group.getProperty('A.B')
+        assert time.monotonic() - start < 0.2
+        assert not results['node1'].done
+
+        # Once the node answers the probe it is waited for again
+        apis[1].delay = 0.0
+        while group.stats()['node1']['lagging']:
+            await asyncio.sleep(0.05)
+        assert values(await group.getProperty('A.B')) == { 'node0': 0, 'node1': 1, 'node2': 2 }
+
+    runGroup(test, timeout=0.15)
+
+def test_pooled_nodes_recover():
+    async def test(group, apis):
+        # Stall the first connection of the first node's pool, nothing is sent on it
+        member = apis[0]._members[0]
+        member._socket._sendTask.cancel()
+        await group.broadcast(
+            lambda api: api._members[0]._request('version', {}) if api is apis[0] else
+                        api.getProperty('A.B')
+        )
+        assert group.stats()['node0']['lagging']
+
+        # The probe has to go through the stalled connection as well
+        await asyncio.sleep(0.3)
+        assert group.stats()['node0']['lagging']
+        member._socket._sendTask = asyncio.create_task(member._socket._handle_send())
+        while group.stats()['node0']['lagging']:
+            await asyncio.sleep(0.05)
+
+    runGroup(test, nodes=2, timeout=0.1, apiClass=openspace.ApiPool, size=2)
+
+def test_cancelled_calls_are_reported():
+    async def test(group, apis):
+        async def call(api):
+            if api is apis[1]:
+                asyncio.current_task().cancel()
+            await asyncio.sleep(0)
+            return 1
+
+        results = await group.broadcast(call)
+        assert isinstance(results['node1'].error, asyncio.CancelledError)
+        assert results['node0'].result == 1
+
+    runGroup(test, nodes=2)
+
+def test_unconnected_nodes_are_skipped():
+    async def main():
+        async with openspace.MockServer(updateRate=None) as server:
+            closed = openspace.MockServer()
+            await closed.start()
+            port = closed.port
+            closed.close()
+            await closed._server.wait_closed()
+
+            group = openspace.ApiGroup([('localhost', server.port), ('localhost', port)])
+            assert await group.connect() == [f"localhost:{server.port}"]
+            results = await group.getProperty('A.B')
+            assert results[f"localhost:{server.port}"].done
+            assert isinstance(results[f"localhost:{port}"].error, ConnectionError)
+            group.disconnect()
+
+    asyncio.run(main())
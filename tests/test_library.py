@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+import openspace
+
+@pytest.mark.parametrize('error', [asyncio.TimeoutError, ConnectionError])
+def test_cache_key_falls_back_to_the_address(tmp_path, error):
+    async def main():
+        async with openspace.MockServer(libraries=2, functionsPerLibrary=2) as server:
+            api = openspace.Api('localhost', server.port)
+            await api.connect()
+            request = api._request
+
+            async def failingVersion(type, payload, timeout = None):
+                if type == 'version':
+                    raise error()
+                return await request(type, payload, timeout)
+
+            api._request = failingVersion
+            assert await api._documentationKey() == f"127.0.0.1:{server.port}"
+
+            await api.library(cache=str(tmp_path))
+            await api.library(cache=str(tmp_path))
+            assert api.libraryLoadStats()['source'] == 'cache'
+            api.disconnect()
+
+    asyncio.run(main())
+
+def lazyLibrary(wrapper = None):
+    from openspace.src.library import LuaLibrary
+    calls = []
+    index = { '': ['time', 'printInfo'], 'globebrowsing': ['addLayer'], 'sky': ['show'] }
+    call = lambda name, *args: calls.append((name, args)) or name
+    return LuaLibrary(index, call, wrapper), calls
+
+def test_functions_are_resolved_on_first_access():
+    library, calls = lazyLibrary()
+    # Nothing is built up front
+    assert 'time' not in vars(library) and 'globebrowsing' not in vars(library)
+
+    assert library.time(1) == 'openspace.time'
+    assert library.globebrowsing.addLayer('Earth', {}) == 'openspace.globebrowsing.addLayer'
+    assert calls == [('openspace.time', (1,)), ('openspace.globebrowsing.addLayer', ('Earth', {}))]
+
+    # And memoized once resolved
+    assert library.time is library.time
+    assert library.globebrowsing is library['globebrowsing']
+    assert 'time' in vars(library) and 'printInfo' not in vars(library)
+    assert 'addLayer' in vars(library.globebrowsing)
+
+def test_unknown_names_raise():
+    library, _ = lazyLibrary()
+    with pytest.raises(AttributeError, match="'openspace' has no function or library 'nope'"):
+        library.nope
+    with pytest.raises(AttributeError, match="'openspace.sky'"):
+        library.sky.hide
+    with pytest.raises(KeyError):
+        library['nope']
+    # Sublibraries do not contain other libraries
+    with pytest.raises(AttributeError):
+        library.sky.globebrowsing
+    assert not hasattr(library, '_luaMissing')
+
+def test_listing_and_wrapping():
+    wrapped = []
+    library, _ = lazyLibrary(lambda function, *args: wrapped.append(args) or function(*args))
+    assert dir(library) == ['globebrowsing', 'printInfo', 'sky', 'time']
+    assert dir(library.globebrowsing) == ['addLayer']
+    assert repr(library.sky) == "<LuaLibrary 'openspace.sky'>"
+
+    assert library.sky.show('Stars') == 'openspace.sky.show'
+    assert wrapped == [('Stars',)]
+
+def test_library_from_server():
+    async def main():
+        # The first generated library is the top level one
+        async with openspace.MockServer(libraries=3, functionsPerLibrary=2) as server:
+            api = openspace.Api('localhost', server.port)
+            await api.connect()
+            library = await api.library()
+            assert len(library._luaFunctions) == 2
+            names = [name for name in dir(library) if name not in library._luaFunctions]
+            assert len(names) == 2
+            sublibrary = getattr(library, names[0])
+            assert len(dir(sublibrary)) == 2
+            api.disconnect()
+
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import pytest
+import openspace
+from openspace.src.codec import Codec
+
+class CountingCodec(Codec):
+    """ Counts the messages decoded. """
+
+    def __init__(self):
+        self.decoded = []
+
+    def loads(self, data: bytes):
+        self.decoded.append(bytes(data))
+        return super().loads(data)
+
+def frame(topic, text) -> bytes:
+    return json.dumps({ 'topic': topic, 'payload': { 'message': text } }).encode()
+
+def runStream(test, **options):
+    async def main():
+        codec = CountingCodec()
+        api = openspace.Api('localhost', 4681, codec=codec)
+        topic = api._nextTopicId
+        batches = []
+        stream = api.subscribeToLogMessages(
+            { 'logLevelStamping': True, 'categoryStamping': True }, batches.append,
+            batched=True, **{ 'batchInterval': 0.01, **options }
+        )
+        send = lambda text: api._handle_message(frame(topic, text))
+        await test(send, stream, batches, codec)
+        await stream()
+
+    asyncio.run(main())
+
+def test_messages_are_filtered_before_decoding():
+    async def test(send, stream, batches, codec):
+        send('[2024-01-01 | 12:00:00] Renderer (Debug) Too verbose')
+        send('[2024-01-01 | 12:00:00] Renderer (Warning) Kept')
+        send('Scene (Error) Kept without a date')
+        send('[2024-01-01 | 12:00:00] Scene (Info) Too verbose')
+        send('Renderer (Fatal) Kept')
+        await asyncio.sleep(0.05)
+
+        texts = [message['message'] for batch in batches for message in batch]
+        assert texts == [
+            '[2024-01-01 | 12:00:00] Renderer (Warning) Kept',
+            'Scene (Error) Kept without a date',
+            'Renderer (Fatal) Kept'
+        ]
+        # The rejected frames were never decoded
+        assert not any(b'Too verbose' in data for data in codec.decoded)
+        assert stream.stats()['rejected'] == 2
+
+    runStream(test, minLevel='Warning')
+
+def test_categories_filter():
+    async def test(send, stream, batches, codec):
+        send('Renderer (Info) Rejected')
+        send('Scene (Info) Kept')
+        # Messages without stamps can not be filtered and are kept
+        send('No stamps at all')
+        send('(Info) No category')
+        send('Scene (Trace) Below the level')
+        await asyncio.sleep(0.05)
+
+        texts = [message['message'] for batch in batches for message in batch]
+        assert texts == ['Scene (Info) Kept', 'No stamps at all', '(Info) No category']
+        assert len(codec.decoded) == 3
+
+    runStream(test, minLevel='Debug', categories=['Scene'])
+
+def test_full_buffer_drops_the_oldest_messages():
+    async def test(send, stream, batches, codec):
+        for i in range(5):
+            send(f'Scene (Info) {i}')
+        assert stream.stats()['dropped'] == 2
+        await asyncio.sleep(0.05)
+        texts = [message['message'] for batch in batches for message in batch]
+        assert texts == ['Scene (Info) 2', 'Scene (Info) 3', 'Scene (Info) 4']
+
+    runStream(test, maxBuffered=3)
+
+def test_batch_size_triggers_delivery_early():
+    async def test(send, stream, batches, codec):
+        for i in range(4):
+            send(f'Scene (Info) {i}')
+        await asyncio.sleep(0.05)
+        # Delivered long before the batch interval
+        assert [len(batch) for batch in batches] == [2, 2]
+
+    runStream(test, batchSize=2, batchInterval=10.0)
+
+def test_stopping_a_full_batch_delivers_it_once():
+    async def test(send, stream, batches, codec):
+        for i in range(3):
+            send(f'Scene (Info) {i}')
+        # The batch is full as the stream stops
+        await asyncio.wait_for(stream.stop(), 1.0)
+        assert [len(batch) for batch in batches] == [2, 1]
+        assert stream.stats()['delivered'] == 3
+
+    runStream(test, batchSize=2)
+
+def test_invalid_filters_are_rejected():
+    async def main():
+        api = openspace.Api('localhost', 4681)
+        with pytest.raises(ValueError):
+            api.subscribeToLogMessages({}, batched=True, minLevel='Loud')
+
+    asyncio.run(main())
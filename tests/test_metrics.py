@@ -0,0 +1,90 @@
+import asyncio
+import time
+import openspace
+from openspace.src.metrics import Histogram, StallMonitor, RESOLUTION, BUCKETS
+
+def test_samples_fall_in_power_of_two_buckets():
+    histogram = Histogram()
+    for seconds in (0.0, RESOLUTION / 2, RESOLUTION, 3 * RESOLUTION, 4 * RESOLUTION, 1e6):
+        histogram.record(seconds)
+
+    snapshot = histogram.snapshot()
+    assert snapshot['buckets'] == [
+        [RESOLUTION, 2],        # Below the resolution
+        [2 * RESOLUTION, 1],
+        [4 * RESOLUTION, 1],
+        [8 * RESOLUTION, 1],
+        # Anything too long ends up in the last bucket
+        [RESOLUTION * 2 ** (BUCKETS - 1), 1]
+    ]
+    assert (snapshot['count'], snapshot['min'], snapshot['max']) == (6, 0.0, 1e6)
+
+def test_percentiles_are_upper_bounds():
+    histogram = Histogram()
+    assert histogram.percentile(50) is None and histogram.snapshot()['mean'] is None
+
+    for _ in range(90):
+        histogram.record(0.0015)
+    for _ in range(10):
+        histogram.record(0.1)
+
+    snapshot = histogram.snapshot()
+    assert 0.0015 <= snapshot['p50'] < 0.003
+    assert snapshot['p50'] == snapshot['p90']
+    # Bounded by the largest sample rather than the bucket
+    assert snapshot['p99'] == 0.1
+    assert abs(snapshot['mean'] - 0.01135) < 1e-9
+
+def test_request_latencies_per_topic_and_function():
+    async def main():
+        async with openspace.MockServer(properties={ 'A.B': 0 }) as server:
+            api = openspace.Api('localhost', server.port)
+            await api.connect()
+            await api.getProperty('A.B')
+            api.enableMetrics()
+            await api.getProperty('A.B')
+            await api.executeLuaFunction('openspace.time.currentTime', [])
+
+            stats = api.stats()
+            # Requests made before enabling are not counted
+            assert stats['latency']['get']['count'] == 1
+            assert stats['latency']['luascript']['count'] == 1
+            assert list(stats['luaLatency']) == ['openspace.time.currentTime']
+            assert stats['failedRequests'] == 0
+
+            api.enableMetrics(False)
+            assert 'latency' not in api.stats()
+            api.disconnect()
+
+    asyncio.run(main())
+
+def test_stall_monitor_measures_blocked_loop():
+    async def main():
+        monitor = StallMonitor(interval=0.005)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        # Block the loop
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        monitor.stop()
+        assert monitor._task is None
+
+        snapshot = monitor.snapshot()
+        assert snapshot['count'] >= 3
+        assert 0.09 <= snapshot['max'] <= snapshot['total']
+        count = snapshot['count']
+        await asyncio.sleep(0.02)
+        assert monitor.snapshot()['count'] == count
+
+    asyncio.run(main())
+
+def test_event_loop_stalls_in_stats():
+    async def main():
+        api = openspace.Api('localhost', 4681)
+        api.enableMetrics(monitorEventLoop=True)
+        await asyncio.sleep(0.05)
+        assert api.stats()['eventLoopStalls']['count'] > 0
+        api.enableMetrics(monitorEventLoop=False)
+        assert 'eventLoopStalls' not in api.stats()
+
+    asyncio.run(main())
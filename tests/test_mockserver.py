@@ -0,0 +1,24 @@
+import asyncio
+import pytest
+import openspace
+
+@pytest.mark.parametrize('transport', ['tcp', 'websocket'])
+def test_exit_leaves_no_tasks_behind(transport):
+    if transport == 'websocket':
+        pytest.importorskip('websockets')
+
+    async def main():
+        async with openspace.MockServer(updateRate=100.0, transport=transport) as server:
+            api = openspace.Api('localhost', server.port, transport=transport)
+            await api.connect()
+            topic = api.subscribeToProperty('A.B', shared=False)
+            await topic.next(timeout=5.0)
+            assert server._handlers
+
+        # The connection handler and the subscription's stream have finished
+        assert not server._handlers
+        api.disconnect()
+        await asyncio.sleep(0)
+        assert asyncio.all_tasks() == { asyncio.current_task() }
+
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import openspace
+from openspace.src.codec import getCodec
+from openspace.src.offload import OffloadedDecoder, assemble, decodeInParts
+
+class GatedExecutor(ThreadPoolExecutor):
+    """ A thread pool that holds every decode until `gate` is set. """
+
+    def __init__(self):
+        super().__init__(1)
+        self.gate = threading.Event()
+
+    def submit(self, fn, *args):
+        def gated():
+            self.gate.wait(5.0)
+            return fn(*args)
+        return super().submit(gated)
+
+def message(topic, payload) -> bytes:
+    return json.dumps({ 'topic': topic, 'payload': payload }).encode()
+
+def decoder(executor, delivered, threshold = 100):
+    return OffloadedDecoder(
+        getCodec('json'), lambda messageObject, _: delivered.append(messageObject['payload']),
+        threshold, executor
+    )
+
+def test_only_large_messages_are_offloaded():
+    async def main():
+        delivered = []
+        offloaded = decoder(ThreadPoolExecutor(1), delivered)
+        small = message(1, 'small')
+        large = message(1, 'x' * 200)
+        assert not offloaded.wants(1, len(small))
+        assert offloaded.wants(1, len(large))
+
+        offloaded.submit(1, large)
+        # While a large message of the topic is in flight, its small ones wait for it
+        assert offloaded.wants(1, len(small))
+        assert not offloaded.wants(2, len(small))
+        offloaded.submit(1, small)
+        while offloaded.stats()['topicsInFlight']:
+            await asyncio.sleep(0.01)
+
+        assert delivered == ['x' * 200, 'small']
+        assert offloaded.stats()['offloaded'] == 1
+        assert offloaded.stats()['offloadedBytes'] == len(large)
+        offloaded.close()
+
+    asyncio.run(main())
+
+def test_messages_are_ordered_per_topic():
+    async def main():
+        delivered = []
+        executor = GatedExecutor()
+        offloaded = decoder(executor, delivered)
+
+        offloaded.submit(1, message(1, 'a' * 200))
+        offloaded.submit(1, message(1, 'b'))
+        offloaded.submit(2, message(2, 'c'))
+        await asyncio.sleep(0.05)
+        # The other topic is not held up by the large message
+        assert delivered == ['c']
+
+        executor.gate.set()
+        while offloaded.stats()['topicsInFlight']:
+            await asyncio.sleep(0.01)
+        assert delivered == ['c', 'a' * 200, 'b']
+        offloaded.close()
+        executor.shutdown()
+
+    asyncio.run(main())
+
+def test_parts_are_assembled_to_the_decoded_message():
+    payload = {
+        'list': [{ 'name': f"item{i}", 'values': list(range(i % 7)) } for i in range(2000)],
+        'nested': { str(i): 'x' * (i % 50) for i in range(1000) },
+        'empty': [],
+        'number': 1.5
+    }
+    encoded = message(3, payload)
+    parts = decodeInParts('json', encoded, partSize=1024)
+    # The message was split, not returned whole
+    assert type(parts) is tuple
+    assert asyncio.run(assemble(parts)) == json.loads(encoded)
+    # Small messages are returned whole
+    assert asyncio.run(assemble(decodeInParts('json', message(4, [1, 2])))) == \
+        { 'topic': 4, 'payload': [1, 2] }
+
+def test_documentation_decoded_in_a_process():
+    async def main():
+        async with openspace.MockServer(libraries=10, functionsPerLibrary=50, payloadSize=100) as server:
+            api = openspace.Api('localhost', server.port)
+            await api.connect()
+            inline = await api.getDocumentation('lua')
+
+            api.offloadDecoding(16 * 1024, 'process', 1)
+            assert await api.getDocumentation('lua') == inline
+            assert api.stats()['decoding']['offloaded'] == 1
+
+            api.offloadDecoding(None)
+            api.disconnect()
+
+    asyncio.run(main())
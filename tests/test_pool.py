@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+import openspace
+
+def test_writes_and_batches_stay_in_order():
+    async def main():
+        calls = []
+
+        def lua(functionOrScript, *args):
+            calls.append(functionOrScript)
+
+        async with openspace.MockServer(updateRate=None, luaHandler=lua) as server:
+            pool = openspace.ApiPool('localhost', server.port, size=4)
+            await pool.connect()
+
+            for i in range(50):
+                pool.setProperty('A.B', i)
+            assert (await pool.getProperty('A.B'))['Value'] in range(50)
+            await pool.drain()
+
+            async with pool.batch():
+                for i in range(6):
+                    await pool.executeLuaScript(f"s{i}", False)
+                    await pool.executeLuaFunction(f"f{i}", [])
+            assert calls == [call for i in range(6) for call in (f"s{i}", f"f{i}")]
+
+            await asyncio.sleep(0.1)
+            assert server.properties['A.B'] == 49
+            pool.disconnect()
+
+    asyncio.run(main())
+
+def test_subscriptions_can_be_pinned():
+    async def main():
+        async with openspace.MockServer(updateRate=10.0) as server:
+            pool = openspace.ApiPool('localhost', server.port, size=3, dedicatedSubscriptions=1)
+            await pool.connect()
+            reserved, *requests = pool._members
+
+            def topics(member):
+                return len(member._callbacks)
+
+            # By default topics go on the reserved connection
+            pool.subscribeToProperty('A.B')
+            assert topics(reserved) == 1
+
+            # Light subscriptions can stay on the request connections
+            pool.subscribeToProperty('C.D', dedicated=False)
+            pool.subscribeToEvent('Event', dedicated=False)
+            pool.startTopic('subscribe', { 'event': 'start_subscription', 'property': 'E.F' },
+                            dedicated=False)
+            assert topics(reserved) == 1
+            assert sum(topics(member) for member in requests) == 3
+
+            pool.subscribeToProperty('G.H', shared=False, dedicated=True)
+            assert topics(reserved) == 2
+            pool.disconnect()
+
+    asyncio.run(main())
+
+def test_pinning_needs_reserved_connections():
+    async def main():
+        async with openspace.MockServer(updateRate=None) as server:
+            pool = openspace.ApiPool('localhost', server.port, size=2)
+            await pool.connect()
+            with pytest.raises(ValueError):
+                pool.subscribeToProperty('A.B', dedicated=True)
+            assert pool._dedicated is None
+            pool.disconnect()
+
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+import asyncio
+import openspace
+
+def serverStreams(server) -> int:
+    return sum(len(connection.streams) for connection in server._connections)
+
+def runCache(test, **options):
+    async def main():
+        async with openspace.MockServer(updateRate=100.0, properties={ 'A.B': 0 }) as server:
+            api = openspace.Api('localhost', server.port, requestTimeout=5.0, **options)
+            await api.connect()
+            await test(server, api)
+            api.disconnect()
+
+    asyncio.run(main())
+
+def test_watched_properties_are_read_locally():
+    async def test(server, api):
+        await api.watch('A.B')
+        first = await api.getProperty('A.B', cached=True)
+        await asyncio.sleep(0.1)
+        # The subscription keeps the value fresh
+        assert (await api.getProperty('A.B', cached=True))['Value'] > first['Value']
+        assert await api.getProperty('C.D', cached=True) is not None
+
+        stats = api.propertyCacheStats()
+        assert (stats['hits'], stats['misses'], stats['subscriptions']) == (2, 1, 2)
+
+    runCache(test)
+
+def test_least_recently_used_properties_are_evicted():
+    async def test(server, api):
+        await api.watch('A.B')
+        await api.watch('C.D')
+        # Reading A.B makes C.D the least recently used
+        await api.getProperty('A.B', cached=True)
+        await api.watch('E.F')
+
+        cache = api._propertyCache
+        assert 'C.D' not in cache and 'A.B' in cache and 'E.F' in cache
+        assert api.propertyCacheStats()['evictions'] == 1
+        await asyncio.sleep(0.1)
+        # The evicted subscription was stopped in OpenSpace
+        assert serverStreams(server) == 2
+
+        api.unwatch('A.B')
+        await asyncio.sleep(0.1)
+        assert serverStreams(server) == 1
+
+    runCache(test, propertyCacheSize=2)
+
+def test_invalidated_values_are_fetched_until_updated():
+    async def test(server, api):
+        await api.watch('A.B')
+        api._propertyCache.invalidate()
+        assert api._propertyCache.peek('A.B') == (False, None)
+
+        # The next update makes the value fresh again
+        await api._propertyCache._entries['A.B'].hasValue.wait()
+        assert api._propertyCache.peek('A.B')[0]
+
+    runCache(test)
+
+def test_clear_without_unsubscribing_detaches_from_the_topics():
+    async def test(server, api):
+        await api.watch('A.B')
+        api._propertyCache.clear(unsubscribe=False)
+        assert api.stats()['sharedTopics'] == { 'topics': 0, 'consumers': 0 }
+        assert not api._callbacks
+
+        # Updates still sent by OpenSpace do not refill the cache
+        await asyncio.sleep(0.1)
+        assert api._propertyCache.peek('A.B') == (False, None)
+        assert api.propertyCacheStats()['subscriptions'] == 0
+        assert serverStreams(server) == 1
+
+    runCache(test)
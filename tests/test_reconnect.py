@@ -0,0 +1,202 @@
+import asyncio
+import pytest
+import openspace
+
+SECRET = 'secret'
+
+async def restart(server: openspace.MockServer, **options) -> openspace.MockServer:
+    """ Drop all connections of a server and start a new one on the same port, as if
+    OpenSpace was restarted. """
+
+    port = server.port
+    server.close()
+    await server._server.wait_closed()
+    restarted = openspace.MockServer(port=port, secret=SECRET, **options)
+    await restarted.start()
+    return restarted
+
+async def reconnected(api: openspace.Api, timeout: float = 5.0):
+    """ Wait until the api has lost its connection and reconnected. """
+
+    async def wait():
+        while not api._socket._reconnecting:
+            await asyncio.sleep(0.01)
+        while api._socket._reconnecting:
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(wait(), timeout)
+
+async def connect(server: openspace.MockServer) -> openspace.Api:
+    api = openspace.Api('localhost', server.port, reconnect=True, requestTimeout=5.0)
+    await api.connect()
+    await api.authenticate(SECRET)
+    return api
+
+def test_subscriptions_are_restored():
+    async def main():
+        server = openspace.MockServer(secret=SECRET, updateRate=50.0, properties={ 'A.B': 0 })
+        await server.start()
+        api = await connect(server)
+        topic = api.subscribeToProperty('A.B', shared=False)
+        assert (await topic.next(timeout=5.0))['Value'] == 1
+
+        server = await restart(server, updateRate=50.0, properties={ 'A.B': 100 })
+        await reconnected(api)
+
+        # The new server only streams to a client that re-authenticated and restarted
+        # the subscription
+        while (value := (await topic.next(timeout=5.0))['Value']) < 100:
+            pass
+        assert value > 100
+
+        topic.cancel()
+        api.disconnect()
+        server.close()
+
+    asyncio.run(main())
+
+def test_requests_in_flight_are_resent_if_idempotent():
+    async def main():
+        server = openspace.MockServer(secret=SECRET, updateRate=None, properties={ 'A.B': 1 })
+        await server.start()
+        api = await connect(server)
+        # Let the server register the connection before dropping it
+        await asyncio.sleep(0.1)
+
+        # Neither request is answered by the old server, which drops its connections
+        # before reading them
+        server.close()
+        get = api._startRequest('get', { 'property': 'A.B' })
+        script = api._startRequest('luascript', { 'script': 'return 1', 'return': True })
+        await server._server.wait_closed()
+        server = openspace.MockServer(
+            port=api._socket._port, secret=SECRET, updateRate=None, properties={ 'A.B': 2 }
+        )
+        await server.start()
+
+        assert (await asyncio.wait_for(get, 5.0))['Value'] == 2
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(script, 5.0)
+
+        api.disconnect()
+        server.close()
+
+    asyncio.run(main())
+
+def test_requests_during_the_outage_are_sent_after_reconnecting():
+    async def main():
+        server = openspace.MockServer(secret=SECRET, updateRate=None, properties={ 'A.B': 1 })
+        await server.start()
+        api = await connect(server)
+        await asyncio.sleep(0.1)
+
+        server.close()
+        await server._server.wait_closed()
+        while not api._socket._reconnecting:
+            await asyncio.sleep(0.01)
+
+        get = asyncio.create_task(api.getProperty('A.B'))
+        api.setProperty('C.D', 5)
+        server = openspace.MockServer(
+            port=api._socket._port, secret=SECRET, updateRate=None, properties={ 'A.B': 3 }
+        )
+        await server.start()
+
+        assert (await get)['Value'] == 3
+        assert server.properties['C.D'] == 5
+
+        api.disconnect()
+        server.close()
+
+    asyncio.run(main())
+
+def test_disconnect_stops_reconnecting():
+    async def main():
+        server = openspace.MockServer(secret=SECRET, updateRate=None)
+        await server.start()
+        api = await connect(server)
+        await asyncio.sleep(0.1)
+
+        server.close()
+        await server._server.wait_closed()
+        while not api._socket._reconnecting:
+            await asyncio.sleep(0.01)
+        api.disconnect()
+
+        with pytest.raises(ConnectionError):
+            await api.getProperty('A.B')
+
+    asyncio.run(main())
+
+def test_written_values_are_forgotten_after_reconnecting():
+    async def main():
+        server = openspace.MockServer(secret=SECRET, updateRate=None)
+        await server.start()
+        api = await connect(server)
+        await asyncio.sleep(0.1)
+
+        assert (await api.setProperties({ 'K.L': 7 }))['sent'] == 1
+        assert (await api.setProperties({ 'K.L': 7 }))['suppressed'] == 1
+
+        # OpenSpace restarted, the value written before is gone
+        server = await restart(server, updateRate=None)
+        await reconnected(api)
+        assert (await api.setProperties({ 'K.L': 7 }))['sent'] == 1
+
+        api.disconnect()
+        server.close()
+
+    asyncio.run(main())
+
+def test_reconnecting_with_writes_over_the_high_water_mark():
+    async def main():
+        server = openspace.MockServer(secret=SECRET, updateRate=None, properties={ 'A.B': 1 })
+        await server.start()
+        api = openspace.Api(
+            'localhost', server.port, highWaterMark=4096, reconnect=True, requestTimeout=5.0
+        )
+        await api.connect()
+        await api.authenticate(SECRET)
+        await asyncio.sleep(0.1)
+
+        server.close()
+        await server._server.wait_closed()
+        while not api._socket._reconnecting:
+            await asyncio.sleep(0.01)
+
+        # Queue more than the high-water mark while the server is down
+        for i in range(200):
+            api.setProperty(f'P.Value{i}', i)
+        assert api._socket._outBytes > 4096
+
+        server = openspace.MockServer(
+            port=api._socket._port, secret=SECRET, updateRate=None, properties={ 'A.B': 2 }
+        )
+        await server.start()
+
+        # Re-authenticating must not wait for the held writes, which are sent after it
+        assert (await api.getProperty('A.B', timeout=5.0))['Value'] == 2
+        assert all(server.properties[f'P.Value{i}'] == i for i in range(200))
+
+        api.disconnect()
+        server.close()
+
+    asyncio.run(main())
+
+def test_request_timeout_covers_draining():
+    async def main():
+        server = openspace.MockServer(updateRate=None)
+        await server.start()
+        api = openspace.Api('localhost', server.port, highWaterMark=16)
+        await api.connect()
+
+        # Nothing is written while the send task is stopped
+        api._socket._sendTask.cancel()
+        api.setProperty('A.B', 'x' * 64)
+        with pytest.raises(asyncio.TimeoutError):
+            await api.getProperty('A.B', timeout=0.2)
+
+        api.disconnect()
+        server.close()
+
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import pytest
+import openspace
+from openspace.src import recorder
+
+def record(path, test):
+    async def main():
+        async with openspace.MockServer(updateRate=100.0, properties={ 'A.B': 0 }) as server:
+            api = openspace.Api('localhost', server.port, requestTimeout=5.0)
+            await api.connect()
+            with openspace.Recorder(api, path) as rec:
+                await test(api)
+            api.disconnect()
+            return rec.records
+
+    return asyncio.run(main())
+
+def test_records_round_trip(tmp_path):
+    path = str(tmp_path / 'session.osrec')
+
+    async def test(api):
+        await api.getProperty('A.B')
+        await api.executeLuaScript('return 1')
+
+    count = record(path, test)
+    with openspace.RecordingReader(path) as reader:
+        records = [
+            (r.direction, r.topic, r.type, json.loads(r.message.tobytes())) for r in reader
+        ]
+
+    assert len(records) == count
+    sent = [r for r in records if r[0] == recorder.SENT]
+    received = [r for r in records if r[0] == recorder.RECEIVED]
+    assert [r[2] for r in sent] == ['get', 'luascript']
+    # Responses carry the type of the topic they answer
+    assert sorted(r[2] for r in received) == ['get', 'luascript']
+    for direction, topic, _, message in records:
+        assert topic == message['topic']
+
+def test_timestamps_increase_and_truncated_records_are_skipped(tmp_path):
+    path = tmp_path / 'session.osrec'
+
+    async def test(api):
+        for _ in range(3):
+            await api.getProperty('A.B')
+
+    count = record(str(path), test)
+    with openspace.RecordingReader(str(path)) as reader:
+        times = [r.time for r in reader]
+    assert times == sorted(times) and len(times) == count
+
+    # Cut the last message short, as if the process died while writing it
+    path.write_bytes(path.read_bytes()[:-3])
+    with openspace.RecordingReader(str(path)) as reader:
+        assert len(list(reader)) == count - 1
+
+def test_unknown_types_and_topics(tmp_path):
+    path = str(tmp_path / 'session.osrec')
+
+    async def test(api):
+        api._socket.send(b'{"topic":5,"type":"notAType","payload":{}}')
+        api._socket.send(b'{"payload":{}}')
+        await asyncio.sleep(0.1)
+
+    record(path, test)
+    with openspace.RecordingReader(path) as reader:
+        sent = [r for r in reader if r.direction == recorder.SENT]
+    assert [(r.topic, r.type) for r in sent] == [(5, None), (None, None)]
+
+def test_files_that_are_not_recordings_are_rejected(tmp_path):
+    empty = tmp_path / 'empty'
+    empty.write_bytes(b'')
+    other = tmp_path / 'other'
+    other.write_bytes(b'{"topic": 1}\n')
+    for path in (empty, other):
+        with pytest.raises(ValueError):
+            openspace.RecordingReader(str(path))
+
+def test_replay_delivers_received_messages_to_topics(tmp_path):
+    path = str(tmp_path / 'session.osrec')
+    recorded = []
+
+    async def test(api):
+        topic = api.subscribeToProperty('A.B', callback=lambda p: recorded.append(p['Value']))
+        await asyncio.sleep(0.1)
+        topic.cancel()
+
+    record(path, test)
+    assert recorded
+
+    async def main():
+        replayed = []
+        api = openspace.Api('localhost', 4681)
+        # A fresh api hands out the same topic ids as the recorded one
+        api.subscribeToProperty('A.B', callback=lambda p: replayed.append(p['Value']))
+        count = await openspace.replay(path, api, speed=None)
+        assert count >= len(recorded)
+        assert replayed == recorded
+
+    asyncio.run(main())
+
+def test_replay_to_server_reproduces_the_client_load(tmp_path):
+    path = str(tmp_path / 'session.osrec')
+
+    async def test(api):
+        for _ in range(5):
+            await api.getProperty('A.B')
+
+    record(path, test)
+
+    async def main():
+        async with openspace.MockServer(properties={ 'A.B': 0 }) as server:
+            result = await openspace.replayToServer(path, 'localhost', server.port, speed=None)
+        assert result == { 'sent': 5, 'responses': 5 }
+
+    asyncio.run(main())
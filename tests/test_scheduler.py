@@ -0,0 +1,150 @@
+import asyncio
+import json
+import openspace
+from openspace import VirtualClock, WriteScheduler
+
+class RecordingApi:
+    """ Stands in for an `Api`, recording what the scheduler writes. """
+
+    def __init__(self, known = None):
+        self.writes = []
+        self._known = known or {}
+
+    def _lastKnownValue(self, property):
+        if property in self._known:
+            return True, self._known[property]
+        return False, None
+
+    async def _writeProperties(self, properties: dict) -> dict:
+        self.writes.append(properties)
+        return { 'sent': len(properties), 'suppressed': 0, 'messages': 1 }
+
+def runScheduler(test, known = None, **options):
+    """ Run `test(scheduler, api, clock)` with a started scheduler on a virtual clock. """
+
+    async def main():
+        api = RecordingApi(known)
+        clock = VirtualClock()
+        scheduler = WriteScheduler(api, clock=clock, **options)
+        scheduler.start()
+        try:
+            await test(scheduler, api, clock)
+        finally:
+            scheduler.cancel()
+
+    asyncio.run(main())
+
+def test_writes_within_a_tick_are_coalesced():
+    async def test(scheduler, api, clock):
+        for value in (1, 2, 3):
+            scheduler.set('A.B', value)
+        scheduler.set('C.D', 'x')
+
+        await clock.advance(0.2)
+        assert api.writes == []
+
+        await clock.advance(0.05)
+        assert api.writes == [{ 'A.B': 3, 'C.D': 'x' }]
+        stats = scheduler.stats()
+        assert stats['requested'] == 4
+        assert stats['sent'] == 2
+        assert stats['ticks'] == 1
+        assert stats['buffered'] == 0
+
+    runScheduler(test, tickRate=4)
+
+def test_nothing_is_written_without_changes():
+    async def test(scheduler, api, clock):
+        await clock.advance(1.0)
+        assert api.writes == []
+        assert scheduler.stats()['ticks'] == 4
+
+    runScheduler(test, tickRate=4)
+
+def test_deadline_flushes_before_the_tick():
+    async def test(scheduler, api, clock):
+        scheduler.set('A.B', 1, deadline=0.05)
+        await clock.advance(0.05)
+        assert api.writes == [{ 'A.B': 1 }]
+        assert scheduler.stats()['ticks'] == 0
+
+        # Later writes wait for the tick again
+        scheduler.set('A.B', 2)
+        await clock.advance(0.1)
+        assert len(api.writes) == 1
+        await clock.advance(0.1)
+        assert api.writes[-1] == { 'A.B': 2 }
+
+    runScheduler(test, tickRate=4)
+
+def test_interpolation_writes_intermediate_values():
+    async def test(scheduler, api, clock):
+        scheduler.set('A.B', 4.0)
+        scheduler.set('C.D', [0.0, 4.0])
+        for _ in range(4):
+            await clock.advance(0.25)
+
+        assert [write['A.B'] for write in api.writes] == [1.0, 2.0, 3.0, 4.0]
+        assert [write['C.D'] for write in api.writes] == [
+            [3.0, 1.0], [2.0, 2.0], [1.0, 3.0], [0.0, 4.0]
+        ]
+
+        # The animation has ended, nothing more is written
+        await clock.advance(0.5)
+        assert len(api.writes) == 4
+
+    runScheduler(test, known={ 'A.B': 0.0, 'C.D': [4.0, 0.0] }, tickRate=4, interpolate=1.0)
+
+def test_interpolation_needs_a_known_start():
+    async def test(scheduler, api, clock):
+        scheduler.set('A.B', 4.0)
+        scheduler.set('C.D', 'text')
+        await clock.advance(0.25)
+        assert api.writes == [{ 'A.B': 4.0, 'C.D': 'text' }]
+
+    runScheduler(test, tickRate=4, interpolate=1.0)
+
+def test_stop_flushes_running_interpolations():
+    async def test(scheduler, api, clock):
+        scheduler.set('A.B', 4.0)
+        await clock.advance(0.25)
+        await scheduler.stop()
+        assert api.writes == [{ 'A.B': 1.0 }, { 'A.B': 4.0 }]
+
+    runScheduler(test, known={ 'A.B': 0.0 }, tickRate=4, interpolate=1.0)
+
+def test_stop_leaves_no_tasks_behind():
+    async def test(scheduler, api, clock):
+        scheduler.set('A.B', 1)
+        await clock.advance(0.1)
+        await scheduler.stop()
+        await asyncio.sleep(0)
+        assert asyncio.all_tasks() == { asyncio.current_task() }
+
+    runScheduler(test, tickRate=4)
+
+def test_direct_writes_replace_buffered_values():
+    async def main():
+        api = openspace.Api('localhost', 4681)
+        scripts = []
+        api.onSend(lambda message: scripts.append(json.loads(message)['payload']['script']))
+        clock = VirtualClock()
+        scheduler = api.enableWriteScheduler(tickRate=4, interpolate=1.0, clock=clock)
+
+        await api.setProperties({ 'A.B': 0.0 })
+        api.setProperty('A.B', 4.0)
+        api.setProperty('C.D', 'buffered')
+        api.setProperty('Scene.Earth.Opacity', 1)
+        await api.setProperties({ 'A.B': 10.0, 'C.D': 'direct', 'Scene.*.Opacity': 0 })
+
+        # Neither the interpolation nor the buffered values overwrite the direct writes
+        await clock.advance(1.0)
+        assert scripts[-1] == '\n'.join([
+            'openspace.setPropertyValueSingle("A.B", 10.0)',
+            'openspace.setPropertyValueSingle("C.D", "direct")',
+            'openspace.setPropertyValue("Scene.*.Opacity", 0)'
+        ])
+        assert scheduler.stats()['buffered'] == 0
+        await api.disableWriteScheduler()
+
+    asyncio.run(main())
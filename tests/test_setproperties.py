@@ -0,0 +1,65 @@
+import asyncio
+import json
+import openspace
+
+def offlineApi():
+    """ An Api that is never connected, its messages are only queued. """
+
+    api = openspace.Api('localhost', 4681)
+    scripts = []
+    api.onSend(lambda message: scripts.append(json.loads(message)['payload'].get('script')))
+    return api, scripts
+
+def test_unchanged_values_are_suppressed():
+    async def main():
+        api, scripts = offlineApi()
+        assert (await api.setProperties({ 'A.B': 1, 'C.D': 2 }))['sent'] == 2
+        result = await api.setProperties({ 'A.B': 1, 'C.D': 3 })
+        assert (result['sent'], result['suppressed']) == (1, 1)
+        assert scripts[-1] == 'openspace.setPropertyValueSingle("C.D", 3)'
+        assert (await api.setProperties({ 'A.B': 1 }, force=True))['sent'] == 1
+
+    asyncio.run(main())
+
+def test_wildcard_writes_are_never_suppressed():
+    async def main():
+        api, scripts = offlineApi()
+        await api.setProperties({ 'Scene.*.Opacity': 0 })
+        await api.setProperties({ 'Scene.Earth.Opacity': 1 })
+        # Earth is set back to 0 by the wildcard
+        assert (await api.setProperties({ 'Scene.*.Opacity': 0 }))['sent'] == 1
+        assert scripts[-1] == 'openspace.setPropertyValue("Scene.*.Opacity", 0)'
+        # And what was written to Earth before is forgotten
+        assert (await api.setProperties({ 'Scene.Earth.Opacity': 1 }))['sent'] == 1
+
+    asyncio.run(main())
+
+def test_wildcards_only_forget_the_properties_they_match():
+    async def main():
+        api, _ = offlineApi()
+        await api.setProperties({ 'Scene.Earth.Opacity': 1, 'Scene.Earth.Scale': 2 })
+        await api.setProperties({ 'Scene.*.Opacity': 0 })
+        result = await api.setProperties({ 'Scene.Earth.Opacity': 1, 'Scene.Earth.Scale': 2 })
+        assert (result['sent'], result['suppressed']) == (1, 1)
+
+        # Group tags can match anything
+        await api.setProperties({ '{earth}.Scale': 3 })
+        assert (await api.setProperties({ 'Scene.Earth.Scale': 2 }))['sent'] == 1
+
+    asyncio.run(main())
+
+def test_values_changed_in_place_are_written_again():
+    async def main():
+        api, scripts = offlineApi()
+        position = [1.0, 2.0, 3.0]
+        await api.setProperties({ 'A.Position': position })
+        position[0] = 5.0
+        assert (await api.setProperties({ 'A.Position': position }))['sent'] == 1
+        assert scripts[-1] == 'openspace.setPropertyValueSingle("A.Position", {5.0, 2.0, 3.0})'
+
+        # The same holds for values written with setProperty
+        api.setProperty('A.Position', position)
+        position[1] = 7.0
+        assert (await api.setProperties({ 'A.Position': position }))['sent'] == 1
+
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+import openspace
+
+def test_subscribers_share_one_subscription():
+    async def main():
+        async with openspace.MockServer(updateRate=100.0) as server:
+            api = openspace.Api('localhost', server.port)
+            await api.connect()
+
+            first = api.subscribeToProperty('A.B')
+            second = api.subscribeToProperty('A.B', delivery='dropOldest', maxSize=2)
+            assert api.stats()['sharedTopics'] == { 'topics': 1, 'consumers': 2 }
+
+            value = await first.next(timeout=5.0)
+            # Both get the same decoded object
+            assert await second.next(timeout=5.0) is value
+
+            first.cancel()
+            assert api.stats()['sharedTopics'] == { 'topics': 1, 'consumers': 1 }
+            second.cancel()
+            assert api.stats()['sharedTopics'] == { 'topics': 0, 'consumers': 0 }
+            api.disconnect()
+
+    asyncio.run(main())
+
+def test_stats_report_the_backlog_of_every_subscriber():
+    async def main():
+        async with openspace.MockServer(updateRate=200.0) as server:
+            api = openspace.Api('localhost', server.port)
+            await api.connect()
+
+            slow = api.subscribeToProperty('A.B')
+            bounded = api.subscribeToProperty('A.B', delivery='dropOldest', maxSize=2)
+            while bounded.dropped < 3:
+                await asyncio.sleep(0.01)
+
+            (backlog,) = api.stats()['subscriptionBacklog'].values()
+            consumers = backlog['consumers']
+            assert consumers[0] == { 'backlog': slow.backlog, 'dropped': 0 }
+            assert consumers[1] == { 'backlog': 2, 'dropped': bounded.dropped }
+            assert backlog['backlog'] == max(consumer['backlog'] for consumer in consumers)
+            assert backlog['dropped'] == bounded.dropped
+
+            slow.cancel()
+            bounded.cancel()
+            api.disconnect()
+
+    asyncio.run(main())
+
+def test_subscribers_only_stop_their_own_share():
+    async def main():
+        async with openspace.MockServer(updateRate=100.0) as server:
+            api = openspace.Api('localhost', server.port)
+            await api.connect()
+
+            first = api.subscribeToProperty('A.B')
+            second = api.subscribeToProperty('A.B')
+            with pytest.raises(ValueError):
+                first.talk({ 'event': 'start_subscription', 'property': 'C.D' })
+
+            # Stopping the subscription the way an unshared one is stopped only
+            # removes this subscriber
+            first.talk({ 'event': 'stop_subscription' })
+            first.cancel()
+            assert api.stats()['sharedTopics'] == { 'topics': 1, 'consumers': 1 }
+            await second.drain()
+            value = (await second.next(timeout=5.0))['Value']
+            assert (await second.next(timeout=5.0))['Value'] > value
+            assert await first.drain() == []
+
+            second.cancel()
+            assert api.stats()['sharedTopics'] == { 'topics': 0, 'consumers': 0 }
+            api.disconnect()
+
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+import json
+from openspace.src.socketwrapper import SocketWrapper
+
+def receiver():
+    """ A SocketWrapper that collects the messages it splits off. """
+
+    wrapper = SocketWrapper('localhost', 0)
+    messages = []
+    wrapper.onMessage(messages.append)
+    return wrapper, messages
+
+def feed(wrapper, data: bytes):
+    """ Pass data to the wrapper as if it was one read from the socket. """
+
+    wrapper._inBuffer += data
+    wrapper._split_messages()
+
+def test_complete_messages():
+    wrapper, messages = receiver()
+    feed(wrapper, b'{"topic": 1}\n{"topic": 2}\n')
+    assert messages == [b'{"topic": 1}', b'{"topic": 2}']
+    assert wrapper.messagesReceived == 2
+    assert wrapper._inBuffer == b''
+
+def test_partial_message_waits_for_its_newline():
+    wrapper, messages = receiver()
+    feed(wrapper, b'{"topic": 1}\n{"top')
+    assert messages == [b'{"topic": 1}']
+    feed(wrapper, b'ic": 2, "payload"')
+    assert messages == [b'{"topic": 1}']
+    # Only the bytes not searched before are scanned again
+    assert wrapper._scanOffset == len(wrapper._inBuffer)
+    feed(wrapper, b': 3}\n')
+    assert messages == [b'{"topic": 1}', b'{"topic": 2, "payload": 3}']
+    assert wrapper._inBuffer == b''
+
+def test_newline_alone_completes_a_message():
+    wrapper, messages = receiver()
+    feed(wrapper, b'{"topic": 1}')
+    feed(wrapper, b'\n')
+    assert messages == [b'{"topic": 1}']
+
+def test_every_split_position():
+    stream = b''.join(
+        json.dumps({ 'topic': i, 'payload': 'x' * i }).encode() + b'\n' for i in range(5)
+    )
+    for split in range(len(stream) + 1):
+        wrapper, messages = receiver()
+        feed(wrapper, stream[:split])
+        feed(wrapper, stream[split:])
+        assert [json.loads(message)['topic'] for message in messages] == list(range(5))
+
+def test_utf8_characters_split_across_reads():
+    text = 'Ångström ℏ 🚀 ✓'
+    message = json.dumps({ 'topic': 1, 'payload': text }, ensure_ascii=False).encode()
+    stream = message + b'\n' + message + b'\n'
+    for split in range(len(stream) + 1):
+        wrapper, messages = receiver()
+        feed(wrapper, stream[:split])
+        feed(wrapper, stream[split:])
+        assert [json.loads(message)['payload'] for message in messages] == [text, text]
+
+def test_byte_by_byte():
+    text = 'Ångström 🚀'
+    message = json.dumps({ 'topic': 3, 'payload': text }, ensure_ascii=False).encode()
+    wrapper, messages = receiver()
+    for i in range(len(message)):
+        feed(wrapper, message[i:i + 1])
+    assert messages == []
+    feed(wrapper, b'\n')
+    assert messages == [message]
+    assert json.loads(messages[0])['payload'] == text
+
+def test_failing_callback_does_not_lose_later_messages(capsys):
+    wrapper = SocketWrapper('localhost', 0)
+    messages = []
+
+    def receive(message):
+        if message == b'bad':
+            raise ValueError("bad message")
+        messages.append(message)
+
+    wrapper.onMessage(receive)
+    feed(wrapper, b'one\nbad\ntwo\n')
+    assert messages == [b'one', b'two']
+    assert "bad message" in capsys.readouterr().out
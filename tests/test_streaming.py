@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+import openspace
+
+class FakeTopic:
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class FakeApi:
+    def __init__(self):
+        self.callbacks = {}
+        self.topics = []
+
+    def subscribeToProperty(self, uri, callback):
+        self.callbacks[uri] = callback
+        self.topics.append(FakeTopic())
+        return self.topics[-1]
+
+def test_window_wraps_around_in_order():
+    buffer = openspace.RingBuffer(4)
+    for i in range(10):
+        buffer.append(float(i), i * 10)
+
+    assert len(buffer) == 4 and buffer.count == 10
+    times, values = buffer.window()
+    assert times.tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert values[:, 0].tolist() == [60, 70, 80, 90]
+
+    times, values = buffer.window(2)
+    assert times.tolist() == [8.0, 9.0]
+    # Windows are views into the buffer, not copies
+    assert np.shares_memory(times, buffer._times)
+
+def test_window_of_a_partly_filled_buffer():
+    buffer = openspace.RingBuffer(5)
+    assert buffer.window()[0].shape == (0,)
+    buffer.append(1.0, 1)
+    buffer.append(2.0, 2)
+    times, values = buffer.window(10)
+    assert times.tolist() == [1.0, 2.0] and values.shape == (2, 1)
+
+def test_since_returns_samples_at_or_after_timestamp():
+    buffer = openspace.RingBuffer(3)
+    for i in range(5):
+        buffer.append(float(i), i)
+
+    times, values = buffer.since(3.0)
+    assert times.tolist() == [3.0, 4.0]
+    assert buffer.since(0.0)[0].tolist() == [2.0, 3.0, 4.0]
+    assert len(buffer.since(5.0)[0]) == 0
+
+def test_dtype_and_width():
+    buffer = openspace.RingBuffer(2, width=3, dtype=np.float32)
+    assert buffer.width == 3 and buffer.window()[1].dtype == np.float32
+    for i in range(3):
+        buffer.append(float(i), [i, i + 0.5, -i])
+    assert buffer.window()[1].tolist() == [[1, 1.5, -1], [2, 2.5, -2]]
+
+    integers = openspace.RingBuffer(2, dtype=np.int32)
+    integers.append(0.0, 7.9)
+    assert integers.window()[1].dtype == np.int32 and integers.window()[1][0, 0] == 7
+
+    with pytest.raises(ValueError):
+        openspace.RingBuffer(0)
+
+def test_stream_records_updates_per_property():
+    api = FakeApi()
+    clock = iter(float(i) for i in range(100))
+    with openspace.PropertyStream(api, ['A.B', 'C.D'], capacity=8,
+                                  clock=lambda: next(clock)) as stream:
+        api.callbacks['A.B']({ 'Value': 1.0 })
+        api.callbacks['C.D']({ 'Value': [1.0, 2.0, 3.0] })
+        api.callbacks['A.B']({ 'Value': 3.0 })
+        # Values that do not fit the buffer are counted, not raised
+        api.callbacks['C.D']({ 'Value': 'text' })
+        api.callbacks['A.B']({})
+
+    assert all(topic.cancelled for topic in api.topics)
+    assert stream.rejected == 2
+    assert stream.buffer('C.D').width == 3
+    assert stream.window('A.B')[1][:, 0].tolist() == [1.0, 3.0]
+    assert stream.window('E.F')[0].shape == (0,)
+
+    # A.B was sampled at 0 and 2, C.D at 1
+    values = stream.resample([0.0, 1.0, 2.0, 3.0], ['A.B'])
+    assert values[:, 0].tolist() == [1.0, 2.0, 3.0, 3.0]
+    values = stream.resample([-1.0, 1.0, 2.5], ['A.B'], method='previous')
+    assert np.isnan(values[0, 0]) and values[1:, 0].tolist() == [1.0, 3.0]
+
+    times, values = stream.align(1.0, uris=['A.B', 'C.D'])
+    assert times.tolist() == [0.0, 1.0, 2.0]
+    assert values.shape == (3, 4)
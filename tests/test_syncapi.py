@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import pytest
+import openspace
+
+@pytest.fixture
+def server():
+    """ A MockServer running on its own event loop thread. """
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = openspace.MockServer(updateRate=100.0, properties={ 'A.B': 1 })
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    yield server
+    loop.call_soon_threadsafe(server.close)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+def connections(server) -> int:
+    return len(server._connections)
+
+def waitFor(condition, timeout: float = 5.0):
+    event = threading.Event()
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return True
+        event.wait(0.01)
+    return condition()
+
+@pytest.mark.parametrize('apiClass', [openspace.Api, openspace.ApiPool])
+def test_close_disconnects(server, apiClass):
+    api = openspace.SyncApi('localhost', server.port, apiClass=apiClass)
+    api.connect()
+    subscription = api.subscribeToProperty('A.B')
+    assert subscription.next(timeout=5.0)['Description']['Identifier'] == 'B'
+    assert waitFor(lambda: connections(server) > 0)
+
+    api.close()
+    assert waitFor(lambda: connections(server) == 0)
+
+def test_close_without_connecting(server):
+    openspace.SyncApi('localhost', server.port).close()
+
+def test_timeout_cancels_the_call(server):
+    with openspace.SyncApi('localhost', server.port) as api:
+        cancelled = threading.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(TimeoutError):
+            api._run(slow(), 0.05)
+        assert cancelled.wait(5.0)
+
+def test_iteration_ends_on_cancel(server):
+    with openspace.SyncApi('localhost', server.port) as api:
+        subscription = api.subscribeToProperty('A.B')
+        assert len(subscription.drain(10, timeout=5.0)) >= 1
+        threading.Timer(0.1, subscription.cancel).start()
+        for _ in subscription:
+            pass
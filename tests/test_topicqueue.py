@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+from openspace.src.topicqueue import TopicQueue
+
+def fill(queue, count):
+    for i in range(count):
+        queue.put_nowait(i)
+
+def test_all_keeps_every_message():
+    queue = TopicQueue('all')
+    fill(queue, 1000)
+    assert len(queue) == 1000
+    assert queue.dropped == 0
+    assert queue.popMany() == list(range(1000))
+
+def test_latest_keeps_the_most_recent_message():
+    queue = TopicQueue('latest')
+    fill(queue, 10)
+    assert queue.popMany() == [9]
+    assert queue.dropped == 9
+
+def test_drop_oldest():
+    queue = TopicQueue('dropOldest', 3)
+    fill(queue, 5)
+    assert queue.popMany() == [2, 3, 4]
+    assert queue.dropped == 2
+
+def test_drop_newest():
+    queue = TopicQueue('dropNewest', 3)
+    fill(queue, 5)
+    assert queue.popMany() == [0, 1, 2]
+    assert queue.dropped == 2
+
+def test_block_pauses_and_resumes_reading():
+    calls = []
+    queue = TopicQueue('block', 3, lambda: calls.append('pause'), lambda: calls.append('resume'))
+    fill(queue, 2)
+    assert calls == []
+    queue.put_nowait(2)
+    assert calls == ['pause']
+
+    # Nothing is dropped while paused, the socket is expected to stop delivering
+    queue.put_nowait(3)
+    assert queue.dropped == 0
+    assert len(queue) == 4
+
+    assert queue.pop() == 0
+    assert calls == ['pause']
+    assert queue.popMany(2) == [1, 2]
+    assert calls == ['pause', 'resume']
+
+def test_close_releases_a_paused_socket():
+    calls = []
+    queue = TopicQueue('block', 1, lambda: calls.append('pause'), lambda: calls.append('resume'))
+    fill(queue, 1)
+    queue.close()
+    assert calls == ['pause', 'resume']
+    assert len(queue) == 0
+
+@pytest.mark.parametrize('delivery', ['dropOldest', 'dropNewest', 'block'])
+def test_bounded_modes_need_a_size(delivery):
+    with pytest.raises(ValueError):
+        TopicQueue(delivery, 0)
+
+def test_unknown_delivery_mode():
+    with pytest.raises(ValueError):
+        TopicQueue('everything')
+
+def test_get_waits_for_a_message():
+    async def main():
+        queue = TopicQueue()
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        assert not getter.done()
+        queue.put_nowait('message')
+        assert await getter == 'message'
+
+    asyncio.run(main())
+
+def test_close_wakes_waiting_getters():
+    async def main():
+        queue = TopicQueue()
+        getters = [asyncio.create_task(queue.get()) for _ in range(3)]
+        await asyncio.sleep(0)
+        queue.close()
+        results = await asyncio.gather(*getters, return_exceptions=True)
+        assert all(isinstance(result, StopAsyncIteration) for result in results)
+
+    asyncio.run(main())
+
+def test_cancelled_getter_passes_its_wakeup_on():
+    async def main():
+        queue = TopicQueue()
+        first = asyncio.create_task(queue.get())
+        second = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        # The first getter is woken, but cancelled before it runs
+        queue.put_nowait('message')
+        first.cancel()
+        assert await second == 'message'
+
+    asyncio.run(main())
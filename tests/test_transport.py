@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+import openspace
+
+def test_connect_right_after_disconnect():
+    async def main():
+        async with openspace.MockServer(updateRate=None, properties={ 'A.B': 1 }) as server:
+            for _ in range(10):
+                first = openspace.Api('localhost', server.port)
+                await first.connect()
+                first.disconnect()
+
+                # Gets the file descriptor the first connection just released
+                second = openspace.Api('localhost', server.port)
+                await second.connect()
+                assert not second._socket._disconnecting
+                assert (await asyncio.wait_for(second.getProperty('A.B'), 5.0))['Value'] == 1
+                second.disconnect()
+
+            pool = openspace.ApiPool('localhost', server.port, size=3)
+            await pool.connect()
+            pool.disconnect()
+            api = openspace.Api('localhost', server.port)
+            await api.connect()
+            assert not api._socket._disconnecting
+            api.disconnect()
+
+    asyncio.run(main())
+
+@pytest.mark.parametrize('compression', [True, False])
+def test_websocket_compression_is_configurable(compression):
+    pytest.importorskip('websockets')
+
+    async def main():
+        async with openspace.MockServer(updateRate=None, transport='websocket') as server:
+            api = openspace.Api(
+                'localhost', server.port, transport='websocket', compression=compression
+            )
+            await api.connect()
+            assert api._socket.compressed == compression
+            assert (await asyncio.wait_for(api.getProperty('A.B'), 5.0))['Value'] == 0
+            api.disconnect()
+
+            pool = openspace.ApiPool(
+                'localhost', server.port, size=2, transport='websocket', compression=compression
+            )
+            await pool.connect()
+            assert [member._socket.compressed for member in pool._members] == [compression] * 2
+            pool.disconnect()
+
+    asyncio.run(main())